@@ -0,0 +1,5 @@
+'''
+Pruebas de rendimiento del proyecto: generación de movimientos (perft), iteraciones por segundo de los dos motores MCTS y
+evaluaciones por segundo de la red. Se ejecutan todas con benchmarks/ejecutar.py, que guarda los resultados en JSON y los
+compara con una referencia guardada.
+'''
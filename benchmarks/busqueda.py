@@ -0,0 +1,127 @@
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+# Imports
+import random
+import statistics
+import tracemalloc
+from utiles.bitboard import casillas
+from utiles.posicion import posicion_inicial
+
+# Semilla con la que se repiten las búsquedas, para que cada ejecución haga exactamente el mismo trabajo.
+SEMILLA = 2024
+
+
+def posiciones_fijas():
+    '''
+    Esta función devuelve un diccionario {nombre: posición} con las posiciones desde las que se mide la búsqueda: la inicial y
+    una de medio juego, a la que se llega siempre igual jugando 20 movimientos al azar con una semilla fija.
+    '''
+
+    azar = random.Random(SEMILLA)
+    medio_juego = posicion_inicial()
+    for _ in range(20):
+        movimientos = casillas(medio_juego.movimientos())
+        if movimientos:
+            medio_juego.hacer(azar.choice(movimientos))
+        else:
+            medio_juego.pasar()
+    return {'inicial': posicion_inicial(), 'medio_juego': medio_juego}
+
+def medir_mcts(mcts, iteraciones, repeticiones=3, **opciones):
+    '''
+    Esta función mide las iteraciones por segundo de una función mcts (la del motor clásico o la del neuronal) desde cada una
+    de las posiciones fijas. Cada medida se repite varias veces con la misma semilla y se toma la mediana, que no se mueve por
+    una repetición que haya ido especialmente rápida o lenta por lo que esté haciendo el resto del sistema. Devuelve un
+    diccionario {posición: iteraciones por segundo}.
+
+    PARÁMETROS
+    - mcts: Función de búsqueda (mcts de motor_mcts o de motor_mcts_neuronal).
+    - iteraciones: Iteraciones de cada búsqueda.
+    - repeticiones: Número de veces que se repite cada medida. 3 por defecto.
+    - opciones: Parámetros adicionales para mcts.
+    '''
+
+    resultados = {}
+    for nombre, pos in posiciones_fijas().items():
+        velocidades = []
+        for _ in range(repeticiones):
+            random.seed(SEMILLA)
+            # Sin solucionador final ni libro, para medir sólo la búsqueda
+            _, info = mcts(pos, pos.turno, iteraciones, con_info=True, umbral_final=None, **opciones)
+            velocidades.append(info['iteraciones'] / info['tiempo'])
+        resultados[nombre] = statistics.median(velocidades)
+    return resultados
+
+def medir_mcts_clasico(iteraciones=1000, repeticiones=5):
+    '''
+    Esta función mide las iteraciones por segundo del motor clásico (ver medir_mcts).
+
+    PARÁMETROS
+    - iteraciones: Iteraciones de cada búsqueda. 1000 por defecto.
+    - repeticiones: Número de veces que se repite cada medida. 5 por defecto.
+    '''
+
+    from mcts.motor_mcts import mcts
+    return {'iteraciones_por_segundo': medir_mcts(mcts, iteraciones, repeticiones)}
+
+def medir_mcts_compacto(iteraciones=1000, repeticiones=5):
+    '''
+    Esta función mide las iteraciones por segundo del motor clásico con el árbol compacto (ver medir_mcts y mcts/arbol_compacto).
+
+    PARÁMETROS
+    - iteraciones: Iteraciones de cada búsqueda. 1000 por defecto.
+    - repeticiones: Número de veces que se repite cada medida. 5 por defecto.
+    '''
+
+    from mcts.arbol_compacto import mcts
+    return {'iteraciones_por_segundo': medir_mcts(mcts, iteraciones, repeticiones)}
+
+def medir_mcts_neuronal(iteraciones=512, repeticiones=5):
+    '''
+    Esta función mide las iteraciones por segundo del motor con red neuronal (ver medir_mcts), sin caché de evaluaciones para
+    que todas las hojas pasen por la red. Devuelve None si no se puede cargar el modelo (por ejemplo, si aún no se ha entrenado)
+    o si falta alguna de las librerías que necesita (h5py, o Keras con OTELO_BACKEND=keras).
+
+    PARÁMETROS
+    - iteraciones: Iteraciones de cada búsqueda. 512 por defecto.
+    - repeticiones: Número de veces que se repite cada medida. 5 por defecto.
+    '''
+
+    try:
+        from mcts.motor_mcts_neuronal import mcts
+    except (OSError, ImportError):
+        return None
+    return {'iteraciones_por_segundo': medir_mcts(mcts, iteraciones, repeticiones, cache=False)}
+
+def medir_memoria_nodos(iteraciones=500):
+    '''
+    Esta función mide los bytes que ocupa cada nodo del árbol de búsqueda del motor clásico, con objetos Nodo (y su tabla de
+    transposiciones) y con el árbol compacto. Con Nodo se mide con tracemalloc la memoria que queda ocupada tras una búsqueda
+    desde la posición de medio juego, dividida entre los nodos creados. El árbol compacto reserva sus arrays de antemano, así
+    que se toma la memoria de los arrays dividida entre los nodos que caben en ellos. Devuelve un diccionario con los bytes
+    por nodo de cada uno y cuántas veces ocupa menos el compacto.
+
+    PARÁMETROS
+    - iteraciones: Iteraciones de la búsqueda con Nodo. 500 por defecto (tracemalloc hace la búsqueda mucho más lenta).
+    '''
+
+    from mcts.motor_mcts import SesionMCTS
+    from mcts.arbol_compacto import ArbolCompacto
+
+    pos = posiciones_fijas()['medio_juego']
+    # Una búsqueda corta antes de medir, para que no cuenten las memorias que se crean una sola vez (importaciones, cachés)
+    SesionMCTS(umbral_final=None).buscar(pos, pos.turno, 10)
+    random.seed(SEMILLA)
+    sesion = SesionMCTS(umbral_final=None)
+    tracemalloc.start()
+    inicial = tracemalloc.get_traced_memory()[0]
+    _, info = sesion.buscar(pos, pos.turno, iteraciones, con_info=True)
+    por_nodo = (tracemalloc.get_traced_memory()[0] - inicial) / info['nodos']
+    tracemalloc.stop()
+
+    arbol = ArbolCompacto()
+    por_nodo_compacto = arbol.memoria() / arbol.capacidad
+    return {'bytes_por_nodo': {'nodo': por_nodo, 'compacto': por_nodo_compacto}, 'reduccion': por_nodo / por_nodo_compacto}
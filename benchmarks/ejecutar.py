@@ -0,0 +1,149 @@
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+# Imports
+import json
+import multiprocessing
+import platform
+import time
+import numpy as np
+from benchmarks.perft import medir_perft
+from benchmarks.busqueda import medir_mcts_clasico, medir_mcts_compacto, medir_mcts_neuronal, medir_memoria_nodos
+from benchmarks.inferencia import medir_inferencia
+
+RUTA_RESULTADOS = "benchmarks/resultados.json"
+RUTA_REFERENCIA = "benchmarks/referencia.json"
+
+# Fracción que puede bajar una medida respecto a la referencia sin considerarse una regresión. Cada medida es la mediana de
+# varias repeticiones, pero aun así en una máquina compartida varían cerca de un 20% de una ejecución a otra, así que un umbral
+# más pequeño daría falsas alarmas.
+UMBRAL_REGRESION = 0.3
+
+
+def ejecutar_todo():
+    '''
+    Esta función ejecuta todas las pruebas de rendimiento y devuelve un diccionario con sus resultados y los datos de la máquina
+    en la que se han ejecutado. Las pruebas de la red se omiten (con valor None) si no se puede cargar el modelo o faltan
+    las librerías que necesita.
+    '''
+
+    inicio = time.perf_counter()
+    resultados = {}
+    print("perft...", flush=True)
+    resultados.update(medir_perft())
+    print("mcts clásico...", flush=True)
+    resultados['mcts_clasico'] = medir_mcts_clasico()
+    print("mcts con árbol compacto...", flush=True)
+    resultados['mcts_compacto'] = medir_mcts_compacto()
+    print("memoria por nodo...", flush=True)
+    resultados['memoria_nodos'] = medir_memoria_nodos()
+    print("mcts neuronal...", flush=True)
+    resultados['mcts_neuronal'] = medir_mcts_neuronal()
+    print("inferencia...", flush=True)
+    resultados['inferencia'] = medir_inferencia()
+
+    maquina = {'python': platform.python_version(), 'numpy': np.__version__, 'sistema': platform.platform(),
+               'procesador': platform.processor(), 'nucleos': multiprocessing.cpu_count()}
+    # Se pasa por JSON para que las claves numéricas sean cadenas, igual que en los resultados leídos de un archivo
+    return json.loads(json.dumps({'fecha': time.strftime('%Y-%m-%d %H:%M:%S'), 'maquina': maquina,
+                                  'duracion': time.perf_counter() - inicio, 'resultados': resultados}))
+
+def medidas(resultados, prefijo=''):
+    '''
+    Esta función devuelve un diccionario {nombre: valor} con todas las medidas de velocidad (las que están bajo una clave que
+    contiene "por_segundo") de unos resultados, con el nombre formado por las claves que llevan hasta ella separadas por puntos.
+
+    PARÁMETROS
+    - resultados: Diccionario de resultados (el de la clave 'resultados' de ejecutar_todo).
+    - prefijo: Nombre de las claves ya recorridas. Vacío por defecto.
+    '''
+
+    res = {}
+    for clave, valor in resultados.items():
+        nombre = f"{prefijo}.{clave}" if prefijo else clave
+        if isinstance(valor, dict):
+            res.update(medidas(valor, nombre))
+        elif isinstance(valor, (int, float)) and not isinstance(valor, bool) and 'por_segundo' in nombre:
+            res[nombre] = valor
+    return res
+
+def comparar(actual, referencia, umbral=UMBRAL_REGRESION):
+    '''
+    Esta función compara unos resultados con los de referencia. Devuelve la tupla (filas, problemas): filas es una lista de
+    tuplas (medida, referencia, actual, cambio relativo) con las medidas que están en ambos, y problemas una lista de textos
+    con las regresiones (medidas que han bajado más del umbral) y los recuentos de perft incorrectos.
+
+    PARÁMETROS
+    - actual: Resultados de la ejecución actual (ver ejecutar_todo).
+    - referencia: Resultados de referencia, con el mismo formato.
+    - umbral: Fracción máxima que puede bajar una medida. UMBRAL_REGRESION por defecto.
+    '''
+
+    problemas = []
+    for nombre, resultado in actual['resultados'].items():
+        if isinstance(resultado, dict) and resultado.get('correcto') is False:
+            problemas.append(f"{nombre}: recuento incorrecto {resultado['nodos']}")
+
+    medidas_actual = medidas(actual['resultados'])
+    medidas_referencia = medidas(referencia['resultados'])
+    filas = []
+    for nombre in sorted(medidas_actual.keys() & medidas_referencia.keys()):
+        cambio = medidas_actual[nombre] / medidas_referencia[nombre] - 1
+        filas.append((nombre, medidas_referencia[nombre], medidas_actual[nombre], cambio))
+        if cambio < -umbral:
+            problemas.append(f"{nombre}: {cambio:+.1%} respecto a la referencia (umbral -{umbral:.0%})")
+    return filas, problemas
+
+def guardar(resultados, ruta):
+    '''
+    Esta función guarda unos resultados en un archivo JSON.
+
+    PARÁMETROS
+    - resultados: Resultados (ver ejecutar_todo).
+    - ruta: Ruta del archivo.
+    '''
+
+    with open(ruta, 'w') as archivo:
+        json.dump(resultados, archivo, indent=2)
+
+def cargar(ruta):
+    '''
+    Esta función devuelve los resultados guardados en un archivo JSON.
+
+    PARÁMETROS
+    - ruta: Ruta del archivo.
+    '''
+
+    with open(ruta) as archivo:
+        return json.load(archivo)
+
+def main():
+    # Con --referencia, los resultados se guardan además como nueva referencia
+    nueva_referencia = '--referencia' in sys.argv[1:]
+    resultados = ejecutar_todo()
+    guardar(resultados, RUTA_RESULTADOS)
+    print(f"Resultados guardados en '{RUTA_RESULTADOS}' ({resultados['duracion']:.1f} s)")
+    memoria = resultados['resultados']['memoria_nodos']
+    print(f"Memoria por nodo: {memoria['bytes_por_nodo']['nodo']:.0f} bytes con Nodo, "
+          f"{memoria['bytes_por_nodo']['compacto']:.0f} con el árbol compacto ({memoria['reduccion']:.1f} veces menos)")
+
+    if nueva_referencia:
+        guardar(resultados, RUTA_REFERENCIA)
+        print(f"Referencia guardada en '{RUTA_REFERENCIA}'")
+        return 0
+    if not os.path.exists(RUTA_REFERENCIA):
+        print(f"No hay referencia en '{RUTA_REFERENCIA}' con la que comparar")
+        return 0
+
+    filas, problemas = comparar(resultados, cargar(RUTA_REFERENCIA))
+    for nombre, valor_referencia, valor_actual, cambio in filas:
+        print(f"{nombre:55} {valor_referencia:14.1f} {valor_actual:14.1f} {cambio:+8.1%}")
+    for problema in problemas:
+        print("REGRESIÓN:", problema)
+    return 1 if problemas else 0
+
+# Ejecución desde la carpeta raíz del proyecto: python benchmarks/ejecutar.py [--referencia]
+if __name__ == '__main__':
+    sys.exit(main())
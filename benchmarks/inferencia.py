@@ -0,0 +1,72 @@
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+# Imports
+import random
+import statistics
+import time
+from utiles.bitboard import casillas
+from utiles.posicion import posicion_inicial
+
+# Tamaños de lote con los que se mide la red: 1 (una hoja cada vez), 16 (el lote por defecto del motor) y lotes mayores.
+TAMANOS_LOTE = (1, 16, 64, 256)
+
+
+def instantaneas_aleatorias(n, semilla=0):
+    '''
+    Esta función devuelve n instantáneas (blancas, negras, turno) de partidas jugadas al azar desde la posición inicial, para
+    que las posiciones evaluadas sean parecidas a las que la red ve durante la búsqueda.
+
+    PARÁMETROS
+    - n: Número de instantáneas.
+    - semilla: Semilla de las partidas. 0 por defecto.
+    '''
+
+    azar = random.Random(semilla)
+    instantaneas = []
+    while len(instantaneas) < n:
+        pos = posicion_inicial()
+        while pos.no_terminal() and len(instantaneas) < n:
+            movimientos = casillas(pos.movimientos())
+            if movimientos:
+                pos.hacer(azar.choice(movimientos))
+            else:
+                pos.pasar()
+            instantaneas.append(pos.instantanea())
+    return instantaneas
+
+def medir_inferencia(tamanos_lote=TAMANOS_LOTE, evaluaciones=2048, repeticiones=5):
+    '''
+    Esta función mide las evaluaciones por segundo de la red con cada tamaño de lote, con predecir del motor neuronal (que
+    incluye pasar las posiciones a tensor, como en la búsqueda). Para cada tamaño se evalúan unas "evaluaciones" posiciones en
+    total, en lotes de ese tamaño, y se toma la mediana de varias repeticiones. Devuelve un diccionario con el motor de
+    inferencia y {tamaño de lote: evaluaciones por segundo}, o None si no se puede cargar el modelo o falta alguna de las
+    librerías que necesita (h5py, o Keras con OTELO_BACKEND=keras).
+
+    PARÁMETROS
+    - tamanos_lote: Tamaños de lote a medir. TAMANOS_LOTE por defecto.
+    - evaluaciones: Número aproximado de posiciones evaluadas con cada tamaño en cada repetición. 2048 por defecto.
+    - repeticiones: Número de veces que se repite cada medida. 5 por defecto.
+    '''
+
+    try:
+        from mcts.motor_mcts_neuronal import predecir, BACKEND
+    except (OSError, ImportError):
+        return None
+
+    instantaneas = instantaneas_aleatorias(max(tamanos_lote))
+    resultados = {}
+    for tam in tamanos_lote:
+        lote = instantaneas[:tam]
+        predecir(lote) # La primera llamada puede incluir costes de preparación que no se repiten
+        llamadas = max(1, evaluaciones // tam)
+        velocidades = []
+        for _ in range(repeticiones):
+            inicio = time.perf_counter()
+            for _ in range(llamadas):
+                predecir(lote)
+            velocidades.append(tam * llamadas / (time.perf_counter() - inicio))
+        resultados[tam] = statistics.median(velocidades)
+    return {'backend': BACKEND, 'evaluaciones_por_segundo': resultados}
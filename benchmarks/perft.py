@@ -0,0 +1,107 @@
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+# Imports
+import statistics
+import time
+from utiles.bitboard import casillas, movimientos_bb
+from utiles.fichas import movimientos_disponibles, obtener_fichas_a_voltear
+from utiles.posicion import posicion_inicial
+
+# Número de posiciones a cada profundidad (1, 2, ...) desde la posición inicial. Son valores conocidos, así que además de
+# medir la velocidad sirven para comprobar que la generación de movimientos es correcta.
+PERFT_INICIAL = [4, 12, 56, 244, 1396, 8200, 55092, 390216]
+
+
+def perft(pos, profundidad):
+    '''
+    Esta función devuelve el número de posiciones a las que se llega desde la posición dada jugando exactamente "profundidad"
+    movimientos, recorriendo el árbol completo con hacer y deshacer. Pasar turno cuenta como un movimiento, y una posición
+    final antes de llegar a la profundidad cuenta como una sola posición.
+
+    PARÁMETROS
+    - pos: Posición (Posicion) desde la que se cuenta. Al terminar queda como estaba.
+    - profundidad: Número de movimientos.
+    '''
+
+    if profundidad == 0:
+        return 1
+    movimientos = pos.movimientos()
+    if not movimientos:
+        if not movimientos_bb(pos.rivales, pos.propias):
+            return 1
+        pos.pasar()
+        total = perft(pos, profundidad - 1)
+        pos.deshacer()
+        return total
+
+    if profundidad == 1:
+        return len(casillas(movimientos))
+    total = 0
+    for casilla in casillas(movimientos):
+        pos.hacer(casilla)
+        total += perft(pos, profundidad - 1)
+        pos.deshacer()
+    return total
+
+def perft_tablero(tablero, turno, profundidad):
+    '''
+    Esta función hace lo mismo que perft, pero con las funciones de utiles/fichas sobre el tablero 8x8, copiando el tablero en
+    cada movimiento como hacía el motor antes de usar Posicion.
+
+    PARÁMETROS
+    - tablero: Matriz 8x8 con los valores que indican qué ficha hay en cada casilla.
+    - turno: Número que indica qué jugador está en su turno (1: blancas, 2: negras).
+    - profundidad: Número de movimientos.
+    '''
+
+    if profundidad == 0:
+        return 1
+    movimientos = movimientos_disponibles(tablero, turno)
+    if not movimientos:
+        if not movimientos_disponibles(tablero, 3 - turno):
+            return 1
+        return perft_tablero(tablero, 3 - turno, profundidad - 1)
+
+    if profundidad == 1:
+        return len(movimientos)
+    total = 0
+    for fila, col in movimientos:
+        siguiente = [f[:] for f in tablero]
+        siguiente[fila][col] = turno
+        for f, c in obtener_fichas_a_voltear(tablero, fila, col, turno):
+            siguiente[f][c] = turno
+        total += perft_tablero(siguiente, 3 - turno, profundidad - 1)
+    return total
+
+def medir_perft(profundidad=8, profundidad_tablero=6, repeticiones=3):
+    '''
+    Esta función ejecuta perft desde la posición inicial a cada profundidad hasta las dadas, con Posicion (bitboards) y con las
+    funciones de utiles/fichas, y devuelve un diccionario con las posiciones contadas a cada profundidad, si coinciden con
+    PERFT_INICIAL y las posiciones por segundo a la profundidad máxima (con la mediana de varias repeticiones).
+
+    PARÁMETROS
+    - profundidad: Profundidad máxima con Posicion. 8 por defecto.
+    - profundidad_tablero: Profundidad máxima con utiles/fichas, mucho más lento. 6 por defecto.
+    - repeticiones: Número de veces que se mide la profundidad máxima. 3 por defecto.
+    '''
+
+    resultados = {}
+    for nombre, maxima, contar in (('perft_bitboard', profundidad, lambda p: perft(posicion_inicial(), p)),
+                                   ('perft_fichas', profundidad_tablero,
+                                    lambda p: perft_tablero(posicion_inicial().a_tablero(), 2, p))):
+        nodos = {p: contar(p) for p in range(1, maxima + 1)}
+        tiempos = []
+        for _ in range(repeticiones):
+            inicio = time.perf_counter()
+            contar(maxima)
+            tiempos.append(time.perf_counter() - inicio)
+        tiempo = statistics.median(tiempos)
+        resultados[nombre] = {
+            'nodos': nodos,
+            'correcto': all(nodos[p] == PERFT_INICIAL[p - 1] for p in nodos if p <= len(PERFT_INICIAL)),
+            'nodos_por_segundo': nodos[maxima] / tiempo,
+        }
+    return resultados
@@ -5,10 +5,16 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 # Imports
 import csv
-import copy
+import multiprocessing
+import queue
 import random
+import shutil
+import time
 from mcts.motor_mcts import *
 from utiles.fichas import *
+from utiles.posicion import *
+from utiles.datos_binarios import escribir_registros, escribir_visitas, ruta_visitas
+from mcts.libro_aperturas import cargar_libro
 
 
 def tablero_a_fila(tablero, etiqueta):
@@ -45,10 +51,121 @@ def evaluar_final(estado, jugador):
     else:
         return -1
 
-def generar_csv_desde_mcts(ruta_csv, num_partidas, jugador=1, iteraciones=50):
+def jugar_partida(sesion, jugador, iteraciones):
+    '''
+    Esta función juega una partida completa entre el jugador a entrenar, que elige sus movimientos con MCTS, y un contrincante que
+    juega al azar. Devuelve la tupla (historial, estado, visitas), con el historial de estados de la partida como instantáneas
+    (blancas, negras, turno), incluido el estado final, el tablero final y, por cada estado del historial, el diccionario
+    {casilla: visitas} de la búsqueda hecha en él (None en los estados en los que no se buscó).
+
+    PARÁMETROS
+    - sesion: Sesión de búsqueda (SesionMCTS) del jugador a entrenar. Conserva el árbol de búsqueda entre las jugadas de la partida.
+    - jugador: Jugador que va a ser entrenado.
+    - iteraciones: Entero que indicará al algoritmo MCTS cuántas iteraciones realizar.
+    '''
+
+    pos = posicion_inicial() # Posición inicial, empiezan las negras. Se modifica en el sitio durante toda la partida.
+    historial = [] # Historial de estados del tablero durante la partida, como instantáneas (blancas, negras, turno)
+    visitas = [] # Visitas de cada movimiento en la búsqueda de cada estado, objetivo de la cabeza de política de la red
+
+    while pos.no_terminal():
+
+        historial.append(pos.instantanea()) # Se añade el estado al historial de estados
+        visitas.append(None)
+
+        if pos.turno == jugador: # En el turno del jugador a entrenar
+            accion, info = sesion.buscar(pos, pos.turno, iteraciones, con_info=True) # Escoger la acción basándose en el algoritmo MCTS
+            visitas[-1] = info.get('visitas') # No las hay si la jugada sale del libro o del solucionador final
+            if accion is None: # Si no hay acción posible, se pasa turno
+                pos.pasar()
+                continue
+            casilla = accion[0] * 8 + accion[1]
+        else: # En el turno del contrincante
+            acciones = casillas(pos.movimientos())
+            if acciones:
+                casilla = random.choice(acciones) # Se realiza un movimiento aleatorio, en caso de tener acciones disponibles
+            else:
+                pos.pasar() # Si no se puede hacer nada, se pasa turno
+                continue
+
+        # Se coloca la ficha en el lugar elegido, se voltean las fichas y se pasa turno
+        pos.hacer(casilla)
+
+    historial.append(pos.instantanea()) # Se añade al historial el estado final de la partida
+    visitas.append(None)
+    return historial, pos.a_tablero(), visitas
+
+def escribir_partida(writer, historial, recompensa):
+    '''
+    Esta función escribe en el csv una fila por cada estado (tablero) de la partida, incluyendo las casillas del tablero y la
+    etiqueta obtenida a partir del estado final.
+
+    PARÁMETROS
+    - writer: Objeto csv.writer del archivo de salida.
+    - historial: Lista de instantáneas (blancas, negras, turno) de la partida.
+    - recompensa: Etiqueta del resultado de la partida.
+    '''
+
+    for blancas, negras, _ in historial:
+        writer.writerow(tablero_a_fila(bitboards_a_tablero(blancas, negras), recompensa))
+
+class EscritorPartidas:
+    def __init__(self, ruta):
+        '''
+        Esta clase escribe las partidas generadas en un archivo de datos, en formato binario si la ruta termina en ".bin"
+        (17 bytes por estado, ver utiles/datos_binarios) o en csv (64 casillas y la etiqueta por fila) en otro caso.
+        En formato binario, las visitas de la búsqueda en cada estado se escriben en un segundo archivo (ver ruta_visitas).
+        Se usa con "with" para que los archivos se cierren al terminar.
+
+        ATRIBUTOS
+        - binario: Indica si el archivo se escribe en formato binario.
+        - archivo: Archivo abierto.
+        - archivo_visitas: Archivo de visitas abierto (None en csv).
+        - writer: Objeto csv.writer del archivo (None en formato binario).
+        '''
+        self.binario = ruta.endswith('.bin')
+        self.archivo = open(ruta, mode='wb') if self.binario else open(ruta, mode='w', newline='')
+        self.archivo_visitas = open(ruta_visitas(ruta), mode='wb') if self.binario else None
+        self.writer = None if self.binario else csv.writer(self.archivo)
+
+    def escribir(self, historial, recompensa, visitas=None):
+        '''
+        Esta función escribe todos los estados de una partida con la etiqueta de su resultado.
+
+        PARÁMETROS
+        - historial: Lista de instantáneas (blancas, negras, turno) de la partida.
+        - recompensa: Etiqueta del resultado de la partida.
+        - visitas: Lista con las visitas de la búsqueda en cada estado (ver jugar_partida), o None si no se conocen. El csv no las guarda.
+        '''
+
+        if self.binario:
+            escribir_registros(self.archivo, historial, recompensa)
+            escribir_visitas(self.archivo_visitas, visitas if visitas is not None else [None] * len(historial))
+        else:
+            escribir_partida(self.writer, historial, recompensa)
+
+    def vaciar(self):
+        '''
+        Esta función escribe en disco lo que quede en los búferes de los archivos.
+        '''
+
+        self.archivo.flush()
+        if self.archivo_visitas is not None:
+            self.archivo_visitas.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *excepcion):
+        self.archivo.close()
+        if self.archivo_visitas is not None:
+            self.archivo_visitas.close()
+
+def generar_csv_desde_mcts(ruta_csv, num_partidas, jugador=1, iteraciones=50, procesos=1):
     '''
     Esta es la función principal del agente. Devuelve un archivo .csv en el que cada fila representa un estado del tablero (64 números con el 
-    valor de cada casilla) y una etiqueta basada en la última fila de la partida a la que pertenecen.
+    valor de cada casilla) y una etiqueta basada en la última fila de la partida a la que pertenecen. Si la ruta termina en ".bin", los
+    estados se escriben en el formato binario compacto (ver EscritorPartidas).
 
     PARÁMETROS
     - ruta_csv: Cadena que representa el archivo en el que serán almacenados los datos. Hay que tener en cuenta que este script se ejecuta desde
@@ -56,82 +173,160 @@ def generar_csv_desde_mcts(ruta_csv, num_partidas, jugador=1, iteraciones=50):
     - num_partidas: Número de partidas a generar.
     - jugador: Jugador que va a ser entrenado
     - iteraciones: Entero que indicará al algoritmo MCTS cuántas iteraciones realizar.
+    - procesos: Número de procesos con los que se realiza cada búsqueda MCTS (paralelismo en la raíz). 1 por defecto.
     '''
 
-    with open(ruta_csv, mode='w', newline='') as archivo:
-        writer = csv.writer(archivo)
+    # Si se ha construido el libro de aperturas, las primeras jugadas salen de él (elegidas al azar según su peso, así que
+    # las partidas empiezan de formas distintas sin gastar tiempo de búsqueda)
+    libro = cargar_libro()
+    with EscritorPartidas(ruta_csv) as escritor:
 
         # Para cada partida
         for num in range(num_partidas):
-            estado = [[0,0,0,0,0,0,0,0],
-                      [0,0,0,0,0,0,0,0],
-                      [0,0,0,0,0,0,0,0],
-                      [0,0,0,1,2,0,0,0],
-                      [0,0,0,2,1,0,0,0],
-                      [0,0,0,0,0,0,0,0],
-                      [0,0,0,0,0,0,0,0],
-                      [0,0,0,0,0,0,0,0]]
-            turno = 2  # negras empiezan
-            historial = [] # Historial de estados del tablero durante la partida
-
-            while no_terminal(estado, turno):
-
-                historial.append(copy.deepcopy(estado)) # Se añade el estado al historial de estados
-
-                if turno == jugador: # En el turno del jugador a entrenar
-                    accion = mcts(estado, turno, iteraciones) # Escoger la acción basándose en el algoritmo MCTS
-                    if accion is None: # Si no hay acción posible, se pasa turno
-                        turno = 3 - turno
-                        continue
-                else: # En el turno del contrincante
-                    acciones = movimientos_disponibles(estado, turno)
-                    if acciones:
-                        accion = random.choice(acciones) # Se realiza un movimiento aleatorio, en caso de tener acciones disponibles
-                    else:
-                        turno = 3 - turno # Si no se puede hacer nada, se pasa turno
-                        continue
-
-                estado[accion[0]][accion[1]] = turno # Se coloca la ficha en el lugar elegido
-
-                # Se voltean las fichas y se pasa turno
-                fichas_a_voltear = obtener_fichas_a_voltear(estado, accion[0], accion[1], turno)
-                for (f, c) in fichas_a_voltear:
-                    estado[f][c] = turno
-                turno = 3 - turno
-
-            historial.append(copy.deepcopy(estado)) # Se añade al historial el estado final de la partida
+            sesion = SesionMCTS(procesos=procesos, libro=libro) # Conserva el árbol de búsqueda entre las jugadas de la partida
+            historial, estado, visitas = jugar_partida(sesion, jugador, iteraciones)
             recompensa = evaluar_final(estado, jugador) # Se evalua si el jugador a entrenar ha ganado o ha perdido
 
-            # Se muestra en la consola para cada partida: la partida, el estado final del tablero (hay que tener en cuenta que la variable 
-            # "estado" almacena, en este momento, el estado final de la partida), la cantidad de fichas de cada color y la etiqueta resultante.
-            print(f"\n Partida {num + 1}:")
-            print("Estado final del tablero:")
-            for fila in estado:
-                print(fila)
-            blancos = sum(f.count(1) for f in estado)
-            negros = sum(f.count(2) for f in estado)
-            print(f"Fichas blancas (1): {blancos}")
-            print(f"Fichas negras (2): {negros}")
-            print(f"Etiqueta asignada (desde perspectiva del jugador {jugador}): {recompensa}")
-
-            # Se escribe en el csv una fila por cada estado (tablero) almacenado, incluyendo las casillas del tablero 
-            # y la etiqueta obtenida a partir del estado final.
-            for tablero in historial:
-                fila = tablero_a_fila(tablero, recompensa)
-                writer.writerow(fila)
+            # Se muestra en la consola para cada partida: la partida, el estado final del tablero, la cantidad de fichas de cada color
+            # y la etiqueta resultante.
+            mostrar_partida(num, estado, jugador, recompensa)
+
+            escritor.escribir(historial, recompensa, visitas)
+
+def mostrar_partida(num, estado, jugador, recompensa):
+    '''
+    Esta función muestra en la consola el número de la partida, el estado final del tablero, la cantidad de fichas de cada color y la etiqueta resultante.
+
+    PARÁMETROS
+    - num: Número de la partida (empezando en 0).
+    - estado: Matriz 8x8 con el tablero final de la partida.
+    - jugador: Jugador entrenado.
+    - recompensa: Etiqueta asignada a la partida.
+    '''
+
+    print(f"\n Partida {num + 1}:")
+    print("Estado final del tablero:")
+    for fila in estado:
+        print(fila)
+    blancos = sum(f.count(1) for f in estado)
+    negros = sum(f.count(2) for f in estado)
+    print(f"Fichas blancas (1): {blancos}")
+    print(f"Fichas negras (2): {negros}")
+    print(f"Etiqueta asignada (desde perspectiva del jugador {jugador}): {recompensa}")
+
+
+def trabajador_autojuego(clase_sesion, ruta_fragmento, num_partidas, jugador, iteraciones, semilla, progreso):
+    '''
+    Esta función es la que ejecuta cada proceso de generar_en_paralelo: juega sus partidas con su propia semilla y las escribe en su
+    propio fragmento (un archivo independiente, del mismo formato que el final), avisando por la cola "progreso" cada vez que termina una partida.
+
+    PARÁMETROS
+    - clase_sesion: Clase de sesión de búsqueda (SesionMCTS del motor clásico o del neuronal) del jugador a entrenar.
+    - ruta_fragmento: Ruta del archivo en el que escribe este proceso.
+    - num_partidas: Número de partidas a jugar por este proceso.
+    - jugador: Jugador que va a ser entrenado.
+    - iteraciones: Entero que indicará al algoritmo MCTS cuántas iteraciones realizar.
+    - semilla: Semilla de los números aleatorios del proceso (búsqueda y contrincante).
+    - progreso: Cola (multiprocessing.Queue) en la que se avisa de cada partida terminada.
+    '''
+
+    random.seed(semilla)
+    libro = cargar_libro()
+    with EscritorPartidas(ruta_fragmento) as escritor:
+        for _ in range(num_partidas):
+            historial, estado, visitas = jugar_partida(clase_sesion(libro=libro), jugador, iteraciones)
+            escritor.escribir(historial, evaluar_final(estado, jugador), visitas)
+            escritor.vaciar() # Así una partida terminada no se pierde aunque se interrumpa la generación
+            progreso.put(1)
+
+def unir_fragmentos(rutas_fragmentos, ruta_salida, borrar=True):
+    '''
+    Esta función une varios fragmentos en un único archivo, en el orden dado, y si se indica borra los fragmentos.
+
+    PARÁMETROS
+    - rutas_fragmentos: Lista de rutas de los fragmentos.
+    - ruta_salida: Ruta del archivo resultante.
+    - borrar: Si es True, se borran los fragmentos tras unirlos. True por defecto.
+    '''
+
+    with open(ruta_salida, mode='wb') as salida:
+        for ruta in rutas_fragmentos:
+            with open(ruta, mode='rb') as fragmento:
+                shutil.copyfileobj(fragmento, salida)
+    if borrar:
+        for ruta in rutas_fragmentos:
+            os.remove(ruta)
+
+def generar_en_paralelo(ruta_csv, num_partidas, jugador=1, iteraciones=50, trabajadores=None, clase_sesion=SesionMCTS, semilla=None):
+    '''
+    Esta función genera los mismos datos que generar_csv_desde_mcts, pero repartiendo las partidas entre varios procesos que juegan a la vez.
+    Cada proceso juega con su propia semilla y escribe su propio fragmento (por ejemplo "datos.parte0.bin" para "datos.bin"); al terminar todos, los fragmentos
+    se unen en ruta_csv. Como ni el csv ni el formato binario tienen cabecera, unir los fragmentos es concatenarlos. Mientras tanto se muestra el número de partidas terminadas y las partidas por segundo.
+
+    PARÁMETROS
+    - ruta_csv: Cadena que representa el archivo en el que serán almacenados los datos (en formato binario si termina en ".bin").
+    - num_partidas: Número total de partidas a generar.
+    - jugador: Jugador que va a ser entrenado.
+    - iteraciones: Entero que indicará al algoritmo MCTS cuántas iteraciones realizar.
+    - trabajadores: Número de procesos. Por defecto, uno por núcleo.
+    - clase_sesion: Clase de sesión de búsqueda del jugador a entrenar. SesionMCTS (motor clásico) por defecto.
+    - semilla: Semilla base (el proceso i usa semilla + i). Si no se indica, se elige una al azar.
+    '''
+
+    trabajadores = min(trabajadores or multiprocessing.cpu_count(), num_partidas)
+    if semilla is None:
+        semilla = random.getrandbits(32)
+
+    # Se reparten las partidas lo más igualadas posible entre los procesos
+    reparto = [num_partidas // trabajadores + (1 if i < num_partidas % trabajadores else 0) for i in range(trabajadores)]
+    base, extension = os.path.splitext(ruta_csv)
+    rutas_fragmentos = [f"{base}.parte{i}{extension}" for i in range(trabajadores)]
+    progreso = multiprocessing.Queue()
+    procesos = [multiprocessing.Process(target=trabajador_autojuego,
+                                        args=(clase_sesion, ruta, partidas, jugador, iteraciones, semilla + i, progreso))
+                for i, (ruta, partidas) in enumerate(zip(rutas_fragmentos, reparto))]
+    for proceso in procesos:
+        proceso.start()
+
+    # Se cuentan las partidas terminadas según van llegando los avisos de los procesos
+    # (el progreso se muestra como mucho una vez por segundo, para no llenar la consola en generaciones largas)
+    inicio = time.perf_counter()
+    ultimo_aviso = inicio
+    terminadas = 0
+    while terminadas < num_partidas:
+        try:
+            terminadas += progreso.get(timeout=1)
+        except queue.Empty:
+            if not any(proceso.is_alive() for proceso in procesos):
+                raise RuntimeError("Los procesos de generación han terminado antes de jugar todas las partidas")
+        ahora = time.perf_counter()
+        if ahora - ultimo_aviso >= 1 or terminadas == num_partidas:
+            ultimo_aviso = ahora
+            print(f"\rPartidas: {terminadas}/{num_partidas} ({terminadas / (ahora - inicio):.2f} partidas/s)", end='', flush=True)
+    print()
+
+    for proceso in procesos:
+        proceso.join()
+    unir_fragmentos(rutas_fragmentos, ruta_csv)
+    if extension == '.bin':
+        unir_fragmentos([ruta_visitas(ruta) for ruta in rutas_fragmentos], ruta_visitas(ruta_csv))
 
 
 def main():
 
-    ruta_salida = 'datos/datos_otelo.csv'
+    ruta_salida = 'datos/datos_otelo.bin' # Con la extensión .csv se genera en csv
     num_partidas = 20
     jugador = 1
     iteraciones = 20
+    trabajadores = 1 # Con más de un proceso, las partidas se juegan en paralelo (ver generar_en_paralelo)
     nombre_jugador = 'blanco' if jugador == 1 else 'negro'
 
     print(f"Generando {num_partidas} partidas para el jugador {nombre_jugador}...")
-    generar_csv_desde_mcts(ruta_salida, num_partidas, jugador, iteraciones)
-    print(f"CSV generado en '{ruta_salida}' con {num_partidas} partidas.")
+    if trabajadores > 1:
+        generar_en_paralelo(ruta_salida, num_partidas, jugador, iteraciones, trabajadores)
+    else:
+        generar_csv_desde_mcts(ruta_salida, num_partidas, jugador, iteraciones)
+    print(f"Datos generados en '{ruta_salida}' con {num_partidas} partidas.")
 
 if __name__ == '__main__':
     main()
@@ -5,19 +5,21 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 # Imports
 import csv
-import copy
 import random
 from mcts.motor_mcts import *
-from mcts.motor_mcts_neuronal import mcts as mcts_red_neuronal
+from mcts.motor_mcts_neuronal import SesionMCTS as SesionMCTSNeuronal
 from mcts.agente_mcts import *
+import mcts.agente_mcts as agente_mcts
 
 from utiles.fichas import *
+from utiles.posicion import *
 
 
-def generar_csv_desde_mcts(ruta_csv, num_partidas, jugador=1, iteraciones=50):
+def generar_csv_desde_mcts(ruta_csv, num_partidas, jugador=1, iteraciones=50, procesos=1):
     '''
     Esta es la función principal del agente. Devuelve un archivo .csv en el que cada fila representa un estado del tablero (64 números con el 
-    valor de cada casilla) y una etiqueta basada en la última fila de la partida a la que pertenecen.
+    valor de cada casilla) y una etiqueta basada en la última fila de la partida a la que pertenecen. Si la ruta termina en ".bin", los
+    estados se escriben en el formato binario compacto (ver EscritorPartidas en mcts/agente_mcts).
 
     PARÁMETROS
     - ruta_csv: Cadena que representa el archivo en el que serán almacenados los datos. Hay que tener en cuenta que este script se ejecuta desde
@@ -25,82 +27,48 @@ def generar_csv_desde_mcts(ruta_csv, num_partidas, jugador=1, iteraciones=50):
     - num_partidas: Número de partidas a generar.
     - jugador: Jugador que va a ser entrenado
     - iteraciones: Entero que indicará al algoritmo MCTS cuántas iteraciones realizar.
+    - procesos: Número de procesos con los que se realiza cada búsqueda MCTS (paralelismo en la raíz). 1 por defecto.
     '''
 
-    with open(ruta_csv, mode='w', newline='') as archivo:
-        writer = csv.writer(archivo)
+    libro = cargar_libro() # Libro de aperturas, si se ha construido (ver generar_csv_desde_mcts en mcts/agente_mcts)
+    with EscritorPartidas(ruta_csv) as escritor:
 
         # Para cada partida
         for num in range(num_partidas):
-            estado = [[0,0,0,0,0,0,0,0],
-                      [0,0,0,0,0,0,0,0],
-                      [0,0,0,0,0,0,0,0],
-                      [0,0,0,1,2,0,0,0],
-                      [0,0,0,2,1,0,0,0],
-                      [0,0,0,0,0,0,0,0],
-                      [0,0,0,0,0,0,0,0],
-                      [0,0,0,0,0,0,0,0]]
-            turno = 2  # negras empiezan
-            historial = [] # Historial de estados del tablero durante la partida
-
-            while no_terminal(estado, turno):
-
-                historial.append(copy.deepcopy(estado)) # Se añade el estado al historial de estados
-
-                if turno == jugador: # En el turno del jugador a entrenar
-                    accion = mcts_red_neuronal(estado, turno, iteraciones) # Escoger la acción basándose en el algoritmo MCTS
-                    if accion is None: # Si no hay acción posible, se pasa turno
-                        turno = 3 - turno
-                        continue
-                else: # En el turno del contrincante
-                    acciones = movimientos_disponibles(estado, turno)
-                    if acciones:
-                        accion = random.choice(acciones) # Se realiza un movimiento aleatorio, en caso de tener acciones disponibles
-                    else:
-                        turno = 3 - turno # Si no se puede hacer nada, se pasa turno
-                        continue
-
-                estado[accion[0]][accion[1]] = turno # Se coloca la ficha en el lugar elegido
-
-                # Se voltean las fichas y se pasa turno
-                fichas_a_voltear = obtener_fichas_a_voltear(estado, accion[0], accion[1], turno)
-                for (f, c) in fichas_a_voltear:
-                    estado[f][c] = turno
-                turno = 3 - turno
-
-            historial.append(copy.deepcopy(estado)) # Se añade al historial el estado final de la partida
+            sesion = SesionMCTSNeuronal(procesos=procesos, libro=libro) # Conserva el árbol de búsqueda entre las jugadas de la partida
+            historial, estado, visitas = jugar_partida(sesion, jugador, iteraciones)
             recompensa = evaluar_final(estado, jugador) # Se evalua si el jugador a entrenar ha ganado o ha perdido
 
-            # Se muestra en la consola para cada partida: la partida, el estado final del tablero (hay que tener en cuenta que la variable 
-            # "estado" almacena, en este momento, el estado final de la partida), la cantidad de fichas de cada color y la etiqueta resultante.
-            print(f"\n Partida {num + 1}:")
-            print("Estado final del tablero:")
-            for fila in estado:
-                print(fila)
-            blancos = sum(f.count(1) for f in estado)
-            negros = sum(f.count(2) for f in estado)
-            print(f"Fichas blancas (1): {blancos}")
-            print(f"Fichas negras (2): {negros}")
-            print(f"Etiqueta asignada (desde perspectiva del jugador {jugador}): {recompensa}")
-
-            # Se escribe en el csv una fila por cada estado (tablero) almacenado, incluyendo las casillas del tablero 
-            # y la etiqueta obtenida a partir del estado final.
-            for tablero in historial:
-                fila = tablero_a_fila(tablero, recompensa)
-                writer.writerow(fila)
+            # Se muestra en la consola para cada partida: la partida, el estado final del tablero, la cantidad de fichas de cada color
+            # y la etiqueta resultante.
+            mostrar_partida(num, estado, jugador, recompensa)
+
+            escritor.escribir(historial, recompensa, visitas)
+
+def generar_en_paralelo(ruta_csv, num_partidas, jugador=1, iteraciones=50, trabajadores=None, semilla=None):
+    '''
+    Esta función es generar_en_paralelo del agente clásico (ver mcts/agente_mcts), pero con el jugador a entrenar buscando con
+    MCTS + red neuronal. Cada proceso usa su propia copia del modelo.
+    '''
+
+    agente_mcts.generar_en_paralelo(ruta_csv, num_partidas, jugador, iteraciones, trabajadores, SesionMCTSNeuronal, semilla)
 
 
 def main():
 
-    ruta_salida = 'datos/datos_otelo_red_neuronal.csv'
+    ruta_salida = 'datos/datos_otelo_red_neuronal.bin' # Con la extensión .csv se genera en csv
     num_partidas = 20
     jugador = 1
     iteraciones = 20
+    trabajadores = 1 # Con más de un proceso, las partidas se juegan en paralelo (ver generar_en_paralelo)
     nombre_jugador = 'blanco' if jugador == 1 else 'negro'
 
     print(f"Generando {num_partidas} partidas para el jugador {nombre_jugador}...")
-    generar_csv_desde_mcts(ruta_salida, num_partidas, jugador, iteraciones)
-    print(f"CSV generado en '{ruta_salida}' con {num_partidas} partidas.")
+    if trabajadores > 1:
+        generar_en_paralelo(ruta_salida, num_partidas, jugador, iteraciones, trabajadores)
+    else:
+        generar_csv_desde_mcts(ruta_salida, num_partidas, jugador, iteraciones)
+    print(f"Datos generados en '{ruta_salida}' con {num_partidas} partidas.")
 
 if __name__ == '__main__':
     main()
@@ -0,0 +1,354 @@
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+# Imports
+from math import sqrt, log
+import time
+import numpy as np
+from utiles.bitboard import analizar_bb, casillas, volteos_bb
+from mcts.motor_mcts import SesionMCTS as SesionMCTSClasica, recompensa
+from mcts.solucionador_final import UMBRAL_FINAL
+
+# Movimiento del hijo al que se llega pasando turno (las casillas van de 0 a 63)
+PASAR = 64
+
+# Valor de primer_hijo de un nodo que aún no se ha expandido
+SIN_EXPANDIR = -1
+
+# Campos del árbol: (nombre, tipo de NumPy). Cada uno es un array con un elemento por nodo.
+CAMPOS = (
+    ('visitas', np.int32),
+    ('suma', np.float64),
+    ('padre', np.int32),
+    ('primer_hijo', np.int32),
+    ('num_hijos', np.uint8),
+    ('movimiento', np.uint8),
+    ('propias', np.uint64),
+    ('rivales', np.uint64),
+    ('turno', np.uint8),
+)
+
+
+class ArbolCompacto:
+    def __init__(self, capacidad=2**16):
+        '''
+        Esta clase guarda un árbol de MCTS en arrays de NumPy, un array por campo con un elemento por nodo, en lugar de un objeto
+        Nodo por nodo. Cada nodo es un índice, y ocupa unos 40 bytes en total frente a los cientos de bytes de un Nodo con sus
+        listas. El tablero de cada nodo se guarda como dos bitboards (enteros de 64 bits).
+
+        Los hijos de un nodo se crean todos a la vez al expandirlo y ocupan posiciones consecutivas (de primer_hijo a
+        primer_hijo + num_hijos - 1), así que sus estadísticas están juntas en memoria y se leen de una vez al elegir entre
+        ellos. El árbol es un árbol puro (sin transposiciones): cada nodo tiene un único padre.
+
+        Los arrays se reservan de antemano y se duplican cuando se llenan. Entre búsquedas no se liberan: reiniciar sólo vuelve
+        a empezar a llenarlos desde el principio.
+
+        ATRIBUTOS
+        - capacidad: Número de nodos que caben en los arrays reservados.
+        - tamano: Número de nodos usados.
+        - visitas: Visitas de cada nodo.
+        - suma: Suma de las recompensas de cada nodo, desde el punto de vista del jugador que ha hecho el movimiento que lleva
+          a él (el que no tiene el turno en el nodo, salvo en la raíz).
+        - padre: Índice del padre de cada nodo (-1 en la raíz).
+        - primer_hijo: Índice del primer hijo de cada nodo, o SIN_EXPANDIR si aún no se ha expandido.
+        - num_hijos: Número de hijos de cada nodo expandido (0 si la posición es final).
+        - movimiento: Casilla del movimiento que lleva a cada nodo desde su padre, o PASAR.
+        - propias: Bitboard de las fichas del jugador que tiene el turno en cada nodo.
+        - rivales: Bitboard de las fichas del otro jugador.
+        - turno: Turno de cada nodo (1: blancas, 2: negras).
+        '''
+        self.capacidad = capacidad
+        self.tamano = 0
+        for nombre, tipo in CAMPOS:
+            setattr(self, nombre, np.zeros(capacidad, tipo))
+
+    def __len__(self):
+        return self.tamano
+
+    def reservar(self, nodos):
+        '''
+        Esta función se asegura de que caben "nodos" nodos más, duplicando la capacidad de los arrays las veces que haga falta.
+
+        PARÁMETROS
+        - nodos: Número de nodos que se van a añadir.
+        '''
+
+        if self.tamano + nodos <= self.capacidad:
+            return
+        capacidad = self.capacidad
+        while self.tamano + nodos > capacidad:
+            capacidad *= 2
+        for nombre, tipo in CAMPOS:
+            nuevo = np.zeros(capacidad, tipo)
+            nuevo[:self.tamano] = getattr(self, nombre)[:self.tamano]
+            setattr(self, nombre, nuevo)
+        self.capacidad = capacidad
+
+    def reiniciar(self, propias, rivales, turno):
+        '''
+        Esta función vacía el árbol (sin liberar los arrays) y crea la raíz, que es el nodo 0.
+
+        PARÁMETROS
+        - propias: Bitboard de las fichas del jugador que tiene el turno en la raíz.
+        - rivales: Bitboard de las fichas del otro jugador.
+        - turno: Turno de la raíz (1: blancas, 2: negras).
+        '''
+
+        self.tamano = 1
+        self.visitas[0] = 0
+        self.suma[0] = 0
+        self.padre[0] = -1
+        self.primer_hijo[0] = SIN_EXPANDIR
+        self.num_hijos[0] = 0
+        self.movimiento[0] = PASAR
+        self.propias[0] = propias
+        self.rivales[0] = rivales
+        self.turno[0] = turno
+
+    def expandir(self, nodo):
+        '''
+        Esta función crea todos los hijos de un nodo, en posiciones consecutivas al final de los arrays, y devuelve cuántos ha
+        creado. Si el jugador del nodo no puede mover pero el otro sí, el único hijo es el de pasar turno; si la posición es
+        final, el nodo queda expandido sin hijos.
+
+        PARÁMETROS
+        - nodo: Índice del nodo a expandir.
+        '''
+
+        propias, rivales = int(self.propias[nodo]), int(self.rivales[nodo])
+        movimientos, rival_puede_mover, _ = analizar_bb(propias, rivales)
+        if movimientos:
+            movimientos = casillas(movimientos)
+            hijos_propias, hijos_rivales = [], []
+            for casilla in movimientos:
+                volteadas = volteos_bb(propias, rivales, casilla)
+                # En el hijo el turno es del otro jugador, así que sus "propias" son las rivales del nodo tras el movimiento
+                hijos_propias.append(rivales ^ volteadas)
+                hijos_rivales.append(propias | (1 << casilla) | volteadas)
+        elif rival_puede_mover:
+            movimientos, hijos_propias, hijos_rivales = [PASAR], [rivales], [propias]
+        else:
+            movimientos = hijos_propias = hijos_rivales = []
+
+        k = len(movimientos)
+        self.reservar(k)
+        inicio, fin = self.tamano, self.tamano + k
+        self.visitas[inicio:fin] = 0
+        self.suma[inicio:fin] = 0
+        self.padre[inicio:fin] = nodo
+        self.primer_hijo[inicio:fin] = SIN_EXPANDIR
+        self.num_hijos[inicio:fin] = 0
+        self.movimiento[inicio:fin] = movimientos
+        self.propias[inicio:fin] = hijos_propias
+        self.rivales[inicio:fin] = hijos_rivales
+        self.turno[inicio:fin] = 3 - self.turno[nodo]
+        self.primer_hijo[nodo] = inicio
+        self.num_hijos[nodo] = k
+        self.tamano = fin
+        return k
+
+    def seleccionar(self, nodo, c=1.41):
+        '''
+        Esta función devuelve el índice del hijo de un nodo expandido con el mayor valor de UCT, con la misma fórmula que
+        indice_mejor_hijo del motor clásico: q / n + c * sqrt(2 * log(N) / n), con N las visitas del nodo y n las del hijo.
+        La parte que sólo depende del padre, c * sqrt(2 * log(N)), se calcula una vez para todos los hijos, y las visitas y
+        sumas de los hijos se leen de sus arrays contiguos de una sola vez. Un hijo sin visitas se elige antes que cualquiera
+        con visitas: se devuelve el primero que se encuentre.
+
+        Con los pocos hijos que tiene un nodo de Othello (unos 10), recorrerlos en Python es más rápido que evaluar UCT con
+        una expresión de NumPy, cuyo coste fijo por llamada es mayor que el de todo el bucle.
+
+        PARÁMETROS
+        - nodo: Índice del nodo padre. Debe estar expandido y tener algún hijo.
+        - c: Constante de exploración. 1.41 por defecto.
+        '''
+
+        inicio = self.primer_hijo.item(nodo)
+        fin = inicio + self.num_hijos.item(nodo)
+        exploracion = c * sqrt(2 * log(self.visitas.item(nodo))) if self.visitas.item(nodo) > 0 else 0.0
+        elegido = 0
+        mejor = float('-inf')
+        for i, (n, q) in enumerate(zip(self.visitas[inicio:fin].tolist(), self.suma[inicio:fin].tolist())):
+            if n == 0:
+                return inicio + i
+            uct = q / n + exploracion / sqrt(n)
+            if uct > mejor:
+                mejor = uct
+                elegido = i
+        return inicio + elegido
+
+    def retropropagar(self, camino, recompensa):
+        '''
+        Esta función suma una visita y la recompensa a todos los nodos del camino. La recompensa se da desde el punto de vista
+        del jugador con el turno en el último nodo, así que cada nodo la recibe con el signo del jugador que ha movido hasta él.
+
+        PARÁMETROS
+        - camino: Lista de índices de los nodos recorridos, desde la raíz hasta la hoja evaluada.
+        - recompensa: Recompensa de la hoja.
+        '''
+
+        indices = np.array(camino)
+        turnos = self.turno[indices]
+        self.visitas[indices] += 1
+        self.suma[indices] += np.where(turnos == turnos[-1], -recompensa, recompensa)
+
+    def hijos(self, nodo):
+        '''
+        Esta función devuelve el rango de índices de los hijos de un nodo (vacío si no está expandido).
+
+        PARÁMETROS
+        - nodo: Índice del nodo.
+        '''
+
+        inicio = int(self.primer_hijo[nodo])
+        if inicio == SIN_EXPANDIR:
+            return range(0)
+        return range(inicio, inicio + int(self.num_hijos[nodo]))
+
+    def memoria(self):
+        '''
+        Esta función devuelve los bytes que ocupan los arrays reservados.
+        '''
+
+        return sum(getattr(self, nombre).nbytes for nombre, _ in CAMPOS)
+
+
+class SesionMCTS(SesionMCTSClasica):
+    def __init__(self, procesos=1, umbral_final=UMBRAL_FINAL, libro=None, simulaciones=1, capacidad=2**16, c=1.41):
+        '''
+        Esta clase es una sesión de búsqueda del motor clásico (simulaciones aleatorias y UCT) que guarda el árbol en un
+        ArbolCompacto en lugar de en objetos Nodo. Usa mucha menos memoria por nodo, y los arrays se reutilizan de una búsqueda
+        a la siguiente. Se usa igual que SesionMCTS del motor clásico (solucionador final, libro, varios procesos), salvo que
+        no hay tabla de transposiciones y el árbol empieza vacío en cada búsqueda.
+
+        A diferencia del motor clásico, cada nodo acumula las recompensas desde el punto de vista del jugador que ha movido hasta
+        él, y la selección en cada nivel elige lo mejor para el jugador que mueve.
+
+        ATRIBUTOS
+        - arbol: ArbolCompacto de la sesión.
+        - c: Constante de exploración de UCT.
+        - Los de SesionMCTS.
+        '''
+        super().__init__(False, None, procesos, umbral_final, libro, simulaciones)
+        self.arbol = ArbolCompacto(capacidad)
+        self.c = c
+
+    def opciones(self):
+        return {'umbral_final': self.umbral_final, 'simulaciones': self.simulaciones, 'capacidad': self.arbol.capacidad,
+                'c': self.c}
+
+    def nueva_raiz(self, pos):
+        '''
+        Esta función vacía el árbol y crea la raíz con la posición dada. Devuelve el índice de la raíz (0).
+
+        PARÁMETROS
+        - pos: Posición (Posicion) desde la que se va a buscar.
+        '''
+
+        self.arbol.reiniciar(pos.propias, pos.rivales, pos.turno)
+        return 0
+
+    def iterar(self, root, pos, presupuesto, estadisticas=None):
+        '''
+        Esta función realiza las iteraciones del algoritmo MCTS sobre el árbol compacto hasta agotar el presupuesto. En cada una
+        baja por UCT desde la raíz hasta un nodo sin visitas, o hasta un nodo visitado sin expandir, que se expande y del que
+        se toma el primer hijo. La hoja se evalúa con una simulación desde sus bitboards, así que la posición no se modifica.
+        Devuelve la tupla (iteraciones hechas, nodos nuevos creados).
+
+        PARÁMETROS
+        - root: Índice del nodo raíz.
+        - pos: Posición (Posicion) correspondiente a la raíz.
+        - presupuesto: Presupuesto (iteraciones, tiempo o nodos) de la búsqueda.
+        - estadisticas: EstadisticasBusqueda en la que anotar el tiempo de cada fase, la profundidad de cada hoja y la longitud
+          de cada simulación, o None (por defecto) para no medir nada (ver SesionMCTS.iterar del motor clásico).
+        '''
+
+        arbol = self.arbol
+        medir = estadisticas is not None
+        tiempos = estadisticas.tiempos if medir else None
+        i = 0
+        nodos = 0
+        while not presupuesto.agotado(i, nodos):
+            if medir:
+                inicio = time.perf_counter()
+                expansion = 0.0
+            nodo = root
+            camino = [nodo]
+            while True:
+                if arbol.primer_hijo.item(nodo) == SIN_EXPANDIR:
+                    # Un nodo nuevo se evalúa tal cual; sólo se expande cuando se vuelve a llegar a él (la raíz, siempre)
+                    if arbol.visitas.item(nodo) == 0 and nodo != root:
+                        break
+                    if medir:
+                        inicio_expansion = time.perf_counter()
+                    nodos += arbol.expandir(nodo)
+                    if medir:
+                        expansion += time.perf_counter() - inicio_expansion
+                if arbol.num_hijos.item(nodo) == 0:
+                    break # Posición final
+                nodo = arbol.seleccionar(nodo, self.c)
+                camino.append(nodo)
+                if arbol.visitas.item(nodo) == 0:
+                    break
+            if medir:
+                tiempos['seleccion'] += time.perf_counter() - inicio - expansion
+                tiempos['expansion'] += expansion
+                estadisticas.anadir_hoja(len(camino) - 1)
+
+            valor = recompensa(arbol.propias.item(nodo), arbol.rivales.item(nodo), self.umbral_final, self.simulaciones,
+                               estadisticas)
+            if medir:
+                inicio = time.perf_counter()
+            arbol.retropropagar(camino, valor)
+            if medir:
+                tiempos['retropropagacion'] += time.perf_counter() - inicio
+            i += 1
+
+        return i, nodos
+
+    def movimiento_raiz(self):
+        '''
+        Esta función devuelve la tupla (movimiento, visitas) de la raíz de la última búsqueda (ver SesionMCTS.movimiento_raiz).
+        El movimiento es el de mejor recompensa media, o el más visitado si por_visitas es True.
+        '''
+
+        estadisticas = self.estadisticas_raiz()
+        visitados = [(n if self.por_visitas else q / n, m) for m, (n, q) in estadisticas.items() if n > 0]
+        movimiento = None
+        if visitados:
+            _, casilla = max(visitados)
+            movimiento = (casilla >> 3, casilla & 7)
+        return movimiento, {m: n for m, (n, _) in estadisticas.items()}
+
+    def estadisticas_raiz(self):
+        '''
+        Esta función devuelve un diccionario {casilla: (n, q)} con las visitas y la recompensa total de cada hijo de la raíz.
+        Si en la raíz sólo se puede pasar, está vacío.
+        '''
+
+        arbol = self.arbol
+        hijos = arbol.hijos(0)
+        return {m: (n, q) for m, n, q in zip(arbol.movimiento[hijos.start:hijos.stop].tolist(),
+                                             arbol.visitas[hijos.start:hijos.stop].tolist(),
+                                             arbol.suma[hijos.start:hijos.stop].tolist()) if m != PASAR}
+
+    def reiniciar(self):
+        '''
+        Esta función descarta el árbol, por ejemplo al empezar una partida nueva.
+        '''
+
+        self.raiz = None
+        self.arbol.tamano = 0
+
+
+def mcts(tablero, turno, iteraciones=50, procesos=1, tiempo=None, max_nodos=None, con_info=False, umbral_final=UMBRAL_FINAL,
+         libro=None, simulaciones=1, estadisticas=None):
+    '''
+    Esta función busca el mejor movimiento dado un tablero y un turno con el árbol compacto (ver SesionMCTS de este módulo).
+    Los parámetros y el resultado son los de mcts del motor clásico, sin los de la tabla de transposiciones.
+    '''
+
+    return SesionMCTS(procesos, umbral_final, libro, simulaciones).buscar(tablero, turno, iteraciones, tiempo, max_nodos, con_info,
+                                                                          estadisticas=estadisticas)
@@ -0,0 +1,338 @@
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+# Imports
+import multiprocessing
+import random
+import time
+from math import log, log10, sqrt
+from utiles.bitboard import casillas, contar
+from utiles.posicion import posicion_inicial
+from utiles.simetrias import instantanea_canonica
+from mcts.motor_mcts import SesionMCTS
+
+# Valor de la normal estándar para un intervalo de confianza del 95%.
+Z_95 = 1.96
+
+
+class Motor:
+    def __init__(self, nombre, clase_sesion=SesionMCTS, iteraciones=200, tiempo=None, **opciones):
+        '''
+        Esta clase describe uno de los dos motores que se enfrentan en la arena: con qué sesión de búsqueda juega y con qué
+        presupuesto por jugada. Sólo guarda la configuración (se envía a cada proceso); la sesión se crea nueva en cada partida.
+
+        ATRIBUTOS
+        - nombre: Nombre con el que se muestra el motor.
+        - clase_sesion: Clase de sesión de búsqueda (SesionMCTS del motor clásico, del neuronal o del árbol compacto).
+        - iteraciones: Iteraciones por jugada (None para limitar sólo por tiempo).
+        - tiempo: Segundos por jugada (o None).
+        - opciones: Diccionario con los parámetros con los que se crea la sesión (por ejemplo, {'simulaciones': 16}). Las
+          sesiones de la arena deben ser de un único proceso, porque cada partida ya se juega en su propio proceso.
+        '''
+        self.nombre = nombre
+        self.clase_sesion = clase_sesion
+        self.iteraciones = iteraciones
+        self.tiempo = tiempo
+        self.opciones = opciones
+
+    def crear_sesion(self):
+        '''
+        Esta función devuelve una sesión de búsqueda nueva con las opciones del motor.
+        '''
+
+        return self.clase_sesion(**self.opciones)
+
+
+class Marcador:
+    def __init__(self):
+        '''
+        Esta clase lleva el resultado de un enfrentamiento desde el punto de vista del primer motor, y calcula a partir de él la
+        diferencia de Elo estimada y la prueba secuencial SPRT. El SPRT se calcula sobre los pares de partidas de una misma
+        apertura (una con cada color), que no son independientes entre sí: cuenta cuántos pares han sumado 0, 0.5, 1, 1.5 y 2
+        puntos (el recuento pentanomial).
+
+        ATRIBUTOS
+        - victorias: Partidas ganadas por el primer motor.
+        - empates: Partidas empatadas.
+        - derrotas: Partidas perdidas por el primer motor.
+        - pentanomial: Lista con el número de pares completos que han sumado 0, 0.5, 1, 1.5 y 2 puntos.
+        - pendientes: Diccionario {apertura: resultado} con las partidas cuyo par aún no se ha jugado.
+        '''
+        self.victorias = 0
+        self.empates = 0
+        self.derrotas = 0
+        self.pentanomial = [0] * 5
+        self.pendientes = {}
+
+    def anadir(self, resultado, apertura):
+        '''
+        Esta función añade el resultado de una partida.
+
+        PARÁMETROS
+        - resultado: +1 si ha ganado el primer motor, 0 si han empatado y -1 si ha perdido.
+        - apertura: Índice de la apertura de la partida, para emparejarla con la que se juega con los colores cambiados.
+        '''
+
+        if resultado > 0:
+            self.victorias += 1
+        elif resultado == 0:
+            self.empates += 1
+        else:
+            self.derrotas += 1
+
+        if apertura in self.pendientes:
+            self.pentanomial[self.pendientes.pop(apertura) + resultado + 2] += 1
+        else:
+            self.pendientes[apertura] = resultado
+
+    def partidas(self):
+        return self.victorias + self.empates + self.derrotas
+
+    def pares(self):
+        return sum(self.pentanomial)
+
+    def puntuacion(self):
+        '''
+        Esta función devuelve la puntuación media del primer motor (1 por victoria, 0.5 por empate y 0 por derrota).
+        '''
+
+        return (self.victorias + 0.5 * self.empates) / self.partidas()
+
+    def varianza(self):
+        '''
+        Esta función devuelve la varianza de la puntuación de una partida.
+        '''
+
+        media = self.puntuacion()
+        n = self.partidas()
+        return (self.victorias * (1 - media) ** 2 + self.empates * (0.5 - media) ** 2 + self.derrotas * media ** 2) / n
+
+    def elo(self, z=Z_95):
+        '''
+        Esta función devuelve la tupla (diferencia de Elo, límite inferior, límite superior) del primer motor respecto al segundo,
+        con el intervalo de confianza dado por z (95% por defecto). Los límites se obtienen del intervalo de la puntuación media
+        con la aproximación normal, y son infinitos si el intervalo llega a 0 o a 1.
+
+        PARÁMETROS
+        - z: Valor de la normal estándar del intervalo. Z_95 por defecto.
+        '''
+
+        media = self.puntuacion()
+        error = z * sqrt(self.varianza() / self.partidas())
+        return puntuacion_a_elo(media), puntuacion_a_elo(media - error), puntuacion_a_elo(media + error)
+
+    def llr(self, elo0, elo1):
+        '''
+        Esta función devuelve el logaritmo del cociente de verosimilitudes (LLR) de la hipótesis "el primer motor es elo1 puntos
+        mejor" frente a "es elo0 puntos mejor", con la aproximación normal de la puntuación media de cada par de partidas (la del
+        SPRT generalizado que usan los programas de pruebas de motores de ajedrez). Sólo cuentan los pares completos, más dos pares
+        virtuales como prior, uno de 0.5 puntos y otro de 1.5 (de media, tablas): sin ellos, mientras todos los pares acaban igual
+        la varianza es 0 y el LLR se dispara.
+
+        PARÁMETROS
+        - elo0: Diferencia de Elo de la hipótesis nula.
+        - elo1: Diferencia de Elo de la hipótesis alternativa.
+        '''
+
+        if self.pares() == 0:
+            return 0.0
+        recuento = list(self.pentanomial)
+        recuento[1] += 1 # Pares virtuales del prior
+        recuento[3] += 1
+        n = sum(recuento)
+        media = sum(i / 4 * veces for i, veces in enumerate(recuento)) / n
+        varianza = sum((i / 4 - media) ** 2 * veces for i, veces in enumerate(recuento)) / n
+        s0, s1 = elo_a_puntuacion(elo0), elo_a_puntuacion(elo1)
+        return n * (s1 - s0) * (2 * media - s0 - s1) / (2 * varianza)
+
+
+def elo_a_puntuacion(elo):
+    '''
+    Esta función devuelve la puntuación media esperada con una diferencia de Elo dada (modelo logístico).
+
+    PARÁMETROS
+    - elo: Diferencia de Elo.
+    '''
+
+    return 1 / (1 + 10 ** (-elo / 400))
+
+def puntuacion_a_elo(puntuacion):
+    '''
+    Esta función devuelve la diferencia de Elo correspondiente a una puntuación media (inversa de elo_a_puntuacion).
+
+    PARÁMETROS
+    - puntuacion: Puntuación media, entre 0 y 1.
+    '''
+
+    if puntuacion <= 0:
+        return float('-inf')
+    if puntuacion >= 1:
+        return float('inf')
+    return -400 * log10(1 / puntuacion - 1)
+
+def limites_sprt(alfa, beta):
+    '''
+    Esta función devuelve la tupla (límite inferior, límite superior) del LLR del SPRT: por debajo del inferior se acepta la
+    hipótesis nula y por encima del superior la alternativa.
+
+    PARÁMETROS
+    - alfa: Probabilidad de aceptar la alternativa siendo cierta la nula (falso positivo).
+    - beta: Probabilidad de aceptar la nula siendo cierta la alternativa (falso negativo).
+    '''
+
+    return log(beta / (1 - alfa)), log((1 - beta) / alfa)
+
+
+def generar_aperturas(num_aperturas, jugadas=6, semilla=0):
+    '''
+    Esta función devuelve una lista de aperturas distintas, cada una una lista de casillas jugadas al azar desde la posición
+    inicial. Dos aperturas que llevan a posiciones simétricas cuentan como la misma. Si no hay bastantes aperturas distintas
+    con ese número de jugadas, se repiten.
+
+    PARÁMETROS
+    - num_aperturas: Número de aperturas.
+    - jugadas: Número de jugadas de cada apertura. 6 por defecto.
+    - semilla: Semilla de los números aleatorios. 0 por defecto.
+    '''
+
+    azar = random.Random(semilla)
+    aperturas = []
+    vistas = set()
+    intentos = 0
+    while len(aperturas) < num_aperturas:
+        pos = posicion_inicial()
+        apertura = []
+        for _ in range(jugadas):
+            movimientos = casillas(pos.movimientos())
+            if not movimientos:
+                break
+            casilla = azar.choice(movimientos)
+            pos.hacer(casilla)
+            apertura.append(casilla)
+        intentos += 1
+        clave = instantanea_canonica(pos.instantanea())
+        if clave not in vistas or intentos > 100 * num_aperturas:
+            vistas.add(clave)
+            aperturas.append(apertura)
+    return aperturas
+
+def jugar_partida(motor_a, motor_b, apertura, a_negras, semilla):
+    '''
+    Esta función juega una partida entre dos motores desde una apertura y devuelve la tupla (resultado, diferencia) desde el
+    punto de vista del motor A: resultado +1, 0 o -1, y diferencia de fichas al final.
+
+    PARÁMETROS
+    - motor_a: Motor (configuración) A.
+    - motor_b: Motor (configuración) B.
+    - apertura: Lista de casillas que se juegan antes de que empiecen a buscar los motores.
+    - a_negras: Indica si el motor A juega con negras (que mueven primero).
+    - semilla: Semilla de los números aleatorios de la partida.
+    '''
+
+    random.seed(semilla)
+    pos = posicion_inicial()
+    for casilla in apertura:
+        pos.hacer(casilla)
+    sesiones = {2 if a_negras else 1: (motor_a, motor_a.crear_sesion()), 1 if a_negras else 2: (motor_b, motor_b.crear_sesion())}
+
+    while pos.no_terminal():
+        if not pos.movimientos():
+            pos.pasar()
+            continue
+        motor, sesion = sesiones[pos.turno]
+        fila, col = sesion.buscar(pos, pos.turno, motor.iteraciones, motor.tiempo)
+        pos.hacer(fila * 8 + col)
+
+    blancas, negras, _ = pos.instantanea()
+    diferencia = contar(negras) - contar(blancas)
+    if not a_negras:
+        diferencia = -diferencia
+    return (diferencia > 0) - (diferencia < 0), diferencia
+
+def jugar_tarea(tarea):
+    '''
+    Esta función es la que ejecuta cada proceso de la arena: juega la partida descrita por la tarea (ver jugar_partida) y devuelve
+    la tupla (índice de la apertura, resultado, diferencia).
+
+    PARÁMETROS
+    - tarea: Tupla (índice de la apertura, motor_a, motor_b, apertura, a_negras, semilla).
+    '''
+
+    return (tarea[0],) + jugar_partida(*tarea[1:])
+
+def enfrentar(motor_a, motor_b, max_partidas=400, trabajadores=None, jugadas_apertura=6, semilla=None, elo0=0, elo1=30,
+              alfa=0.05, beta=0.05, min_partidas=10, mostrar=True):
+    '''
+    Esta función enfrenta dos motores en muchas partidas jugadas en paralelo, sin interfaz gráfica. Cada apertura se juega dos
+    veces, una con cada motor con negras, para que ni los colores ni la apertura favorezcan a ninguno. Tras cada partida se
+    actualiza el SPRT con los pares de partidas completos, y el enfrentamiento termina en cuanto la prueba decide (o al llegar a
+    max_partidas).
+
+    Devuelve un diccionario con el marcador, la diferencia de Elo de A respecto a B con su intervalo de confianza del 95%, el LLR y
+    la decisión del SPRT: 'H1' (A es al menos elo1 mejor), 'H0' (A no es más de elo0 mejor) o None (sin decidir).
+
+    PARÁMETROS
+    - motor_a, motor_b: Motores (configuraciones) a enfrentar.
+    - max_partidas: Número máximo de partidas. 400 por defecto.
+    - trabajadores: Número de procesos. Por defecto, uno por núcleo.
+    - jugadas_apertura: Número de jugadas al azar de cada apertura (ver generar_aperturas). 6 por defecto.
+    - semilla: Semilla de las aperturas y de las partidas. Si no se indica, se elige una al azar.
+    - elo0, elo1: Diferencias de Elo de las hipótesis nula y alternativa del SPRT. 0 y 30 por defecto.
+    - alfa, beta: Probabilidades de error del SPRT. 0.05 por defecto.
+    - min_partidas: Número de partidas en pares completos antes del cual el SPRT no detiene el enfrentamiento. 10 por defecto.
+    - mostrar: Si es True, se muestra el marcador tras cada partida.
+    '''
+
+    if semilla is None:
+        semilla = random.getrandbits(32)
+    aperturas = generar_aperturas((max_partidas + 1) // 2, jugadas_apertura, semilla)
+    tareas = [(i, motor_a, motor_b, apertura, a_negras, semilla + 2 * i + a_negras)
+              for i, apertura in enumerate(aperturas) for a_negras in (True, False)][:max_partidas]
+    inferior, superior = limites_sprt(alfa, beta)
+
+    marcador = Marcador()
+    diferencia_total = 0
+    decision = None
+    inicio = time.perf_counter()
+    with multiprocessing.Pool(trabajadores or multiprocessing.cpu_count()) as pool:
+        for par, resultado, diferencia in pool.imap_unordered(jugar_tarea, tareas):
+            marcador.anadir(resultado, par)
+            diferencia_total += diferencia
+            llr = marcador.llr(elo0, elo1)
+            if mostrar:
+                elo, elo_min, elo_max = marcador.elo()
+                print(f"\r{motor_a.nombre} vs {motor_b.nombre}: +{marcador.victorias} ={marcador.empates} -{marcador.derrotas}"
+                      f"  Elo {elo:+.0f} [{elo_min:+.0f}, {elo_max:+.0f}]  LLR {llr:.2f} [{inferior:.2f}, {superior:.2f}]  ",
+                      end='', flush=True)
+            if 2 * marcador.pares() >= min_partidas and (llr <= inferior or llr >= superior):
+                decision = 'H1' if llr >= superior else 'H0'
+                break # Al salir del "with" se terminan los procesos y las partidas que quedaban
+    if mostrar:
+        print()
+
+    elo, elo_min, elo_max = marcador.elo()
+    return {'partidas': marcador.partidas(), 'victorias': marcador.victorias, 'empates': marcador.empates,
+            'derrotas': marcador.derrotas, 'puntuacion': marcador.puntuacion(), 'elo': elo, 'elo_min': elo_min,
+            'elo_max': elo_max, 'llr': marcador.llr(elo0, elo1), 'decision': decision,
+            'diferencia_media': diferencia_total / marcador.partidas(), 'tiempo': time.perf_counter() - inicio}
+
+
+def main():
+
+    # Motores a enfrentar. Para el motor con red neuronal: Motor("neuronal", SesionMCTSNeuronal, 200, seleccion="puct"),
+    # importando SesionMCTSNeuronal de mcts/motor_mcts_neuronal. Para el clásico con árbol compacto:
+    # Motor("compacto", SesionMCTSCompacta, 400), importando SesionMCTS de mcts/arbol_compacto como SesionMCTSCompacta.
+    motor_a = Motor("clasico_400", SesionMCTS, 400)
+    motor_b = Motor("clasico_100", SesionMCTS, 100)
+    max_partidas = 400
+    trabajadores = None # Uno por núcleo
+
+    resultado = enfrentar(motor_a, motor_b, max_partidas, trabajadores)
+    decisiones = {'H1': f"{motor_a.nombre} es más fuerte", 'H0': f"{motor_a.nombre} no es más fuerte", None: "sin decidir"}
+    print(f"{resultado['partidas']} partidas en {resultado['tiempo']:.0f} s. Elo de {motor_a.nombre}: {resultado['elo']:+.0f} "
+          f"[{resultado['elo_min']:+.0f}, {resultado['elo_max']:+.0f}]. SPRT: {decisiones[resultado['decision']]}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+# Imports
+import threading
+import time
+
+
+class BusquedaAsincrona:
+    def __init__(self, sesion):
+        '''
+        Esta clase ejecuta las búsquedas de una sesión en un hilo aparte, para que el bucle de pygame siga dibujando y atendiendo
+        eventos mientras la IA piensa. El bucle inicia la búsqueda, comprueba en cada fotograma si ha terminado y recoge entonces
+        el movimiento. La búsqueda se puede cancelar (por ejemplo, al cerrar la ventana) sin esperar a que agote su presupuesto,
+        también si la sesión busca con varios procesos.
+
+        Mientras hay una búsqueda en marcha, el hilo es el único que usa la sesión.
+
+        ATRIBUTOS
+        - sesion: Sesión de búsqueda (SesionMCTS del motor clásico o del neuronal).
+        - hilo: Hilo de la búsqueda en marcha o terminada sin recoger (o None).
+        - cancelacion: Evento que, al activarse, termina la búsqueda en marcha (ver Presupuesto).
+        - movimiento: Movimiento devuelto por la última búsqueda terminada.
+        - error: Excepción que ha lanzado la última búsqueda (o None).
+        - inicio: Instante (time.perf_counter) en el que empezó la última búsqueda.
+        '''
+        self.sesion = sesion
+        self.hilo = None
+        self.cancelacion = threading.Event()
+        self.movimiento = None
+        self.error = None
+        self.inicio = None
+
+    def iniciar(self, tablero, turno, iteraciones=50, tiempo=None, max_nodos=None):
+        '''
+        Esta función inicia la búsqueda del mejor movimiento para la posición dada en un hilo aparte y vuelve enseguida.
+
+        PARÁMETROS
+        - tablero: Matriz 8x8 con los valores que indican qué ficha hay en cada casilla, o una Posicion. Se copia al empezar,
+          así que se puede seguir modificando mientras se busca.
+        - turno: Número que indica qué jugador está en su turno (1: blancas, 2: negras).
+        - iteraciones, tiempo, max_nodos: Presupuesto de la búsqueda (ver SesionMCTS.buscar).
+        '''
+
+        if self.activa():
+            raise RuntimeError("Ya hay una búsqueda en marcha")
+        copia = [fila[:] for fila in tablero] if isinstance(tablero, list) else tablero.a_tablero()
+        self.cancelacion.clear()
+        self.movimiento = None
+        self.error = None
+        self.inicio = time.perf_counter()
+        self.hilo = threading.Thread(target=self.ejecutar, args=(copia, turno, iteraciones, tiempo, max_nodos), daemon=True)
+        self.hilo.start()
+
+    def ejecutar(self, tablero, turno, iteraciones, tiempo, max_nodos):
+        '''
+        Esta función es la que ejecuta el hilo: hace la búsqueda y guarda su movimiento o la excepción que haya lanzado.
+        '''
+
+        try:
+            self.movimiento = self.sesion.buscar(tablero, turno, iteraciones, tiempo, max_nodos, cancelacion=self.cancelacion)
+        except Exception as e:
+            self.error = e
+
+    def activa(self):
+        '''
+        Esta función indica si hay una búsqueda en marcha.
+        '''
+
+        return self.hilo is not None and self.hilo.is_alive()
+
+    def terminada(self):
+        '''
+        Esta función indica si hay una búsqueda terminada cuyo movimiento aún no se ha recogido con resultado.
+        '''
+
+        return self.hilo is not None and not self.hilo.is_alive()
+
+    def resultado(self):
+        '''
+        Esta función devuelve el movimiento de la última búsqueda, esperando a que termine si aún está en marcha. Si la búsqueda
+        ha lanzado una excepción, la vuelve a lanzar aquí.
+        '''
+
+        if self.hilo is not None:
+            self.hilo.join()
+            self.hilo = None
+        if self.error is not None:
+            error, self.error = self.error, None
+            raise error
+        return self.movimiento
+
+    def cancelar(self):
+        '''
+        Esta función termina la búsqueda en marcha, si la hay, y espera a que el hilo acabe. Su movimiento se descarta, pero si
+        la búsqueda ha lanzado una excepción (antes o durante la cancelación), se vuelve a lanzar aquí, igual que en resultado.
+        '''
+
+        if self.hilo is not None:
+            self.cancelacion.set()
+            self.hilo.join()
+            self.hilo = None
+        self.movimiento = None
+        if self.error is not None:
+            error, self.error = self.error, None
+            raise error
+
+    def transcurrido(self):
+        '''
+        Esta función devuelve los segundos transcurridos desde el inicio de la última búsqueda.
+        '''
+
+        return 0.0 if self.inicio is None else time.perf_counter() - self.inicio
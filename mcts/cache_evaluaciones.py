@@ -0,0 +1,91 @@
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+# Imports
+from collections import OrderedDict
+
+
+class CacheEvaluaciones:
+    def __init__(self, capacidad=2**18):
+        '''
+        Esta clase guarda los valores que la red neuronal ha dado a las posiciones ya evaluadas, para no volver a evaluarlas si
+        aparecen de nuevo: en la misma búsqueda (por otro camino que la tabla de transposiciones no haya conservado), en las
+        búsquedas de las jugadas siguientes o en otras partidas.
+
+        La caché tiene un tamaño máximo y, cuando se llena, expulsa la posición usada hace más tiempo (LRU). Para ello usa un
+        OrderedDict: cada consulta con éxito mueve la posición al final, así que la primera es siempre la menos usada.
+
+        ATRIBUTOS
+        - capacidad: Número máximo de posiciones guardadas.
+        - valores: OrderedDict {clave: valor}, de la posición usada hace más tiempo a la más reciente.
+        - aciertos: Número de consultas que han encontrado la posición.
+        - fallos: Número de consultas que no la han encontrado.
+        - expulsiones: Número de posiciones expulsadas por falta de espacio.
+        '''
+        self.capacidad = capacidad
+        self.valores = OrderedDict()
+        self.aciertos = 0
+        self.fallos = 0
+        self.expulsiones = 0
+
+    def __len__(self):
+        return len(self.valores)
+
+    def buscar(self, clave):
+        '''
+        Esta función devuelve el valor guardado para la clave dada, o None si no está en la caché.
+
+        PARÁMETROS
+        - clave: Clave de la posición (por ejemplo, su instantánea (blancas, negras, turno)).
+        '''
+
+        valor = self.valores.get(clave)
+        if valor is None:
+            self.fallos += 1
+            return None
+        self.aciertos += 1
+        self.valores.move_to_end(clave)
+        return valor
+
+    def guardar(self, clave, valor):
+        '''
+        Esta función guarda el valor de una posición, expulsando la menos usada si la caché está llena.
+
+        PARÁMETROS
+        - clave: Clave de la posición.
+        - valor: Valor de la posición.
+        '''
+
+        self.valores[clave] = valor
+        self.valores.move_to_end(clave)
+        if len(self.valores) > self.capacidad:
+            self.valores.popitem(last=False)
+            self.expulsiones += 1
+
+    def tasa_aciertos(self):
+        '''
+        Esta función devuelve la proporción de consultas que han encontrado la posición en la caché.
+        '''
+
+        consultas = self.aciertos + self.fallos
+        return self.aciertos / consultas if consultas else 0.0
+
+    def estadisticas(self):
+        '''
+        Esta función devuelve un diccionario con los contadores de la caché, su ocupación y su tasa de aciertos.
+        '''
+
+        return {'aciertos': self.aciertos, 'fallos': self.fallos, 'expulsiones': self.expulsiones,
+                'posiciones': len(self.valores), 'tasa_aciertos': self.tasa_aciertos()}
+
+    def limpiar(self):
+        '''
+        Esta función vacía la caché y pone sus contadores a cero.
+        '''
+
+        self.valores.clear()
+        self.aciertos = 0
+        self.fallos = 0
+        self.expulsiones = 0
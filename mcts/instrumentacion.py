@@ -0,0 +1,187 @@
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+# Imports
+import json
+import time
+
+# Fases de una iteración de MCTS cuyo tiempo se mide por separado:
+# - seleccion: bajar por el árbol eligiendo hijos (UCT o PUCT), sin contar la construcción de nodos nuevos.
+# - expansion: construir nodos nuevos (expand), incluida la consulta a la tabla de transposiciones.
+# - simulacion: partidas aleatorias desde las hojas (motores clásico y compacto).
+# - evaluacion: evaluación de las hojas con la red, incluida la caché (motor neuronal).
+# - solucionador: hojas con pocas casillas vacías resueltas de forma exacta en lugar de simularlas o evaluarlas con la red.
+# - retropropagacion: sumar la recompensa a los nodos del camino y volver a la posición de la raíz.
+FASES = ('seleccion', 'expansion', 'simulacion', 'evaluacion', 'solucionador', 'retropropagacion')
+
+
+class EstadisticasBusqueda:
+    def __init__(self):
+        '''
+        Esta clase recoge dónde se va el tiempo dentro de una búsqueda y cómo es el árbol que construye. Se pasa a buscar (o a
+        mcts) y la búsqueda la rellena; si no se pasa, el mismo bucle de búsqueda se salta todas las medidas.
+        Si se pasa la misma a varias búsquedas (por ejemplo, a todas las de una partida), acumula las de todas ellas.
+
+        Sólo se rellena en las búsquedas de un único proceso; las que salen del libro, del solucionador final o de varios
+        procesos no la modifican.
+
+        ATRIBUTOS
+        - tiempos: Diccionario {fase: segundos} con el tiempo acumulado en cada fase (ver FASES).
+        - busquedas: Número de búsquedas acumuladas.
+        - tiempo_total: Segundos totales de esas búsquedas.
+        - iteraciones: Número de iteraciones.
+        - nodos: Número de nodos nuevos creados.
+        - profundidad_max: Profundidad máxima (número de movimientos desde la raíz) de las hojas alcanzadas.
+        - suma_profundidades: Suma de las profundidades de las hojas alcanzadas, una por iteración.
+        - simulaciones: Número de partidas aleatorias simuladas de una en una (las de simular_lote no se cuentan).
+        - suma_jugadas: Suma de los movimientos jugados en esas partidas.
+        - max_jugadas: Número máximo de movimientos de una de esas partidas.
+        - soluciones_exactas: Número de hojas resueltas con el solucionador exacto.
+        - lotes: Lista con el número de hojas de cada lote evaluado con la red.
+        - evaluaciones_red: Número de posiciones que ha evaluado la red (las que no estaban en la caché). Con simetria="promedio"
+          cuenta las 8 versiones simétricas de cada una.
+        - cache_aciertos, cache_fallos: Consultas a la caché de evaluaciones que han encontrado o no la posición.
+        - tabla_consultas, tabla_aciertos: Consultas a la tabla de transposiciones y las que han encontrado la posición.
+        '''
+        self.tiempos = {fase: 0.0 for fase in FASES}
+        self.busquedas = 0
+        self.tiempo_total = 0.0
+        self.iteraciones = 0
+        self.nodos = 0
+        self.profundidad_max = 0
+        self.suma_profundidades = 0
+        self.simulaciones = 0
+        self.suma_jugadas = 0
+        self.max_jugadas = 0
+        self.soluciones_exactas = 0
+        self.lotes = []
+        self.evaluaciones_red = 0
+        self.cache_aciertos = 0
+        self.cache_fallos = 0
+        self.tabla_consultas = 0
+        self.tabla_aciertos = 0
+
+    def anadir_hoja(self, profundidad):
+        '''
+        Esta función anota la profundidad de la hoja alcanzada en una iteración.
+
+        PARÁMETROS
+        - profundidad: Número de movimientos desde la raíz hasta la hoja.
+        '''
+
+        self.suma_profundidades += profundidad
+        if profundidad > self.profundidad_max:
+            self.profundidad_max = profundidad
+
+    def anadir_simulacion(self, jugadas):
+        '''
+        Esta función anota una partida aleatoria simulada.
+
+        PARÁMETROS
+        - jugadas: Número de movimientos jugados en la partida (sin contar los pasos de turno).
+        '''
+
+        self.simulaciones += 1
+        self.suma_jugadas += jugadas
+        if jugadas > self.max_jugadas:
+            self.max_jugadas = jugadas
+
+    def anadir_busqueda(self, iteraciones, nodos, segundos):
+        '''
+        Esta función anota el final de una búsqueda.
+
+        PARÁMETROS
+        - iteraciones: Iteraciones hechas en la búsqueda.
+        - nodos: Nodos nuevos creados en la búsqueda.
+        - segundos: Duración de la búsqueda.
+        '''
+
+        self.busquedas += 1
+        self.iteraciones += iteraciones
+        self.nodos += nodos
+        self.tiempo_total += segundos
+
+    def profundidad_media(self):
+        return self.suma_profundidades / self.iteraciones if self.iteraciones else 0.0
+
+    def jugadas_medias(self):
+        return self.suma_jugadas / self.simulaciones if self.simulaciones else 0.0
+
+    def lote_medio(self):
+        return sum(self.lotes) / len(self.lotes) if self.lotes else 0.0
+
+    def tasa_aciertos_cache(self):
+        consultas = self.cache_aciertos + self.cache_fallos
+        return self.cache_aciertos / consultas if consultas else 0.0
+
+    def tasa_aciertos_tabla(self):
+        return self.tabla_aciertos / self.tabla_consultas if self.tabla_consultas else 0.0
+
+    def a_dict(self):
+        '''
+        Esta función devuelve un diccionario con todas las estadísticas y sus valores derivados (medias y tasas), que se
+        puede pasar a JSON.
+        '''
+
+        return {
+            'busquedas': self.busquedas,
+            'tiempo_total': self.tiempo_total,
+            'tiempos': dict(self.tiempos),
+            'iteraciones': self.iteraciones,
+            'iteraciones_por_segundo': self.iteraciones / self.tiempo_total if self.tiempo_total else 0.0,
+            'nodos': self.nodos,
+            'profundidad_max': self.profundidad_max,
+            'profundidad_media': self.profundidad_media(),
+            'simulaciones': self.simulaciones,
+            'jugadas_medias': self.jugadas_medias(),
+            'max_jugadas': self.max_jugadas,
+            'soluciones_exactas': self.soluciones_exactas,
+            'lotes': len(self.lotes),
+            'lote_medio': self.lote_medio(),
+            'lote_max': max(self.lotes, default=0),
+            'evaluaciones_red': self.evaluaciones_red,
+            'tasa_aciertos_cache': self.tasa_aciertos_cache(),
+            'tasa_aciertos_tabla': self.tasa_aciertos_tabla(),
+        }
+
+    def guardar_jsonl(self, ruta, **extra):
+        '''
+        Esta función añade las estadísticas como una línea JSON al final de un archivo, para ir guardando las de muchas
+        búsquedas (o partidas) en el mismo archivo y analizarlas después.
+
+        PARÁMETROS
+        - ruta: Ruta del archivo.
+        - extra: Campos adicionales para la línea (por ejemplo, motor="neuronal" o jugada=12). Se añaden también la fecha y
+          hora.
+        '''
+
+        linea = {'fecha': time.strftime('%Y-%m-%d %H:%M:%S'), **extra, **self.a_dict()}
+        with open(ruta, 'a') as archivo:
+            archivo.write(json.dumps(linea) + '\n')
+
+    def resumen(self):
+        '''
+        Esta función devuelve un texto de varias líneas con el tiempo de cada fase (y su porcentaje sobre el total) y los
+        principales contadores.
+        '''
+
+        lineas = [f"{self.busquedas} búsquedas, {self.iteraciones} iteraciones, {self.nodos} nodos en {self.tiempo_total:.3f} s"]
+        for fase in FASES:
+            if self.tiempos[fase] > 0:
+                porcentaje = self.tiempos[fase] / self.tiempo_total if self.tiempo_total else 0.0
+                lineas.append(f"  {fase:17} {self.tiempos[fase]:9.3f} s {porcentaje:7.1%}")
+        lineas.append(f"  profundidad media {self.profundidad_media():.1f}, máxima {self.profundidad_max}")
+        if self.simulaciones:
+            lineas.append(f"  simulaciones: {self.simulaciones}, {self.jugadas_medias():.1f} jugadas de media, {self.max_jugadas} como máximo")
+        if self.soluciones_exactas:
+            lineas.append(f"  hojas resueltas de forma exacta: {self.soluciones_exactas}")
+        if self.lotes:
+            lineas.append(f"  lotes de la red: {len(self.lotes)}, {self.lote_medio():.1f} hojas de media, "
+                          f"{self.evaluaciones_red} posiciones evaluadas")
+        if self.cache_aciertos + self.cache_fallos:
+            lineas.append(f"  aciertos de la caché: {self.tasa_aciertos_cache():.1%}")
+        if self.tabla_consultas:
+            lineas.append(f"  aciertos de la tabla de transposiciones: {self.tasa_aciertos_tabla():.1%}")
+        return '\n'.join(lineas)
@@ -0,0 +1,175 @@
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+# Imports
+import random
+import numpy as np
+from utiles.posicion import *
+from utiles.simetrias import forma_canonica, simetria_casilla, simetria_inversa
+
+RUTA_LIBRO = "datos/libro_aperturas.bin"
+
+# Formato del libro en disco: un registro de 22 bytes por cada jugada del libro, sin cabecera. La posición se guarda en su forma
+# canónica (ver utiles/simetrias), así que una sola entrada sirve para las 8 versiones simétricas de la posición.
+REGISTRO_LIBRO = np.dtype([('blancas', '<u8'), ('negras', '<u8'), ('turno', 'u1'), ('casilla', 'u1'), ('peso', '<u4')])
+
+
+class LibroAperturas:
+    def __init__(self):
+        '''
+        Esta clase guarda, para las posiciones de la apertura, las jugadas que se han encontrado buenas con búsquedas profundas
+        hechas de antemano (ver construir_libro), de modo que en esas posiciones se puede jugar sin buscar.
+
+        ATRIBUTOS
+        - entradas: Diccionario {(blancas, negras, turno) canónicos: {casilla canónica: peso}}. El peso indica cuánto se prefiere
+          cada jugada (por ejemplo, las visitas que recibió en la búsqueda).
+        '''
+        self.entradas = {}
+
+    def __len__(self):
+        return len(self.entradas)
+
+    def anadir(self, instantanea, casilla, peso):
+        '''
+        Esta función añade una jugada al libro, o suma el peso si ya estaba.
+
+        PARÁMETROS
+        - instantanea: Tupla (blancas, negras, turno) de la posición.
+        - casilla: Casilla (fila*8 + col) de la jugada.
+        - peso: Peso de la jugada.
+        '''
+
+        blancas, negras, turno = instantanea
+        blancas_c, negras_c, simetria = forma_canonica(blancas, negras)
+        jugadas = self.entradas.setdefault((blancas_c, negras_c, turno), {})
+        casilla_c = simetria_casilla(casilla, simetria)
+        jugadas[casilla_c] = jugadas.get(casilla_c, 0) + peso
+
+    def jugadas(self, instantanea):
+        '''
+        Esta función devuelve el diccionario {casilla: peso} con las jugadas del libro para la posición, ya en la orientación de la
+        posición dada, o un diccionario vacío si la posición no está en el libro.
+
+        PARÁMETROS
+        - instantanea: Tupla (blancas, negras, turno) de la posición.
+        '''
+
+        blancas, negras, turno = instantanea
+        blancas_c, negras_c, simetria = forma_canonica(blancas, negras)
+        inversa = simetria_inversa(simetria)
+        return {simetria_casilla(c, inversa): peso for c, peso in self.entradas.get((blancas_c, negras_c, turno), {}).items()}
+
+    def buscar(self, pos, aleatorio=True, azar=random):
+        '''
+        Esta función devuelve las coordenadas (fila, col) de una jugada del libro para la posición, o None si no está en el libro.
+        Si aleatorio es True, la jugada se elige al azar con probabilidad proporcional a su peso (así las partidas no empiezan
+        siempre igual); si es False, se elige la de más peso.
+
+        PARÁMETROS
+        - pos: Posición (Posicion).
+        - aleatorio: Indica si la jugada se elige al azar según los pesos. True por defecto.
+        - azar: Generador de números aleatorios (módulo random por defecto).
+        '''
+
+        legales = pos.movimientos()
+        jugadas = [(casilla, peso) for casilla, peso in self.jugadas(pos.instantanea()).items() if (legales >> casilla) & 1 and peso > 0]
+        if not jugadas:
+            return None
+        if aleatorio:
+            casilla = azar.choices([c for c, _ in jugadas], weights=[p for _, p in jugadas])[0]
+        else:
+            casilla = max(jugadas, key=lambda jugada: (jugada[1], -jugada[0]))[0]
+        return (casilla >> 3, casilla & 7)
+
+    def guardar(self, ruta=RUTA_LIBRO):
+        '''
+        Esta función guarda el libro en disco, con un registro REGISTRO_LIBRO por jugada.
+
+        PARÁMETROS
+        - ruta: Ruta del archivo. RUTA_LIBRO por defecto.
+        '''
+
+        filas = [(b, n, t, c, p) for (b, n, t), jugadas in self.entradas.items() for c, p in jugadas.items()]
+        np.array(filas, dtype=REGISTRO_LIBRO).tofile(ruta)
+
+    @classmethod
+    def cargar(cls, ruta=RUTA_LIBRO):
+        '''
+        Esta función devuelve el libro guardado en el archivo dado.
+
+        PARÁMETROS
+        - ruta: Ruta del archivo. RUTA_LIBRO por defecto.
+        '''
+
+        libro = cls()
+        for b, n, t, c, p in np.fromfile(ruta, dtype=REGISTRO_LIBRO).tolist():
+            libro.entradas.setdefault((b, n, t), {})[c] = p
+        return libro
+
+
+def cargar_libro(ruta=RUTA_LIBRO):
+    '''
+    Esta función devuelve el libro de aperturas guardado en la ruta dada, o None si no existe (por ejemplo, si aún no se ha construido).
+
+    PARÁMETROS
+    - ruta: Ruta del archivo. RUTA_LIBRO por defecto.
+    '''
+
+    return LibroAperturas.cargar(ruta) if os.path.exists(ruta) else None
+
+
+def construir_libro(clase_sesion, profundidad=6, iteraciones=2000, jugadas_por_posicion=2, libro=None):
+    '''
+    Esta función construye un libro de aperturas. Partiendo de la posición inicial, en cada posición hace una búsqueda profunda y
+    guarda en el libro las "jugadas_por_posicion" jugadas más visitadas de la raíz, con sus visitas como peso. Después repite lo
+    mismo en las posiciones a las que llevan esas jugadas, hasta "profundidad" jugadas desde el inicio. Las posiciones simétricas
+    a otra ya analizada no se vuelven a buscar. Devuelve el libro.
+
+    PARÁMETROS
+    - clase_sesion: Clase de sesión de búsqueda con la que se analizan las posiciones (SesionMCTS de cualquiera de los motores).
+    - profundidad: Número de jugadas desde la posición inicial que cubre el libro. 6 por defecto.
+    - iteraciones: Iteraciones de la búsqueda de cada posición. 2000 por defecto.
+    - jugadas_por_posicion: Número de jugadas que se guardan (y se siguen) en cada posición. 2 por defecto.
+    - libro: Libro al que añadir las jugadas. Si no se indica, se crea uno nuevo.
+    '''
+
+    libro = libro if libro is not None else LibroAperturas()
+    nivel = [posicion_inicial().instantanea()]
+    for jugada in range(profundidad):
+        siguiente = []
+        for instantanea in nivel:
+            pos = Posicion(*instantanea)
+            if libro.jugadas(instantanea) or not pos.movimientos():
+                continue # Ya analizada (ella o una simétrica) o sin jugadas
+
+            # Se busca sin el propio libro ni el solucionador final, y se toman las jugadas más visitadas de la raíz
+            sesion = clase_sesion(umbral_final=None)
+            sesion.buscar(pos, pos.turno, iteraciones)
+            # estadisticas_raiz la ofrecen todas las sesiones, tengan el árbol en objetos Nodo o en un ArbolCompacto
+            visitadas = [(casilla, n) for casilla, (n, _) in sesion.estadisticas_raiz().items() if n > 0]
+            visitadas.sort(key=lambda jugada: -jugada[1])
+            for casilla, n in visitadas[:jugadas_por_posicion]:
+                libro.anadir(instantanea, casilla, n)
+                pos.hacer(casilla)
+                if not pos.movimientos() and pos.no_terminal():
+                    pos.pasar()
+                siguiente.append(pos.instantanea())
+                pos.volver(0)
+            print(f"Jugada {jugada + 1}: {len(libro)} posiciones en el libro", end='\r', flush=True)
+        nivel = siguiente
+    print()
+    return libro
+
+
+# Construcción del libro: python mcts/libro_aperturas.py [profundidad] [iteraciones] [jugadas_por_posicion]
+if __name__ == '__main__':
+    from mcts.motor_mcts import SesionMCTS
+
+    profundidad = int(sys.argv[1]) if len(sys.argv) > 1 else 6
+    iteraciones = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+    jugadas_por_posicion = int(sys.argv[3]) if len(sys.argv) > 3 else 2
+    libro = construir_libro(SesionMCTS, profundidad, iteraciones, jugadas_por_posicion)
+    libro.guardar(RUTA_LIBRO)
+    print(f"Libro con {len(libro)} posiciones guardado en '{RUTA_LIBRO}'")
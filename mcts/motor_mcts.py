@@ -5,85 +5,499 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 # Imports
 from utiles.fichas import *
-import copy
+from utiles.bitboard import *
+from utiles.posicion import *
+from mcts.transposiciones import TablaTransposiciones
+from mcts.paralelo import buscar_en_paralelo, estadisticas_raiz
+from mcts.simulacion_numpy import simular_lote
+from mcts.solucionador_final import UMBRAL_FINAL, casillas_vacias, resultado_exacto, mejor_jugada_final
 from math import sqrt, log
 import random
+import time
+import numpy as np
+
+# Cada cuántas iteraciones se consulta el reloj cuando la búsqueda tiene un límite de tiempo. Consultarlo en cada iteración
+# costaría casi tanto como una simulación; cada 16 el límite se supera como mucho en el tiempo de 16 iteraciones.
+CADA_COMPROBACION = 16
 
 class Nodo:
-    def __init__(self, estado, turno, padre=None, movimiento=None):
+    # Sin __dict__ por nodo: con cientos de miles de nodos, guardar los atributos en huecos fijos ahorra mucha memoria
+    __slots__ = ('turno', 'clave', 'hijos', 'movimientos_hijos', 'n', 'q', 'movimientos_por_hacer', 'rival_puede_mover',
+                 'terminal', 'priores', 'exacto')
+
+    def __init__(self, pos):
         '''
         Esta clase sirve para poder construir los nodos del árbol necesario para el uso del algoritmo de Monte Carlo Tree Search.
+        El nodo no guarda el tablero: durante la búsqueda hay una única posición (Posicion) que se modifica al bajar por el árbol
+        y se restaura al terminar cada iteración, así que el estado del nodo es el de esa posición cuando se llega a él.
+
+        Con la tabla de transposiciones, a un mismo nodo se puede llegar desde varios padres (el árbol es un grafo dirigido
+        acíclico), así que el nodo no guarda su padre ni su movimiento: cada padre guarda el movimiento que lleva a cada uno
+        de sus hijos, y la retropropagación sigue el camino recorrido en cada iteración.
 
         ATRIBUTOS
-        - estado: Estado del tablero que representa el nodo.
         - turno: Turno del jugador que puede colocar ficha.
-        - padre: Nodo padre.
+        - clave: Clave de Zobrist de la posición del nodo (tablero y turno).
         - hijos: Lista de nodos hijo.
+        - movimientos_hijos: Lista de casillas (fila*8 + col) de los movimientos que llevan a cada hijo, en el mismo orden que "hijos".
         - n: Número de veces que el nodo ha sido visitado por distintas partidas simuladas.
         - q: Recompensa total de todas las partidas simuladas que han visitado el nodo.
-        - movimientos_por_hacer: Lista de movimientos posibles que representan los lugares en los que se puede colocar ficha.
-        - movimiento: Movimiento que ha dado lugar a este nodo (concretamente, al tablero almacenado en el atributo "estado").
+        - movimientos_por_hacer: Lista de casillas (fila*8 + col) que representan los lugares en los que se puede colocar ficha.
+        - rival_puede_mover: Indica si el jugador que no está en su turno tiene movimientos en la posición del nodo.
+        - terminal: Indica si la posición del nodo es final (ningún jugador puede colocar ficha).
+        - priores: Diccionario {casilla: probabilidad} con la probabilidad que da la red a cada movimiento del nodo, o None si no
+          se conoce (sólo lo usa la selección PUCT del motor neuronal, ver mcts/motor_mcts_neuronal).
+        - exacto: Resultado exacto de la posición, en la escala de recompensa del motor que la evalúa, o None si no se ha
+          resuelto. Se guarda la primera vez que se resuelve con el solucionador final (pocas casillas vacías); desde entonces,
+          la búsqueda no baja más allá del nodo y en cada visita usa este valor en lugar de volver a resolver la posición.
+
+        Los movimientos, rival_puede_mover y terminal se calculan una sola vez al crear el nodo (ver analizar_bb), así que al bajar
+        por el árbol nunca se vuelven a generar movimientos de una posición ya visitada.
         '''
-        self.estado = estado
-        self.turno = turno
-        self.padre = padre
+        movimientos, self.rival_puede_mover, self.terminal = pos.analizar()
+        self.turno = pos.turno
+        self.clave = pos.clave
         self.hijos = []
+        self.movimientos_hijos = []
         self.n = 0
         self.q = 0
-        self.movimientos_por_hacer = movimientos_disponibles(estado, turno)
-        self.movimiento = movimiento
+        self.movimientos_por_hacer = casillas(movimientos)
+        self.priores = None
+        self.exacto = None
+
+
+class Presupuesto:
+    def __init__(self, iteraciones=None, tiempo=None, max_nodos=None, cada=CADA_COMPROBACION, cancelacion=None):
+        '''
+        Esta clase indica cuándo debe terminar una búsqueda. La búsqueda termina en cuanto se alcanza cualquiera de los límites
+        indicados, y siempre hace al menos una iteración para tener un movimiento que devolver, salvo si se cancela.
+
+        ATRIBUTOS
+        - iteraciones: Número máximo de iteraciones (o None si no hay límite de iteraciones).
+        - limite: Instante (time.perf_counter) en el que se acaba el tiempo (o None si no hay límite de tiempo).
+        - max_nodos: Número máximo de nodos nuevos que puede crear la búsqueda (o None si no hay límite de nodos).
+        - cada: Número de iteraciones entre dos consultas del reloj.
+        - inicio: Instante en el que empezó la búsqueda.
+        - siguiente: Número de iteraciones a partir del cual se vuelve a consultar el reloj.
+        - cancelacion: Evento (threading.Event) que, al activarse desde otro hilo, termina la búsqueda en la siguiente
+          comprobación, aunque no se haya hecho ninguna iteración (o None si la búsqueda no se puede cancelar).
+        '''
+        if iteraciones is None and tiempo is None and max_nodos is None:
+            raise ValueError("La búsqueda necesita al menos un límite: iteraciones, tiempo o max_nodos")
+        self.iteraciones = iteraciones
+        self.inicio = time.perf_counter()
+        self.limite = self.inicio + tiempo if tiempo is not None else None
+        self.max_nodos = max_nodos
+        self.cada = cada
+        self.siguiente = cada
+        self.cancelacion = cancelacion
+
+    def agotado(self, hechas, nodos):
+        '''
+        Esta función indica si la búsqueda debe terminar tras haber hecho "hechas" iteraciones y creado "nodos" nodos.
+
+        PARÁMETROS
+        - hechas: Número de iteraciones hechas hasta el momento.
+        - nodos: Número de nodos nuevos creados hasta el momento.
+        '''
+
+        if self.cancelacion is not None and self.cancelacion.is_set():
+            return True
+        if hechas == 0:
+            return False
+        if self.iteraciones is not None and hechas >= self.iteraciones:
+            return True
+        if self.max_nodos is not None and nodos >= self.max_nodos:
+            return True
+        if self.limite is not None and hechas >= self.siguiente:
+            self.siguiente = hechas + self.cada
+            return time.perf_counter() >= self.limite
+        return False
+
+    def restantes(self, hechas, nodos=0):
+        '''
+        Esta función devuelve cuántas iteraciones quedan como mucho, o None si no hay límite de iteraciones ni de nodos. Cada
+        iteración crea como mucho un nodo nuevo, así que con max_nodos quedan como mucho tantas como nodos falten. Antes de la
+        primera iteración siempre queda al menos una (ver agotado).
+
+        PARÁMETROS
+        - hechas: Número de iteraciones hechas hasta el momento.
+        - nodos: Número de nodos nuevos creados hasta el momento. 0 por defecto.
+        '''
+
+        limites = []
+        if self.iteraciones is not None:
+            limites.append(self.iteraciones - hechas)
+        if self.max_nodos is not None:
+            limites.append(self.max_nodos - nodos)
+        if not limites:
+            return None
+        return max(min(limites), 1) if hechas == 0 else min(limites)
+
+    def transcurrido(self):
+        '''
+        Esta función devuelve los segundos transcurridos desde el inicio de la búsqueda.
+        '''
+
+        return time.perf_counter() - self.inicio
+
+
+class SesionMCTS:
+    def __init__(self, transposiciones=True, tabla=None, procesos=1, umbral_final=UMBRAL_FINAL, libro=None, simulaciones=1):
+        '''
+        Esta clase mantiene el árbol de búsqueda entre jugadas consecutivas de una misma partida. En lugar de empezar cada búsqueda
+        desde cero y tirar el árbol, al recibir la nueva posición (tras nuestro movimiento y la respuesta del oponente) busca el
+        nodo que le corresponde entre los nietos (o hijos) de la raíz anterior y lo usa como nueva raíz, con todas sus visitas.
+        Así, el trabajo hecho en la búsqueda anterior para esa rama se suma al presupuesto de la búsqueda actual.
+
+        ATRIBUTOS
+        - tabla: Tabla de transposiciones de la sesión (o None), que se conserva entre búsquedas.
+        - raiz: Nodo raíz de la última búsqueda (o None si aún no se ha buscado).
+        - reutilizaciones: Número de búsquedas que han empezado desde un nodo ya existente en lugar de desde un nodo nuevo.
+        - visitas_reutilizadas: Suma de las visitas que tenían esas raíces reutilizadas al empezar la búsqueda.
+        - transposiciones: Indica si la sesión usa tabla de transposiciones.
+        - procesos: Número de procesos de la búsqueda. Con más de uno, cada búsqueda es paralela en la raíz (ver buscar_en_paralelo)
+          y no se conserva el árbol entre jugadas, porque cada proceso tiene el suyo.
+        - umbral_final: Número de casillas vacías a partir del cual (por debajo o igual) las posiciones se resuelven de forma exacta
+          (ver mcts/solucionador_final): la búsqueda elige directamente la jugada perfecta y las hojas del árbol se evalúan con el
+          resultado exacto en lugar de con una simulación. Con None no se resuelve nunca.
+        - libro: Libro de aperturas (LibroAperturas, ver mcts/libro_aperturas) o None. Si la posición está en el libro, se juega
+          una de sus jugadas sin buscar.
+        - simulaciones: Número de partidas aleatorias que se simulan desde cada hoja. Con más de una, se simulan todas a la vez con
+          NumPy (ver mcts/simulacion_numpy) y la recompensa es su media.
+        - por_visitas: Indica si el movimiento elegido es el hijo de la raíz con más visitas (ver movimiento_mas_visitado) en lugar
+          del de mejor recompensa media (ver mejor_movimiento). False en este motor.
+        '''
+        self.tabla = nueva_tabla(transposiciones, tabla)
+        self.raiz = None
+        self.reutilizaciones = 0
+        self.visitas_reutilizadas = 0
+        self.transposiciones = transposiciones
+        self.procesos = procesos
+        self.umbral_final = umbral_final
+        self.libro = libro
+        self.simulaciones = simulaciones
+        self.por_visitas = False
+
+    def buscar(self, tablero, turno, iteraciones=50, tiempo=None, max_nodos=None, con_info=False, cancelacion=None,
+               estadisticas=None):
+        '''
+        Esta función busca el mejor movimiento para la posición dada, reutilizando el subárbol de búsquedas anteriores si la
+        posición ya aparecía en él. Devuelve lo mismo que mcts.
+
+        PARÁMETROS
+        - tablero: Matriz 8x8 con los valores que indican qué ficha hay en cada casilla, o una Posicion.
+        - turno: Número que indica qué jugador está en su turno (1: blancas, 2: negras).
+        - iteraciones: Número máximo de iteraciones que se añaden al árbol en esta búsqueda (None para no limitarlas).
+        - tiempo: Segundos de búsqueda (o None). Al agotarse se devuelve el mejor movimiento encontrado hasta el momento.
+        - max_nodos: Número máximo de nodos nuevos que puede crear la búsqueda (o None).
+        - con_info: Si es True, devuelve la tupla (movimiento, info) (ver mcts).
+        - cancelacion: Evento (threading.Event) con el que otro hilo puede terminar la búsqueda antes de agotar el presupuesto
+          (ver Presupuesto). Si se cancela antes de la primera iteración, el movimiento es None. Con varios procesos, la
+          cancelación llega a todos ellos (ver buscar_en_paralelo).
+        - estadisticas: EstadisticasBusqueda (ver mcts/instrumentacion) en la que se anotan el tiempo de cada fase y los
+          contadores de la búsqueda, o None para no medir nada. Sólo se tiene en cuenta con un único proceso.
+        '''
+
+        # Primero crea la posición sobre la que se harán y desharán los movimientos.
+        pos = nueva_posicion(tablero, turno)
+        # Si quedan pocas casillas vacías, se resuelve la posición y se juega la jugada perfecta sin buscar.
+        if self.en_final(pos):
+            return self.jugada_final(pos, con_info)
+        # Si la posición está en el libro de aperturas, se juega una de sus jugadas sin buscar.
+        if self.libro is not None:
+            inicio = time.perf_counter()
+            movimiento = self.libro.buscar(pos)
+            if movimiento is not None:
+                if con_info:
+                    return movimiento, {'iteraciones': 0, 'nodos': 0, 'tiempo': time.perf_counter() - inicio, 'libro': True}
+                return movimiento
+        # Con varios procesos, cada uno busca por su cuenta desde esta posición y se combinan sus resultados.
+        if self.procesos > 1:
+            movimiento, info = buscar_en_paralelo(type(self), self.opciones(), pos.instantanea(), self.procesos,
+                                                  iteraciones, tiempo, max_nodos, por_visitas=self.por_visitas,
+                                                  cancelacion=cancelacion)
+            return (movimiento, info) if con_info else movimiento
+
+        # Con un único proceso, obtiene el nodo raíz del árbol y busca desde él hasta agotar el presupuesto.
+        presupuesto = Presupuesto(iteraciones, tiempo, max_nodos, cancelacion=cancelacion)
+        self.raiz = self.nueva_raiz(pos)
+        if estadisticas is not None and self.tabla is not None:
+            consultas, aciertos = self.tabla.consultas, self.tabla.aciertos
+        hechas, nodos = self.iterar(self.raiz, pos, presupuesto, estadisticas)
+        if estadisticas is not None:
+            estadisticas.anadir_busqueda(hechas, nodos, presupuesto.transcurrido())
+            if self.tabla is not None:
+                estadisticas.tabla_consultas += self.tabla.consultas - consultas
+                estadisticas.tabla_aciertos += self.tabla.aciertos - aciertos
+
+        movimiento, visitas = self.movimiento_raiz()
+        if con_info:
+            return movimiento, {'iteraciones': hechas, 'nodos': nodos, 'tiempo': presupuesto.transcurrido(), 'visitas': visitas}
+        return movimiento
+
+    def movimiento_raiz(self):
+        '''
+        Esta función devuelve la tupla (movimiento, visitas) de la raíz de la última búsqueda: el movimiento elegido y un
+        diccionario {casilla: visitas} con las visitas de cada hijo.
+        '''
+
+        # En caso de que el nodo raíz sea un nodo de estado terminal, el movimiento es None. En caso contrario, es el mejor
+        # movimiento a realizar partiendo de que el tablero se encuentre en el estado dado como parámetro.
+        if not self.raiz.hijos:
+            movimiento = None
+        elif self.por_visitas:
+            movimiento = movimiento_mas_visitado(self.raiz)
+        else:
+            movimiento = mejor_movimiento(self.raiz)
+        return movimiento, {m: h.n for m, h in zip(self.raiz.movimientos_hijos, self.raiz.hijos)}
+
+    def estadisticas_raiz(self):
+        '''
+        Esta función devuelve un diccionario {casilla: (n, q)} con las visitas y la recompensa total de cada hijo de la raíz de
+        la última búsqueda (ver estadisticas_raiz de mcts/paralelo).
+        '''
+
+        return estadisticas_raiz(self.raiz)
+
+    def opciones(self):
+        '''
+        Esta función devuelve los parámetros con los que se crea, en cada proceso, una sesión equivalente a ésta pero de un único proceso.
+        '''
+
+        return {'transposiciones': self.transposiciones, 'umbral_final': self.umbral_final, 'simulaciones': self.simulaciones}
+
+    def en_final(self, pos):
+        '''
+        Esta función indica si la posición tiene tan pocas casillas vacías que se resuelve de forma exacta.
+
+        PARÁMETROS
+        - pos: Posición (Posicion) a comprobar.
+        '''
+
+        return self.umbral_final is not None and casillas_vacias(pos.propias, pos.rivales) <= self.umbral_final
+
+    def jugada_final(self, pos, con_info=False):
+        '''
+        Esta función devuelve la jugada perfecta de la posición, calculada con el solucionador exacto, con el mismo formato que buscar.
+        El árbol anterior se descarta, porque a partir de aquí todas las jugadas se resuelven de forma exacta.
+
+        PARÁMETROS
+        - pos: Posición (Posicion) a resolver.
+        - con_info: Si es True, devuelve la tupla (movimiento, info). En info, 'nodos' son las posiciones visitadas por el
+          solucionador y 'diferencia' la diferencia de fichas final con juego perfecto.
+        '''
+
+        inicio = time.perf_counter()
+        estadisticas = {'nodos': 0}
+        casilla, diferencia = mejor_jugada_final(pos.propias, pos.rivales, estadisticas)
+        self.raiz = None
+        movimiento = None if casilla is None else (casilla >> 3, casilla & 7)
+        if con_info:
+            return movimiento, {'iteraciones': 0, 'nodos': estadisticas['nodos'], 'tiempo': time.perf_counter() - inicio,
+                                'diferencia': diferencia}
+        return movimiento
+
+    def nueva_raiz(self, pos):
+        '''
+        Esta función devuelve el nodo desde el que empezar a buscar en la posición dada: el descendiente de la raíz anterior
+        (hasta dos jugadas por debajo) o el nodo de la tabla de transposiciones que corresponda a la posición, o un nodo nuevo
+        si no hay ninguno. El resto del árbol anterior deja de estar referenciado desde la raíz.
+
+        PARÁMETROS
+        - pos: Posición (Posicion) desde la que se va a buscar.
+        '''
+
+        raiz = None
+        if self.raiz is not None:
+            raiz = buscar_descendiente(self.raiz, pos.clave, 2)
+        if raiz is None and self.tabla is not None:
+            raiz = self.tabla.buscar(pos.clave)
+
+        if raiz is None:
+            raiz = Nodo(pos)
+            if self.tabla is not None:
+                self.tabla.guardar(raiz)
+        else:
+            self.reutilizaciones += 1
+            self.visitas_reutilizadas += raiz.n
+        return raiz
 
+    def iterar(self, root, pos, presupuesto, estadisticas=None):
+        '''
+        Esta función realiza las iteraciones del algoritmo MCTS sobre el árbol que empieza en el nodo dado, hasta agotar el
+        presupuesto. Devuelve la tupla (iteraciones hechas, nodos nuevos creados).
+
+        PARÁMETROS
+        - root: Nodo raíz del árbol.
+        - pos: Posición (Posicion) correspondiente a la raíz.
+        - presupuesto: Presupuesto (iteraciones, tiempo o nodos) de la búsqueda.
+        - estadisticas: EstadisticasBusqueda en la que anotar el tiempo de cada fase, la profundidad de cada hoja y la longitud
+          de cada simulación, o None (por defecto) para no medir nada.
+        '''
+
+        # Sin estadísticas no se mide nada: cada medida queda en una comprobación de medir
+        medir = estadisticas is not None
+        tiempos = estadisticas.tiempos if medir else None
+        # Comienza un bulce que se repetirá hasta que se agote el presupuesto
+        i = 0
+        nodos = 0
+        while not presupuesto.agotado(i, nodos):
+            if medir:
+                inicio = time.perf_counter()
+                expansion = tiempos['expansion']
+            # Elige el siguiente nodo del árbol, partiendo de su raíz. Se obtiene el camino recorrido, que termina en ese nodo.
+            camino = tree_policy(root, pos, self.tabla, tiempos)
+            if medir:
+                # El tiempo de expansión ya se ha sumado dentro de tree_policy
+                tiempos['seleccion'] += time.perf_counter() - inicio - (tiempos['expansion'] - expansion)
+                estadisticas.anadir_hoja(len(camino) - 1)
+            # Si el nodo elegido no tiene visitas, es un nodo nuevo.
+            if camino[-1].n == 0:
+                nodos += 1
+            hoja = camino[-1]
+            if hoja.exacto is not None:
+                # La posición ya se resolvió de forma exacta en una visita anterior
+                recompensa = hoja.exacto
+            else:
+                # Realiza una simulación de la partida desde el nodo anteriormente definido y calcula la recompensa según el resultado de la partida.
+                recompensa = default_policy(hoja, pos, self.umbral_final, self.simulaciones, estadisticas)
+                # Con pocas casillas vacías la recompensa es el resultado exacto, que se guarda para no volver a calcularlo
+                if self.umbral_final is not None and casillas_vacias(pos.propias, pos.rivales) <= self.umbral_final:
+                    hoja.exacto = recompensa
+            if medir:
+                inicio = time.perf_counter()
+            # Retropropaga la recompensa por el nodo y por el raíz, incluyendo los nodos intermedios si los hubiere.
+            backup(camino, recompensa)
+            # Deshace los movimientos hechos al bajar por el árbol para que la posición vuelva a ser la de la raíz.
+            pos.volver(0)
+            if medir:
+                tiempos['retropropagacion'] += time.perf_counter() - inicio
+            i += 1
+
+        return i, nodos
+
+    def reiniciar(self):
+        '''
+        Esta función descarta el árbol y vacía la tabla de transposiciones, por ejemplo al empezar una partida nueva.
+        '''
+
+        self.raiz = None
+        if self.tabla is not None:
+            self.tabla.limpiar()
 
-def mcts(tablero, turno, iteraciones=50):
+
+def mcts(tablero, turno, iteraciones=50, transposiciones=True, tabla=None, procesos=1, tiempo=None, max_nodos=None, con_info=False,
+         umbral_final=UMBRAL_FINAL, libro=None, simulaciones=1, estadisticas=None):
     '''
     Esta función busca el mejor movimiento dado un tablero y un turno concreto, basándose en el algoritmo de Monte Carlo Tree Search.
+    Cada llamada empieza un árbol nuevo; para conservar el árbol entre jugadas se usa SesionMCTS.
 
     PARÁMETROS
-    - tablero: Matriz 8x8 con los valores que indican qué ficha hay en cada casilla.
+    - tablero: Matriz 8x8 con los valores que indican qué ficha hay en cada casilla, o una Posicion.
     - turno: Número que indica qué jugador está en su turno (0: ninguno, 1: blancas, 2: negras).
-    - iteraciones: Número de iteraciones que realizará el algoritmo MCTS. 50 por defecto.
-    '''
-
-    # Primero crea un nodo raíz del árbol a partir del tablero dado como parámetro.
-    root = Nodo(tablero, turno)
-    # Comienza un bulce que se repetirá tantas veces como indique el número de iteraciones
-    i = 0
-    while i < iteraciones:
-        # Elige el siguiente nodo del árbol, partiendo de su raíz.
-        nodo = tree_policy(root)
-        # Realiza una simulación de la partida desde el nodo anteriormente definido y calcula la recompensa según el resultado de la partida.
-        recompensa = default_policy(nodo)
-        # Retropropaga la recompensa por el nodo y por el raíz, incluyendo los nodos intermedios si los hubiere.
-        backup(nodo, recompensa)
-        i += 1
-    
-    # En caso de que el nodo raíz sea un nodo de estado terminal, se devuelve None.
-    if not root.hijos:
-        return None
+    - iteraciones: Número máximo de iteraciones que realizará el algoritmo MCTS. 50 por defecto. Con None no se limitan las
+      iteraciones, y la búsqueda dura lo que indiquen tiempo o max_nodos.
+    - transposiciones: Si es True, las posiciones repetidas comparten nodo (ver TablaTransposiciones). Si es False, el árbol es un árbol puro.
+    - tabla: Tabla de transposiciones a usar. Si no se indica, se crea una nueva para esta búsqueda. Pasar una tabla propia
+      permite consultar después sus estadísticas (tabla.estadisticas()).
+    - procesos: Número de procesos. Con más de uno, cada proceso hace "iteraciones" iteraciones desde la raíz con una semilla distinta
+      y se combinan las estadísticas de la raíz para elegir el movimiento (ver buscar_en_paralelo). 1 por defecto.
+    - tiempo: Segundos de búsqueda. Si se indica, la búsqueda se detiene al agotarse (el reloj se consulta cada CADA_COMPROBACION
+      iteraciones) y devuelve el mejor movimiento encontrado hasta entonces. None por defecto.
+    - max_nodos: Número máximo de nodos nuevos que puede crear la búsqueda. None por defecto.
+    - con_info: Si es True, devuelve la tupla (movimiento, info), donde info es un diccionario con las iteraciones hechas
+      ('iteraciones'), los nodos creados ('nodos'), los segundos empleados ('tiempo') y, si se ha buscado, las visitas de cada
+      movimiento de la raíz ('visitas', diccionario {casilla: visitas}). False por defecto.
+    - umbral_final: Número de casillas vacías a partir del cual se resuelve la posición de forma exacta en lugar de buscar, y se
+      evalúan las hojas con su resultado exacto. UMBRAL_FINAL por defecto; None para no usar el solucionador.
+    - libro: Libro de aperturas (ver mcts/libro_aperturas) que se consulta antes de buscar. None por defecto.
+    - simulaciones: Número de partidas aleatorias simuladas a la vez desde cada hoja (ver default_policy). 1 por defecto.
+    - estadisticas: EstadisticasBusqueda (ver mcts/instrumentacion) que se rellena con el tiempo de cada fase y los contadores
+      de la búsqueda. None por defecto (sin medir nada).
+    '''
 
-    # En caso contrario, devolvemos el mejor movimiento a realizar partiendo de que el tablero se encuentre en el estado dado como parámetro.
-    return mejor_movimiento(root)
+    return SesionMCTS(transposiciones, tabla, procesos, umbral_final, libro, simulaciones).buscar(tablero, turno, iteraciones, tiempo, max_nodos, con_info,
+                                                                                                  estadisticas=estadisticas)
 
 
-def tree_policy(nodo):
+def buscar_descendiente(nodo, clave, profundidad):
+    '''
+    Esta función busca, entre los descendientes de un nodo hasta la profundidad dada (incluido el propio nodo), el que
+    corresponde a la posición con la clave de Zobrist dada. Devuelve None si no lo encuentra.
+
+    PARÁMETROS
+    - nodo: Nodo desde el que se busca.
+    - clave: Clave de Zobrist de la posición buscada.
+    - profundidad: Número máximo de jugadas por debajo del nodo en las que buscar.
+    '''
+
+    nivel = [nodo]
+    for _ in range(profundidad + 1):
+        siguiente = []
+        for n in nivel:
+            if n.clave == clave:
+                return n
+            siguiente.extend(n.hijos)
+        nivel = siguiente
+    return None
+
+
+def nueva_tabla(transposiciones, tabla=None):
+    '''
+    Esta función devuelve la tabla de transposiciones que usará una búsqueda: la dada como parámetro, una nueva o None si no se usan.
+
+    PARÁMETROS
+    - transposiciones: Indica si se usan transposiciones.
+    - tabla: Tabla de transposiciones ya existente, si la hay.
+    '''
+
+    if not transposiciones:
+        return None
+    return tabla if tabla is not None else TablaTransposiciones()
+
+
+def tree_policy(nodo, pos, tabla=None, tiempos=None):
     '''
     Esta función sirve para "bajar" un nivel en el árbol, partiendo de un nodo. Es decir, expande totalmente el nodo dado como parámetro, 
-    elige el mejor hijo de todos y lo devuelve como resultado.
+    elige el mejor hijo de todos y lo devuelve como resultado. Cada movimiento del descenso se hace sobre la posición, de modo que al
+    terminar ésta corresponde al nodo devuelto. Devuelve el camino recorrido, una lista de nodos desde el nodo dado hasta el elegido.
 
     PARÁMETROS
     - nodo: Nodo que queremos expandir totalmente y de entre cuyos hijos queremos elegir el mejor.
+    - pos: Posición (Posicion) correspondiente al nodo dado como parámetro.
+    - tabla: Tabla de transposiciones (o None) en la que buscar los hijos que se construyan.
+    - tiempos: Diccionario {fase: segundos} de las estadísticas de la búsqueda, al que sumar el tiempo de construir los nodos
+      nuevos en la fase "expansion", o None (por defecto) para no medirlo.
     '''
 
-    # Empieza el bucle en el cual se comprueba que el nodo no sea nulo y que no sea un nodo con estado terminal.
-    while nodo is not None and no_terminal(nodo.estado, nodo.turno):
+    camino = [nodo]
+    # Empieza el bucle en el cual se comprueba que el nodo no sea un nodo con estado terminal.
+    # Si el nodo es terminal o no lo es se sabe desde que se creó, así que no hace falta generar movimientos.
+    # Tampoco se baja más allá de un nodo ya resuelto de forma exacta: su valor se conoce sin mirar sus hijos.
+    while not nodo.terminal and nodo.exacto is None:
         if nodo.movimientos_por_hacer:
-            return expand(nodo) # Construimos uno de sus hijos si aún hay movimientos por hacer.
+            # Construimos uno de sus hijos si aún hay movimientos por hacer. Si el hijo es nuevo, es el nodo elegido; si ya
+            # existía (una transposición), ya tiene estadísticas propias y seguimos bajando desde él.
+            if tiempos is None:
+                nodo, nuevo = expand(nodo, pos, tabla)
+            else:
+                inicio = time.perf_counter()
+                nodo, nuevo = expand(nodo, pos, tabla)
+                tiempos['expansion'] += time.perf_counter() - inicio
+            camino.append(nodo)
+            if nuevo:
+                break
         elif nodo.hijos:
-            nodo = mejor_hijo(nodo, 1.41) # Si ya no hay movimientos por hacer, el nodo ha sido expandido totalmente. Elegimos el mejor de los hijos.
+            # Si ya no hay movimientos por hacer, el nodo ha sido expandido totalmente. Elegimos el mejor de los hijos.
+            i = indice_mejor_hijo(nodo, 1.41)
+            pos.hacer(nodo.movimientos_hijos[i])
+            nodo = nodo.hijos[i]
+            camino.append(nodo)
         else:
             break # Si el nodo no tiene hijos terminamos el bucle.
 
-    return nodo
+    return camino
 
 def no_terminal(tablero, turno):
     '''
@@ -94,14 +508,14 @@ def no_terminal(tablero, turno):
     - turno: Número que indica qué jugador está en su turno (0: ninguno, 1: blancas, 2: negras).
     '''
 
-    # Primero comprobamos que el jugador actual tiene movimientos disponibles.
-    movimientos_propios = movimientos_disponibles(tablero, turno)
-    # Después comprobamos que, al pasar turno, el oponente debe tener movimientos disponibles, pues puede ser que el jugador actual no los tenga pero el oponente sí.
-    movimientos_oponente = movimientos_disponibles(tablero, 3 - turno) # "3 - turno" alterna el turno. Si turno es 2 (negras), 3-2=1 (blancas), si turno es 1, 3-1=2
+    # Se comprueba a la vez si el jugador actual tiene movimientos disponibles y si, al pasar turno, los tiene el oponente,
+    # pues puede ser que el jugador actual no los tenga pero el oponente sí.
+    blancas, negras = tablero_a_bitboards(tablero)
+    _, _, terminal = analizar_bb(*propias_y_rivales(blancas, negras, turno))
 
-    return movimientos_propios or movimientos_oponente
+    return not terminal
 
-def expand(nodo):
+def expand(nodo, pos, tabla=None):
     '''
     Esta función es crucial para construir el árbol, pues se encarga de construir los hijos de cada nodo. Aunque, en el contexto de la función y no de todo el
     algoritmo MCTS, crea y añade a la lista de hijos del nodo dado como parámetro uno de sus hijos.
@@ -109,26 +523,44 @@ def expand(nodo):
     PARÁMETROS
     - nodo: Nodo que se va a expandir parcialmente. En este caso, esta función sólo va a construir uno de los hijos, para expandirlo totalmente (construir todos
       sus posibles hijos) será necesario llamar a esta función varias veces.
+    - pos: Posición (Posicion) correspondiente al nodo. Al terminar, corresponde al hijo construido.
+    - tabla: Tabla de transposiciones (o None). Si la posición del hijo ya está en ella, se reutiliza su nodo.
+
+    Devuelve la tupla (hijo, nuevo), donde nuevo indica si el hijo se ha creado ahora o ya existía en la tabla de transposiciones.
     '''
 
     # Eliminamos el último movimiento disponible de la lista de movimientos por hacer del nodo.
     movimiento = nodo.movimientos_por_hacer.pop()
-    # Creamos un tablero nuevo para no modificar el tablero del propio nodo.
-    nuevo_tablero = copy.deepcopy(nodo.estado)
-    # Colocamos la ficha en la casilla indicada por el vector movimiento (fila, columna).
-    nuevo_tablero[movimiento[0]][movimiento[1]] = nodo.turno
-    # Volteamos las fichas que serán volteadas tras la colocación de la ficha.
-    fichas_a_voltear = obtener_fichas_a_voltear(nuevo_tablero, movimiento[0], movimiento[1], nodo.turno)
-    for (f, c) in fichas_a_voltear:
-        nuevo_tablero[f][c] = nodo.turno
-    # Creamos el hijo con: el nuevo tablero, el turno del otro jugador, el nodo padre y el movimiento que ha dado lugar a este nodo.
-    hijo = Nodo(nuevo_tablero, 3 - nodo.turno, padre=nodo, movimiento=movimiento)
-    # Añadimos el hijo a la lista de hijos del nodo padre.
+    # Colocamos la ficha y volteamos las fichas correspondientes sobre la propia posición, sin copiar el tablero.
+    pos.hacer(movimiento)
+    # Buscamos la nueva posición en la tabla de transposiciones por si ya se había llegado a ella por otro camino.
+    hijo = tabla.buscar(pos.clave) if tabla is not None else None
+    nuevo = hijo is None
+    if nuevo:
+        # Creamos el hijo con la nueva posición (de la que toma el turno del otro jugador) y lo guardamos en la tabla.
+        hijo = Nodo(pos)
+        if tabla is not None:
+            tabla.guardar(hijo)
+    # Añadimos el hijo, y el movimiento que lleva a él, a las listas de hijos del nodo padre.
     nodo.hijos.append(hijo)
+    nodo.movimientos_hijos.append(movimiento)
 
-    return hijo
+    return hijo, nuevo
 
 def mejor_hijo(nodo, c=1.41):
+    '''
+    Esta función devuelve el mejor hijo de un nodo según UCT (ver indice_mejor_hijo), o el propio nodo si no tiene hijos.
+
+    PARÁMETROS
+    - nodo: Nodo padre de entre cuyos hijos queremos elegir el mejor.
+    - c: Constante de exploración. Toma el valor 1.41 por defecto.
+    '''
+
+    if not nodo.hijos:
+        return nodo
+    return nodo.hijos[indice_mejor_hijo(nodo, c)]
+
+def indice_mejor_hijo(nodo, c=1.41):
     '''
     Esta función, dado un nodo y el parámetro c de la ecuación de UCT (pues nos basamos en UCT para elegir el mejor hijo), comprueba quién es el mejor 
     hijo. Haciendo un balance entre explotación y exploración, siendo lo último en función del parámetro c.
@@ -139,27 +571,29 @@ def mejor_hijo(nodo, c=1.41):
       Toma el valor 1.41 por defecto.
     '''
 
-    # En caso de que no haya nodos hijo porque se trate de un nodo de estado terminal, devolveremos el mismo nodo dado como parámetro.
-    # Esto es sólo una comprobación para que la función no tenga un error al recorrer la lista de hijos y devuelva None.
+    # En caso de que no haya nodos hijo porque se trate de un nodo de estado terminal, devolveremos None.
     if not nodo.hijos:
-        return nodo
+        return None
 
-    # "elegido" será el mejor hijo hasta el momento
+    # La parte del término de exploración que sólo depende del padre, c*sqrt(2*log(N)), se calcula una vez para todos los hijos.
+    exploracion = c*sqrt(2*log(nodo.n)) if nodo.n > 0 else 0.0
+    # "elegido" será la posición en la lista de hijos del mejor hijo hasta el momento
     elegido = None
-    uct = None
-    for h in nodo.hijos:
-        if h.n == 0:
-            uct_actual = float('inf') # Si h.n es 0, UCT será infinito a causa de dividir por 0.
-        else:
-            uct_actual = (h.q/h.n) + c*sqrt((2*log(nodo.n))/h.n)
-        # Si el UCT más alto registrado todavía no es un número o si es más bajo que el recién calculado se le asigna ese UCT que acabamos de calcular
-        if uct == None or uct_actual > uct:
+    uct = float('-inf')
+    for i, h in enumerate(nodo.hijos):
+        n = h.n
+        # Si n es 0, UCT sería infinito a causa de dividir por 0, así que el primer hijo sin visitas es el elegido.
+        if n == 0:
+            return i
+        uct_actual = h.q/n + exploracion/sqrt(n)
+        # Si el UCT más alto registrado es más bajo que el recién calculado se le asigna ese UCT que acabamos de calcular
+        if uct_actual > uct:
             uct = uct_actual
-            elegido = h
+            elegido = i
 
     return elegido
 
-def default_policy(nodo):
+def default_policy(nodo, pos, umbral_final=None, simulaciones=1, estadisticas=None):
     '''
     Esta función simula una partida desde el nodo dado como parámetro hasta el final. Una vez llegado al final de la partida devuelve la recompensa
     de dicho final. En caso de derrota (desde el punto de vista del jugador que tenía que colocar ficha en el primer movimiento de esta simulación)
@@ -167,50 +601,109 @@ def default_policy(nodo):
 
     PARÁMETROS
     - nodo: Nodo desde el cual se realiza la simulación de la partida hasta el final, eligiendo siempre acciones aleatorias en TODOS los turnos.
+    - pos: Posición (Posicion) correspondiente al nodo.
+    - umbral_final: Si la posición tiene como mucho este número de casillas vacías, en lugar de simular se devuelve el resultado
+      con juego perfecto (ver resultado_exacto), con la misma escala. None por defecto (simular siempre).
+    - simulaciones: Número de partidas a simular. Con más de una, se simulan todas a la vez con NumPy (ver simular_lote) y se
+      devuelve la media de sus recompensas, con mucha menos varianza que una sola partida y por mucho menos que simularlas
+      una a una. 1 por defecto.
+    - estadisticas: EstadisticasBusqueda en la que anotar el tiempo empleado y la longitud de la partida simulada, o None (por
+      defecto) para no medir nada.
+    '''
+
+    return recompensa(pos.propias, pos.rivales, umbral_final, simulaciones, estadisticas)
+
+def recompensa(propias, rivales, umbral_final=None, simulaciones=1, estadisticas=None):
+    '''
+    Esta función hace lo mismo que default_policy a partir de los bitboards de la posición, sin nodo ni Posicion: devuelve la
+    recompensa (+1, 0 o -1, o la media de varias simulaciones) desde el punto de vista del jugador que tiene el turno.
+
+    PARÁMETROS
+    - propias: Bitboard con las fichas del jugador que tiene el turno.
+    - rivales: Bitboard con las fichas del otro jugador.
+    - umbral_final, simulaciones, estadisticas: Ver default_policy. Con estadísticas, el tiempo se anota en la fase
+      "solucionador" o "simulacion".
     '''
 
-    # Primero copiamos el tablero inicial para no cambiar el tablero desde este nodo (aquí no recorremos el árbol, 
-    # sólo simulamos la partida partiendo de ese nodo, pero no cambiamos de nodo en ningún momento, por eso no queremos
-    # cambiar el estado del nodo dado como parámetro).
-    nuevo_tablero = copy.deepcopy(nodo.estado)
-    turno = nodo.turno
-    jugador_inicial = turno
-
-    # Empieza el bucle que terminará cuando el tablero se encuentre en un estado terminal
-    while no_terminal(nuevo_tablero, turno):
-        acciones = movimientos_disponibles(nuevo_tablero, turno)
-        if acciones:
-            movimiento = random.choice(acciones)
-            nuevo_tablero[movimiento[0]][movimiento[1]] = turno # Colocar la ficha
-            # Voltear las fichas que serán volteadas a causa de la colocación de la ficha anterior
-            fichas_a_voltear = obtener_fichas_a_voltear(nuevo_tablero, movimiento[0], movimiento[1], turno)
-            for (f, c) in fichas_a_voltear:
-                nuevo_tablero[f][c] = turno
+    if estadisticas is not None:
+        inicio = time.perf_counter()
+    if umbral_final is not None and casillas_vacias(propias, rivales) <= umbral_final:
+        valor = resultado_exacto(propias, rivales)
+        if estadisticas is not None:
+            estadisticas.soluciones_exactas += 1
+            estadisticas.tiempos['solucionador'] += time.perf_counter() - inicio
+        return valor
+    if simulaciones > 1:
+        # La semilla sale del módulo random para que una búsqueda con semilla fija (por ejemplo, en cada proceso de
+        # buscar_en_paralelo) también repita las simulaciones.
+        azar = np.random.default_rng(random.getrandbits(64))
+        valor = float(simular_lote(propias, rivales, simulaciones, azar).mean())
+    else:
+        valor, jugadas = simular_partida(propias, rivales)
+        if estadisticas is not None:
+            estadisticas.anadir_simulacion(jugadas)
+    if estadisticas is not None:
+        estadisticas.tiempos['simulacion'] += time.perf_counter() - inicio
+    return valor
+
+def simular_partida(propias, rivales):
+    '''
+    Esta función simula una partida aleatoria desde la posición dada hasta el final. Devuelve la tupla (recompensa, jugadas):
+    la recompensa (+1, 0 o -1) desde el punto de vista del jugador que tiene el turno, y el número de movimientos jugados.
+
+    PARÁMETROS
+    - propias: Bitboard con las fichas del jugador que tiene el turno.
+    - rivales: Bitboard con las fichas del otro jugador.
+    '''
+
+    # Los bitboards son enteros (inmutables), así que la simulación trabaja sobre copias locales que no cuestan nada y no cambia
+    # la posición de la que salen. Sólo importa si al final el turno es del jugador inicial o del otro.
+    jugador_inicial = 1
+    turno = jugador_inicial
+    # Cada movimiento añade una ficha, así que las jugadas se obtienen al final de las fichas que hay en el tablero
+    fichas_iniciales = contar(propias | rivales)
+
+    # Empieza el bucle que terminará cuando el tablero se encuentre en un estado terminal, es decir, cuando ninguno
+    # de los dos jugadores pueda colocar ficha. En cada jugada se generan los movimientos una sola vez: los del oponente
+    # sólo hacen falta cuando el jugador actual no puede mover, para distinguir un paso de turno del final de la partida.
+    while True:
+        acciones = movimientos_bb(propias, rivales)
+        if not acciones:
+            if not movimientos_bb(rivales, propias):
+                break
+        else:
+            casilla = random.choice(casillas(acciones))
+            # Colocar la ficha y voltear las fichas que serán volteadas a causa de su colocación
+            volteadas = volteos_bb(propias, rivales, casilla)
+            propias |= (1 << casilla) | volteadas
+            rivales ^= volteadas
         # Cambiar de turno
+        propias, rivales = rivales, propias
         turno = 3 - turno
 
     # Aquí comprobamos quién ha ganado y devolvemos la recompensa correspondiente
-    ganador = obtener_ganador(nuevo_tablero)
-    if ganador == jugador_inicial:
-        return 1
-    elif ganador == 0:
-        return 0
+    fichas_propias = contar(propias if turno == jugador_inicial else rivales)
+    fichas_rivales = contar(rivales if turno == jugador_inicial else propias)
+    jugadas = fichas_propias + fichas_rivales - fichas_iniciales
+    if fichas_propias > fichas_rivales:
+        return 1, jugadas
+    elif fichas_propias == fichas_rivales:
+        return 0, jugadas
     else:
-        return -1
+        return -1, jugadas
 
-def backup(nodo, recompensa):
+def backup(camino, recompensa):
     '''
-    Esta función retropropaga la recompensa por todos los nodos hasta el nodo raíz del árbol.
+    Esta función retropropaga la recompensa por todos los nodos del camino recorrido hasta el nodo raíz del árbol.
 
     PARÁMETROS
-    - nodo: Nodo final desde el cual retropagamos la recompensa.
-    - recompensa: Etiqueta asignada en ese nodo final dado como parámetro y que será propagada por los nodos anteriores.
+    - camino: Lista de nodos recorridos en la iteración, desde la raíz hasta el nodo final desde el cual retropagamos la recompensa.
+    - recompensa: Etiqueta asignada en ese nodo final y que será propagada por los nodos anteriores.
     '''
 
-    while nodo is not None:
+    for nodo in camino:
         nodo.n = nodo.n + 1 # Al nodo se le añade una visita, correspondiente a la partida simulada actualmente.
         nodo.q = nodo.q + recompensa # Al nodo se le añade la recompensa al total de recompensas de todas las partidas que han pasado por este nodo.
-        nodo = nodo.padre # Retrocedemos en el árbol para propagar la recompensa por el nodo padre al nodo actual.
 
 def mejor_movimiento(nodo):
     '''
@@ -220,5 +713,19 @@ def mejor_movimiento(nodo):
     - nodo: Nodo desde el cuál se toma la decisión de hacer un movimiento u otro.
     '''
 
-    mejor_hijo_nodo = mejor_hijo(nodo, 0)  # c=0 => solo explota, no explora, puesto que queremos el mejor movimiento asegurado
-    return mejor_hijo_nodo.movimiento
\ No newline at end of file
+    movimiento = nodo.movimientos_hijos[indice_mejor_hijo(nodo, 0)]  # c=0 => solo explota, no explora, puesto que queremos el mejor movimiento asegurado
+    return (movimiento >> 3, movimiento & 7) # Pasamos la casilla a coordenadas (fila, col)
+
+def movimiento_mas_visitado(nodo):
+    '''
+    Esta función devuelve las coordenadas del movimiento cuyo hijo tiene más visitas. Con la selección PUCT, las visitas ya
+    reflejan a la vez lo bueno que es cada movimiento y lo seguro que se está de ello, así que son un criterio más estable
+    que la recompensa media.
+
+    PARÁMETROS
+    - nodo: Nodo desde el cuál se toma la decisión de hacer un movimiento u otro.
+    '''
+
+    i = max(range(len(nodo.hijos)), key=lambda i: nodo.hijos[i].n)
+    movimiento = nodo.movimientos_hijos[i]
+    return (movimiento >> 3, movimiento & 7)
@@ -2,14 +2,49 @@ import sys
 import os
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 from utiles.fichas import movimientos_disponibles, obtener_fichas_a_voltear, obtener_ganador
+from utiles.simetrias import forma_canonica, instantaneas_simetricas, aplicar_simetria_casillas, simetria_inversa, NUM_SIMETRIAS
 import numpy as np
-from keras._tf_keras.keras.models import load_model
 
 from mcts.motor_mcts import *
+from mcts.cache_evaluaciones import CacheEvaluaciones
+from mcts.motor_mcts import SesionMCTS as SesionMCTSClasica
 
 
-"""Cargamos el modelo anteriormente creado, entrenado y guardado en othello_net"""
-modelo_valor = load_model("red_neuronal/othello_neuronal_entrenada.h5", compile=False)
+RUTA_MODELO = "red_neuronal/othello_neuronal_entrenada.h5"
+
+"""Motor con el que se evalua la red: "numpy" (red_neuronal/inferencia_numpy, sin importar TensorFlow) o "keras".
+Se puede elegir con la variable de entorno OTELO_BACKEND o, ya importado el modulo, con seleccionar_backend."""
+BACKEND = os.environ.get("OTELO_BACKEND", "numpy")
+
+
+def cargar_modelo(backend): #Como entrada tiene el nombre del motor de inferencia.
+    """
+    Carga el modelo anteriormente creado, entrenado y guardado en othello_net con el motor indicado. Los dos
+    devuelven un objeto con predict_on_batch, asi que el resto del modulo no depende del motor elegido.
+    """
+
+    if backend == "numpy":
+        from red_neuronal.inferencia_numpy import cargar_othello_net
+        return cargar_othello_net(RUTA_MODELO)
+    elif backend == "keras":
+        from keras._tf_keras.keras.models import load_model
+        return load_model(RUTA_MODELO, compile=False)
+    raise ValueError(f"Backend desconocido: {backend} (debe ser 'numpy' o 'keras')")
+
+
+def seleccionar_backend(backend): #Como entrada tiene el nombre del motor de inferencia.
+    global modelo_valor, BACKEND
+    modelo_valor = cargar_modelo(backend)
+    BACKEND = backend
+    cache_valores.limpiar() #Los valores guardados son del modelo anterior
+
+
+"""Cargamos el modelo con el motor elegido"""
+modelo_valor = cargar_modelo(BACKEND)
+
+"""Cache de valores de la red compartida por todas las sesiones del proceso, asi que sirve entre busquedas, jugadas y partidas
+(ver CacheEvaluaciones en mcts/cache_evaluaciones). Con procesos > 1 cada proceso tiene la suya."""
+cache_valores = CacheEvaluaciones()
 
 
 def estado_a_tensor(estado): #Como entrada tiene un tablero 8x8 con valores 0, 1 o 2.
@@ -31,44 +66,424 @@ def estado_a_tensor(estado): #Como entrada tiene un tablero 8x8 con valores 0, 1
     return tensor #Como salida tiene un tensor (similar a un tablero) por canales en lugar de valores
 
 
+def instantaneas_a_tensor(instantaneas): #Como entrada tiene una lista de instantaneas (blancas, negras, turno) de varias posiciones.
+    """
+    Hace lo mismo que estado_a_tensor pero para varias posiciones a la vez y a partir de los bitboards, sin pasar por el tablero 8x8.
+    Devuelve un tensor de forma (N, 8, 8, 2), listo para evaluar todas las posiciones con una sola llamada a la red.
+
+    Cada bitboard se ve como 8 bytes (uno por fila, en little endian) y con unpackbits sacamos sus 64 bits en el orden
+    fila*8 + col, que es justo el orden de las casillas del tensor.
+    """
+
+    bitboards = np.array([(negras, blancas) for blancas, negras, _ in instantaneas], dtype='<u8')
+    bits = np.unpackbits(bitboards.view(np.uint8), bitorder='little').reshape(len(instantaneas), 2, 8, 8)
+    return bits.transpose(0, 2, 3, 1).astype(np.float32) #Canal 0: negras, canal 1: blancas
+
+
+def posicion_a_tensor(pos): #Como entrada tiene una posicion (Posicion) con los bitboards de cada color.
+    """
+    Convierte una unica posicion a un tensor (1, 8, 8, 2), igual que estado_a_tensor.
+    """
+
+    return instantaneas_a_tensor([pos.instantanea()])
+
+
+"""Formas de usar las 8 simetrias del tablero al evaluar (ver utiles/simetrias):
+- "ninguna": se evalua la posicion tal cual.
+- "canonica": se evalua la forma canonica de la posicion, asi que posiciones simetricas reciben exactamente el mismo valor
+  y, dentro de un lote, solo se evalua una de ellas.
+- "promedio": se evaluan las 8 versiones simetricas y se toma la media, que suaviza los errores de la red (a cambio de
+  evaluar 8 veces mas tableros)."""
+MODOS_SIMETRIA = ("ninguna", "canonica", "promedio")
+
+"""Formas de elegir el hijo al bajar por el arbol:
+- "uct": UCT, igual que el MCTS clasico (ver indice_mejor_hijo en motor_mcts).
+- "puct": PUCT, que reparte la exploracion segun la probabilidad que da la cabeza de politica de la red a cada movimiento
+  (ver indice_puct). Si el modelo no tiene cabeza de politica, todos los movimientos tienen la misma probabilidad."""
+MODOS_SELECCION = ("uct", "puct")
+
+"""Constante de exploracion de PUCT"""
+C_PUCT = 1.5
+
+
+def predecir(instantaneas, con_politica=False): #Como entrada tiene una lista de instantaneas (blancas, negras, turno).
+    """
+    Evalua con la red todas las posiciones en una unica pasada hacia delante. Con predict_on_batch nos ahorramos
+    la preparacion del dataset y las barras de progreso que predict hace en cada llamada, que para un lote
+    pequeño cuesta mucho mas que la propia red.
+
+    Con con_politica=True devuelve la tupla (valores, politicas), con las 64 probabilidades de la cabeza de politica por
+    posicion, o None en lugar de las politicas si el modelo no tiene esa cabeza (los modelos entrenados antes de añadirla).
+    """
+
+    salida = modelo_valor.predict_on_batch(instantaneas_a_tensor(instantaneas))
+    v, p = salida if isinstance(salida, (list, tuple)) else (salida, None)
+    v = np.asarray(v, dtype=np.float32)[:, 0] #Un valor en [-1,+1] por cada posicion
+    if not con_politica:
+        return v
+    return v, (None if p is None else np.asarray(p, dtype=np.float32))
+
+
+def clave_evaluacion(instantanea, simetria): #Como entrada tiene una instantanea y el modo de simetria.
+    """
+    Devuelve la tupla (clave, s): la clave con la que se guarda en la cache la evaluacion de la posicion y la simetria s
+    que lleva la posicion a la orientacion de la clave. La clave es la posicion que se evalua de verdad: la propia
+    instantanea sin simetrias y su forma canonica con "canonica", asi que los dos modos comparten los valores. Con "promedio"
+    el valor es otro (la media de las 8 simetrias), y se guarda aparte con la forma canonica, que tiene la misma media.
+    """
+
+    if simetria == "ninguna":
+        return instantanea, 0
+    blancas, negras, turno = instantanea
+    blancas, negras, s = forma_canonica(blancas, negras)
+    if simetria == "canonica":
+        return (blancas, negras, turno), s
+    elif simetria == "promedio":
+        return ("promedio", blancas, negras, turno), s
+    raise ValueError(f"Modo de simetria desconocido: {simetria} (debe ser uno de {MODOS_SIMETRIA})")
+
+
+def evaluar_claves(claves, simetria): #Como entrada tiene una lista de claves (ver clave_evaluacion) sin repetir y el modo de simetria.
+    """
+    Evalua con la red las posiciones de las claves en una unica pasada. Devuelve la tupla (valores, politicas), con las
+    politicas en la orientacion de cada clave (o None si el modelo no tiene cabeza de politica).
+
+    Con "promedio", la politica de cada version simetrica se devuelve a la orientacion de la clave antes de hacer la media.
+    """
+
+    if simetria != "promedio":
+        return predecir(claves, con_politica=True)
+    simetricas = [s for clave in claves for s in instantaneas_simetricas(clave[1:])]
+    v, p = predecir(simetricas, con_politica=True)
+    v = v.reshape(len(claves), NUM_SIMETRIAS).mean(axis=1)
+    if p is None:
+        return v, None
+    p = p.reshape(len(claves), NUM_SIMETRIAS, 64)
+    return v, np.mean([aplicar_simetria_casillas(p[:, s], simetria_inversa(s)) for s in range(NUM_SIMETRIAS)], axis=0)
+
+
+def evaluar_lote(instantaneas, simetria="ninguna", cache=None, con_politica=False): #Como entrada tiene una lista de instantaneas, el modo de simetria, la cache de valores y si se quiere la politica.
+    """
+    Evalua las posiciones con la red segun el modo de simetria elegido (ver MODOS_SIMETRIA).
+
+    Las posiciones repetidas en el lote se evaluan una sola vez, tambien si llegan en distintas orientaciones y el modo de
+    simetria las lleva a la misma clave. Con cache (CacheEvaluaciones), las posiciones que ya estan en ella
+    no se pasan a la red, y las evaluadas se guardan.
+
+    Con con_politica=True devuelve la tupla (valores, politicas), con las politicas (N, 64) ya en la orientacion de cada
+    posicion, o None si el modelo no tiene cabeza de politica.
+    """
+
+    claves = [clave_evaluacion(i, simetria) for i in instantaneas]
+    #Sin repetidas y en el mismo orden. Se deduplica solo por la clave: la misma posicion en otra orientacion se evalua una
+    #vez y la simetria de cada instantanea se aplica al repartir los resultados
+    unicas = list(dict.fromkeys(clave for clave, _ in claves))
+    evaluaciones = {} #{clave: (valor, politica o None)}
+    for clave in unicas:
+        evaluacion = cache.buscar(clave) if cache is not None else None
+        if evaluacion is not None:
+            evaluaciones[clave] = evaluacion
+    pendientes = [clave for clave in unicas if clave not in evaluaciones]
+    if pendientes:
+        valores, politicas = evaluar_claves(pendientes, simetria)
+        for i, clave in enumerate(pendientes):
+            #La politica se guarda en float16 para que la cache ocupe la mitad
+            evaluacion = (float(valores[i]), None if politicas is None else politicas[i].astype(np.float16))
+            evaluaciones[clave] = evaluacion
+            if cache is not None:
+                cache.guardar(clave, evaluacion)
+
+    valores = np.array([evaluaciones[clave][0] for clave, _ in claves], dtype=np.float32)
+    if not con_politica:
+        return valores
+    if any(evaluaciones[clave][1] is None for clave, _ in claves):
+        return valores, None
+    politicas = np.array([aplicar_simetria_casillas(evaluaciones[clave][1], simetria_inversa(s)) for clave, s in claves],
+                         dtype=np.float32)
+    return valores, politicas
 
-class Nodo:
-    def __init__(self, estado, turno, padre=None, movimiento=None):
-        self.estado = estado
-        self.turno = turno
-        self.padre = padre
-        self.hijos = []
-        self.n = 0
-        self.q = 0
-        self.movimientos_por_hacer = movimientos_disponibles(estado, turno)
-        self.movimiento = movimiento
 
+def aplicar_perdida_virtual(camino, perdida, deshacer=False, con_signo=False): #Como entrada tiene el camino hasta la hoja elegida y la perdida virtual a aplicar.
+    """
+    Mientras una hoja espera a que la red la evalue, contamos ya su visita y le restamos una recompensa "perdida"
+    en todo el camino hasta la raiz. Asi, el resto de bajadas del mismo lote ven ese camino como peor y eligen otras
+    hojas en lugar de repetir la misma. Con deshacer=True se quita la perdida virtual antes de retropropagar el valor real.
 
-def default_policy(nodo): #Como entrada tiene el nodo inicial, del que solo tomaremos el estado que es el tablero 8x8.
+    Con con_signo=True (seleccion PUCT, que compara los valores desde el punto de vista del jugador que elige) la perdida es
+    para el jugador que eligio cada nodo: se resta si lo eligieron las blancas y se suma si lo eligieron las negras.
     """
-    En lugar de jugar aleatorio hasta el final, convertimos el estado
-    nodo.estado (8×8) a tensor (1,8,8,2) y pedimos a la red un valor [-1,+1].
 
-    Con predict, le pasamos a la red el tablero convertido a tensor y nos da el valor de la recompensa,
-    colocamos verbose=0 para que no muestre la progresion de la predicción.
+    visitas, perdida = (-1, -perdida) if deshacer else (1, perdida)
+    padre = None
+    for nodo in camino:
+        nodo.n += visitas
+        nodo.q += perdida if con_signo and padre is not None and padre.turno == 2 else -perdida
+        padre = nodo
+
+
+def asignar_priores(nodo, politica): #Como entrada tiene un nodo y la politica de la red (64 probabilidades) para su posicion.
+    """
+    Guarda en el nodo la probabilidad que da la red a cada uno de sus movimientos, normalizada entre los movimientos legales,
+    y ordena los movimientos por hacer de menor a mayor probabilidad, porque expand construye primero el ultimo.
+    """
+
+    movimientos = nodo.movimientos_hijos + nodo.movimientos_por_hacer
+    if not movimientos:
+        return
+    total = float(sum(politica[m] for m in movimientos))
+    if total > 0:
+        nodo.priores = {m: float(politica[m]) / total for m in movimientos}
+    else:
+        nodo.priores = {m: 1 / len(movimientos) for m in movimientos}
+    nodo.movimientos_por_hacer.sort(key=nodo.priores.__getitem__)
+
 
-    Como la red neuronal devuelve una matriz de 1x1, tenemos que acceder a ese valor con el índice v[0, 0], y tomarlo como float
+def indice_puct(nodo, c=C_PUCT): #Como entrada tiene el nodo del que se elige el hijo y la constante de exploracion.
     """
-    
-    tensor = estado_a_tensor(nodo.estado)          
-    v = modelo_valor.predict(tensor, verbose=0)    
-    return float(v[0, 0]) #Y como salida tiene el valor de recompensa predicho por la red
+    Elige el hijo con PUCT: Q + c * P * sqrt(N) / (1 + n), donde Q es la recompensa media del hijo desde el punto de vista
+    del jugador que elige (q se guarda desde el de las blancas), P la probabilidad del movimiento segun la red, N las visitas
+    del nodo y n las del hijo. Asi la exploracion se concentra en los movimientos que la red considera buenos.
+
+    Los movimientos aun sin hijo compiten con el de mayor probabilidad (el ultimo de movimientos_por_hacer, ver asignar_priores),
+    con la recompensa media del propio nodo como Q. Devuelve el indice del hijo elegido, o None si hay que construir ese movimiento.
+    """
+
+    signo = 1 if nodo.turno == 1 else -1
+    uniforme = 1 / (len(nodo.hijos) + len(nodo.movimientos_por_hacer))
+    priores = nodo.priores
+    exploracion = c * sqrt(max(nodo.n, 1))
+    q_nuevo = signo * nodo.q / nodo.n if nodo.n > 0 else 0.0
+
+    elegido = None
+    mejor = None
+    if nodo.movimientos_por_hacer:
+        mejor = q_nuevo + exploracion * (priores[nodo.movimientos_por_hacer[-1]] if priores else uniforme)
+    for i, (hijo, movimiento) in enumerate(zip(nodo.hijos, nodo.movimientos_hijos)):
+        q = signo * hijo.q / hijo.n if hijo.n > 0 else q_nuevo
+        puct = q + exploracion * (priores[movimiento] if priores else uniforme) / (1 + hijo.n)
+        if mejor is None or puct > mejor:
+            mejor = puct
+            elegido = i
+    return elegido
+
+
+def tree_policy_puct(nodo, pos, tabla=None, c=C_PUCT): #Como entrada tiene la raiz, su posicion (Posicion), la tabla de transposiciones y la constante de PUCT.
+    """
+    Igual que tree_policy de motor_mcts, pero eligiendo en cada nodo con indice_puct. A diferencia de UCT, no hace falta
+    construir todos los hijos de un nodo antes de volver a bajar por uno de ellos: los movimientos poco probables segun la
+    red pueden no llegar a construirse nunca. Devuelve el camino recorrido.
+    """
+
+    camino = [nodo]
+    while not nodo.terminal and nodo.exacto is None and (nodo.hijos or nodo.movimientos_por_hacer):
+        i = indice_puct(nodo, c)
+        if i is None:
+            nodo, nuevo = expand(nodo, pos, tabla)
+            camino.append(nodo)
+            if nuevo:
+                break
+        else:
+            pos.hacer(nodo.movimientos_hijos[i])
+            nodo = nodo.hijos[i]
+            camino.append(nodo)
+    return camino
+
+
+def valor_final(pos): #Como entrada tiene una posicion (Posicion) con pocas casillas vacias.
+    """
+    Resuelve la posicion de forma exacta (ver mcts/solucionador_final) y devuelve el resultado con juego perfecto en la misma
+    escala que la red: +1 si ganan las blancas, 0 si empatan y -1 si ganan las negras.
+    """
+
+    resultado = resultado_exacto(pos.propias, pos.rivales) #Desde el punto de vista del jugador en su turno
+    return resultado if pos.turno == 1 else -resultado
+
+
+def default_policy(nodo, pos, simetria="ninguna", umbral_final=None, cache=None): #Como entrada tiene el nodo al que se ha llegado, la posicion (Posicion) correspondiente, el modo de simetria, el umbral del solucionador exacto y la cache de valores.
+    """
+    En lugar de jugar aleatorio hasta el final, convertimos la posicion
+    del nodo a tensor (1,8,8,2) y pedimos a la red un valor [-1,+1].
+
+    Con evaluar_lote, le pasamos a la red un lote con un unico tablero y nos da el valor de la recompensa.
 
-def mcts(tablero, turno, iteraciones=500):
-    root = Nodo(tablero, turno)
-    for _ in range(iteraciones):
-        nodo = tree_policy(root)
-        recompensa = default_policy(nodo)
-        backup(nodo, recompensa)
+    Como evaluar_lote devuelve un valor por posicion, tenemos que acceder al unico valor con el índice v[0], y tomarlo como float
+
+    Si quedan umbral_final casillas vacias o menos, no hace falta la red: devolvemos el resultado exacto (ver valor_final).
+    """
+
+    if umbral_final is not None and casillas_vacias(pos.propias, pos.rivales) <= umbral_final:
+        return float(valor_final(pos))
+
+    v = evaluar_lote([pos.instantanea()], simetria, cache)
+    return float(v[0]) #Y como salida tiene el valor de recompensa predicho por la red
+
+class SesionMCTS(SesionMCTSClasica):
+    def __init__(self, lote=16, perdida_virtual=1.0, transposiciones=True, tabla=None, procesos=1, simetria="ninguna",
+                 umbral_final=UMBRAL_FINAL, libro=None, cache=True, seleccion="uct", c_puct=C_PUCT):
+        """
+        Sesion de busqueda que conserva el arbol entre jugadas (ver SesionMCTS en motor_mcts), pero evaluando las hojas con la red.
+
+        Con procesos > 1 cada proceso evalua con su propia copia del modelo, asi que conviene usar el backend "numpy".
+        Con simetria se elige como se usan las simetrias del tablero al evaluar (ver MODOS_SIMETRIA). Los nodos del arbol
+        siguen siendo de cada orientacion, porque sus movimientos dependen de ella.
+        Con umbral_final, las posiciones con pocas casillas vacias se resuelven de forma exacta, y con libro las de la apertura
+        se juegan desde el libro (ver SesionMCTS en motor_mcts).
+        Con cache=True los valores de la red se guardan en la cache compartida del modulo (cache_valores), que se conserva entre
+        busquedas, jugadas y partidas; tambien se puede pasar una CacheEvaluaciones propia, o False para no usar cache.
+        Con seleccion="puct" se baja por el arbol con PUCT usando la cabeza de politica de la red (ver MODOS_SELECCION), y
+        se juega el movimiento con mas visitas.
+        """
+        if simetria not in MODOS_SIMETRIA:
+            raise ValueError(f"Modo de simetria desconocido: {simetria} (debe ser uno de {MODOS_SIMETRIA})")
+        if seleccion not in MODOS_SELECCION:
+            raise ValueError(f"Modo de seleccion desconocido: {seleccion} (debe ser uno de {MODOS_SELECCION})")
+        super().__init__(transposiciones, tabla, procesos, umbral_final, libro)
+        self.lote = lote
+        self.perdida_virtual = perdida_virtual
+        self.simetria = simetria
+        self.cache = cache_valores if cache is True else (cache or None)
+        self.seleccion = seleccion
+        self.c_puct = c_puct
+        self.por_visitas = seleccion == "puct"
+
+    def opciones(self):
+        return {'lote': self.lote, 'perdida_virtual': self.perdida_virtual, 'transposiciones': self.transposiciones,
+                'simetria': self.simetria, 'umbral_final': self.umbral_final, 'cache': self.cache is not None,
+                'seleccion': self.seleccion, 'c_puct': self.c_puct}
+
+    def iterar(self, root, pos, presupuesto, estadisticas=None):
+        """
+        Igual que el MCTS clasico, pero en lugar de evaluar cada hoja por separado se recogen "lote" hojas (usando perdida
+        virtual para que sean distintas), se evaluan todas con una sola pasada de la red y despues se retropropagan sus valores.
+        Con lote=1 el algoritmo es el mismo que evaluar hoja a hoja. Las hojas con pocas casillas vacias no van a la red:
+        se resuelven de forma exacta y se retropropagan en el momento. El resultado se guarda en el nodo (ver
+        Nodo.exacto en motor_mcts), asi que cada posicion se resuelve una sola vez.
+
+        Con seleccion="puct", al evaluar cada hoja se guardan tambien en su nodo las probabilidades de sus movimientos segun
+        la red (ver asignar_priores), y la raiz se evalua antes de empezar si aun no las tiene.
+
+        Con estadisticas (ver mcts/instrumentacion) se anotan ademas el tiempo de cada fase, la profundidad de cada hoja, el
+        tamaño de cada lote, las posiciones que evalua la red y los aciertos de la cache. Con seleccion="uct" la construccion
+        de nodos nuevos se mide aparte ("expansion"); con "puct" va incluida en la seleccion. Sin estadisticas no se mide nada.
+
+        El presupuesto se comprueba despues de cada lote. Devuelve la tupla (iteraciones hechas, nodos nuevos creados).
+        """
+
+        medir = estadisticas is not None
+        tiempos = estadisticas.tiempos if medir else None
+        if medir and self.cache is not None:
+            aciertos, fallos = self.cache.aciertos, self.cache.fallos
+        #Con "promedio" cada posicion que llega a la red se evalua en sus 8 simetrias
+        evaluaciones_por_hoja = NUM_SIMETRIAS if self.simetria == "promedio" else 1
+        puct = self.seleccion == "puct"
+        if puct and root.priores is None and root.movimientos_por_hacer:
+            if medir:
+                inicio = time.perf_counter()
+            _, politicas = evaluar_lote([pos.instantanea()], self.simetria, self.cache, con_politica=True)
+            if politicas is not None:
+                asignar_priores(root, politicas[0])
+            if medir:
+                tiempos['evaluacion'] += time.perf_counter() - inicio
+
+        presupuesto.cada = presupuesto.siguiente = 1 #Cada lote ya cuesta mucho mas que consultar el reloj
+        hechas = 0
+        nodos = 0
+        while not presupuesto.agotado(hechas, nodos):
+            restantes = presupuesto.restantes(hechas, nodos) #Cada lote se corta para no pasarse de las iteraciones ni de los nodos
+            caminos = []
+            instantaneas = []
+            for _ in range(self.lote if restantes is None else min(self.lote, restantes)):
+                if medir:
+                    inicio = time.perf_counter()
+                    expansion = tiempos['expansion']
+                camino = tree_policy_puct(root, pos, self.tabla, self.c_puct) if puct else tree_policy(root, pos, self.tabla, tiempos)
+                if medir:
+                    #El tiempo de expansion ya se ha sumado dentro de tree_policy
+                    tiempos['seleccion'] += time.perf_counter() - inicio - (tiempos['expansion'] - expansion)
+                    estadisticas.anadir_hoja(len(camino) - 1)
+                if camino[-1].n == 0:
+                    nodos += 1
+                hoja = camino[-1]
+                if hoja.exacto is None and self.umbral_final is not None and casillas_vacias(pos.propias, pos.rivales) <= self.umbral_final:
+                    #Se resuelve una sola vez: el resultado se guarda en el nodo y la busqueda ya no baja mas alla de el
+                    if medir:
+                        inicio = time.perf_counter()
+                    hoja.exacto = float(valor_final(pos))
+                    if medir:
+                        estadisticas.soluciones_exactas += 1
+                        tiempos['solucionador'] += time.perf_counter() - inicio
+                if hoja.exacto is not None:
+                    if medir:
+                        inicio = time.perf_counter()
+                    backup(camino, hoja.exacto)
+                    pos.volver(0)
+                    if medir:
+                        tiempos['retropropagacion'] += time.perf_counter() - inicio
+                    hechas += 1
+                    continue
+                if medir:
+                    inicio = time.perf_counter()
+                instantaneas.append(pos.instantanea())
+                aplicar_perdida_virtual(camino, self.perdida_virtual, con_signo=puct)
+                caminos.append(camino)
+                pos.volver(0) #Deshacemos la bajada por el arbol para volver a la posicion de la raiz
+                if medir:
+                    tiempos['seleccion'] += time.perf_counter() - inicio
+
+            if not caminos:
+                continue
+            if medir:
+                inicio = time.perf_counter()
+                fallos_lote = self.cache.fallos if self.cache is not None else 0
+            valores, politicas = evaluar_lote(instantaneas, self.simetria, self.cache, con_politica=True)
+            if medir:
+                estadisticas.lotes.append(len(instantaneas))
+                #Sin cache, todas las hojas del lote pasan por la red
+                hojas_red = self.cache.fallos - fallos_lote if self.cache is not None else len(instantaneas)
+                estadisticas.evaluaciones_red += hojas_red * evaluaciones_por_hoja
+                tiempos['evaluacion'] += time.perf_counter() - inicio
+                inicio = time.perf_counter()
+            for i, (camino, recompensa) in enumerate(zip(caminos, valores)):
+                aplicar_perdida_virtual(camino, self.perdida_virtual, deshacer=True, con_signo=puct)
+                backup(camino, float(recompensa))
+                if puct and politicas is not None and camino[-1].priores is None:
+                    asignar_priores(camino[-1], politicas[i])
+            if medir:
+                tiempos['retropropagacion'] += time.perf_counter() - inicio
+            hechas += len(caminos)
+
+        if medir and self.cache is not None:
+            estadisticas.cache_aciertos += self.cache.aciertos - aciertos
+            estadisticas.cache_fallos += self.cache.fallos - fallos
+        return hechas, nodos
+
+
+def mcts(tablero, turno, iteraciones=500, lote=16, perdida_virtual=1.0, transposiciones=True, tabla=None, procesos=1,
+         tiempo=None, max_nodos=None, con_info=False, simetria="ninguna", umbral_final=UMBRAL_FINAL, libro=None, cache=True,
+         seleccion="uct", c_puct=C_PUCT, estadisticas=None):
+    """
+    Busca el mejor movimiento con MCTS evaluando las hojas con la red por lotes (ver SesionMCTS.iterar). Cada llamada
+    empieza un arbol nuevo; para conservarlo entre jugadas se usa SesionMCTS.
+
+    Con transposiciones, una posicion a la que se llega por otro orden de movimientos reutiliza el nodo ya evaluado, asi
+    que la red no la vuelve a evaluar (ver TablaTransposiciones en mcts/transposiciones).
+
+    Con procesos > 1, la busqueda es paralela en la raiz (ver buscar_en_paralelo en mcts/paralelo).
+
+    Con tiempo (segundos) o max_nodos la busqueda para al agotar cualquiera de los limites (iteraciones=None para no limitar
+    las iteraciones), y con con_info=True devuelve tambien cuantas iteraciones ha hecho (ver mcts en motor_mcts).
+
+    Con simetria="canonica" o "promedio" la red evalua usando las simetrias del tablero (ver MODOS_SIMETRIA).
+
+    Con umbral_final casillas vacias o menos, la posicion se resuelve de forma exacta en lugar de buscar (None para no hacerlo).
+    Con libro, las posiciones de la apertura que esten en el libro se juegan sin buscar (ver mcts/libro_aperturas).
+    Con cache, los valores de la red se reutilizan entre llamadas (ver SesionMCTS).
+    Con seleccion="puct", la bajada por el arbol usa la cabeza de politica de la red (ver MODOS_SELECCION).
+    Con estadisticas (una EstadisticasBusqueda, ver mcts/instrumentacion) se anota donde se va el tiempo de la busqueda.
+    """
 
-    if not root.hijos:
-        return None
-    return mejor_movimiento(root)
+    return SesionMCTS(lote, perdida_virtual, transposiciones, tabla, procesos, simetria, umbral_final, libro, cache, seleccion,
+                      c_puct).buscar(tablero, turno, iteraciones, tiempo, max_nodos, con_info, estadisticas=estadisticas)
 
 
 
@@ -0,0 +1,166 @@
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+# Imports
+import atexit
+import multiprocessing
+import random
+import time
+from utiles.posicion import Posicion
+
+# Grupos de procesos ya creados, por número de procesos. Crear los procesos cuesta mucho más que una búsqueda corta,
+# así que se crean una sola vez y se reutilizan en todas las búsquedas.
+_pools = {}
+
+# Evento de cancelación de cada grupo de procesos, por número de procesos. Se comparte con los procesos al crearlos, porque
+# el evento de cancelación de una búsqueda (threading.Event) sólo existe en el proceso principal.
+_cancelaciones = {}
+
+# En cada proceso de un grupo, el evento de cancelación de su grupo
+_cancelacion_proceso = None
+
+# Segundos entre dos comprobaciones de la cancelación mientras se espera a los procesos
+CADA_ESPERA = 0.02
+
+
+def obtener_pool(procesos):
+    '''
+    Esta función devuelve un grupo de procesos (multiprocessing.Pool) con el número de procesos indicado, creándolo la primera vez.
+
+    PARÁMETROS
+    - procesos: Número de procesos del grupo.
+    '''
+
+    if procesos not in _pools:
+        _cancelaciones[procesos] = multiprocessing.Event()
+        _pools[procesos] = multiprocessing.Pool(procesos, iniciar_trabajador, (_cancelaciones[procesos],))
+    return _pools[procesos]
+
+def iniciar_trabajador(cancelacion):
+    '''
+    Esta función se ejecuta al arrancar cada proceso de un grupo y guarda el evento de cancelación del grupo.
+
+    PARÁMETROS
+    - cancelacion: Evento (multiprocessing.Event) que, al activarse, termina las búsquedas en marcha en los procesos del grupo.
+    '''
+
+    global _cancelacion_proceso
+    _cancelacion_proceso = cancelacion
+
+@atexit.register
+def cerrar_pools():
+    '''
+    Esta función termina todos los grupos de procesos creados. Se llama automáticamente al salir del programa.
+    '''
+
+    for pool in _pools.values():
+        pool.terminate()
+    _pools.clear()
+
+
+def estadisticas_raiz(raiz):
+    '''
+    Esta función devuelve un diccionario {casilla: (n, q)} con las visitas y la recompensa total de cada hijo de la raíz.
+
+    PARÁMETROS
+    - raiz: Nodo raíz de una búsqueda.
+    '''
+
+    return {m: (h.n, h.q) for m, h in zip(raiz.movimientos_hijos, raiz.hijos)}
+
+def combinar_estadisticas(lista_estadisticas):
+    '''
+    Esta función suma las visitas y recompensas de cada movimiento de la raíz obtenidas por varias búsquedas independientes.
+
+    PARÁMETROS
+    - lista_estadisticas: Lista de diccionarios {casilla: (n, q)} (ver estadisticas_raiz).
+    '''
+
+    total = {}
+    for estadisticas in lista_estadisticas:
+        for m, (n, q) in estadisticas.items():
+            n_total, q_total = total.get(m, (0, 0))
+            total[m] = (n_total + n, q_total + q)
+    return total
+
+def elegir_movimiento(estadisticas, por_visitas=False):
+    '''
+    Esta función devuelve las coordenadas (fila, col) del movimiento con mejor recompensa media, con el mismo criterio que
+    mejor_movimiento (UCT con c=0), o None si no hay movimientos.
+
+    PARÁMETROS
+    - estadisticas: Diccionario {casilla: (n, q)} con las estadísticas de los hijos de la raíz.
+    - por_visitas: Si es True, se elige el movimiento con más visitas (ver movimiento_mas_visitado). False por defecto.
+    '''
+
+    visitados = [(n if por_visitas else q / n, m) for m, (n, q) in estadisticas.items() if n > 0]
+    if not visitados:
+        return None
+    _, movimiento = max(visitados)
+    return (movimiento >> 3, movimiento & 7)
+
+
+def trabajador_raiz(clase_sesion, opciones, instantanea, semilla, iteraciones, tiempo=None, max_nodos=None):
+    '''
+    Esta función es la que ejecuta cada proceso: hace una búsqueda independiente desde la raíz con su propia semilla y devuelve
+    la tupla (estadísticas de los hijos de la raíz, info de la búsqueda).
+
+    PARÁMETROS
+    - clase_sesion: Clase de sesión de búsqueda del motor (SesionMCTS del motor clásico o del neuronal).
+    - opciones: Diccionario con los parámetros para crear la sesión.
+    - instantanea: Tupla (blancas, negras, turno) de la posición raíz.
+    - semilla: Semilla para los números aleatorios del proceso.
+    - iteraciones, tiempo, max_nodos: Presupuesto de la búsqueda del proceso (ver SesionMCTS.buscar).
+    '''
+
+    random.seed(semilla)
+    sesion = clase_sesion(**opciones)
+    _, info = sesion.buscar(Posicion(*instantanea), instantanea[2], iteraciones, tiempo, max_nodos, con_info=True,
+                            cancelacion=_cancelacion_proceso)
+    return sesion.estadisticas_raiz(), info
+
+def buscar_en_paralelo(clase_sesion, opciones, instantanea, procesos, iteraciones, tiempo=None, max_nodos=None, semilla=None,
+                       por_visitas=False, cancelacion=None):
+    '''
+    Esta función implementa MCTS paralelo en la raíz: cada uno de los procesos hace su propia búsqueda desde la misma raíz, con el
+    presupuesto completo y semillas distintas, y al final se suman las visitas y recompensas de cada movimiento de la raíz para
+    elegir el movimiento. Como los procesos no comparten nada durante la búsqueda, no les afecta el GIL y el número total de
+    simulaciones crece casi linealmente con el número de procesos, con el mismo tiempo por jugada.
+
+    Devuelve la tupla (movimiento, info), con la suma de las iteraciones, nodos y visitas de cada movimiento de todos los procesos
+    y el tiempo total.
+
+    PARÁMETROS
+    - clase_sesion: Clase de sesión de búsqueda del motor.
+    - opciones: Diccionario con los parámetros para crear la sesión en cada proceso.
+    - instantanea: Tupla (blancas, negras, turno) de la posición raíz.
+    - procesos: Número de procesos.
+    - iteraciones, tiempo, max_nodos: Presupuesto de la búsqueda de cada proceso (ver SesionMCTS.buscar).
+    - semilla: Semilla base (el proceso i usa semilla + i). Si no se indica, se elige una al azar.
+    - por_visitas: Criterio con el que se elige el movimiento (ver elegir_movimiento).
+    - cancelacion: Evento (threading.Event) que, al activarse, termina la búsqueda en todos los procesos (o None). Mientras se
+      espera a los procesos se comprueba cada CADA_ESPERA segundos y, si se ha activado, se activa el evento del grupo, que
+      los procesos comprueban en cada iteración (ver Presupuesto).
+    '''
+
+    inicio = time.perf_counter()
+    if semilla is None:
+        semilla = random.getrandbits(32)
+    tareas = [(clase_sesion, opciones, instantanea, semilla + i, iteraciones, tiempo, max_nodos) for i in range(procesos)]
+    pool = obtener_pool(procesos)
+    _cancelaciones[procesos].clear()
+    pendiente = pool.starmap_async(trabajador_raiz, tareas)
+    if cancelacion is not None:
+        while not pendiente.ready():
+            if cancelacion.is_set():
+                _cancelaciones[procesos].set()
+            pendiente.wait(CADA_ESPERA)
+    resultados = pendiente.get()
+
+    estadisticas = combinar_estadisticas([estadisticas for estadisticas, _ in resultados])
+    movimiento = elegir_movimiento(estadisticas, por_visitas)
+    info = {'iteraciones': sum(i['iteraciones'] for _, i in resultados), 'nodos': sum(i['nodos'] for _, i in resultados),
+            'tiempo': time.perf_counter() - inicio, 'visitas': {m: n for m, (n, _) in estadisticas.items()}}
+    return movimiento, info
@@ -0,0 +1,130 @@
+'''
+Simulación de muchas partidas aleatorias a la vez con NumPy.
+
+Cada partida es una posición de un array de bitboards (uint64), y cada paso de la simulación hace una jugada aleatoria en
+todas las partidas a la vez con las mismas operaciones de bits que utiles/bitboard, pero sobre arrays completos. Así, el coste
+de interpretar Python se paga una vez por jugada y no una vez por jugada y partida, y simular K partidas cuesta mucho menos
+que K veces una.
+'''
+
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+# Imports
+import numpy as np
+from utiles.bitboard import DIRECCIONES
+
+# Las máscaras como uint64 de NumPy, para que las operaciones con los arrays no cambien de tipo.
+DIRECCIONES_NP = [(np.uint64(d), np.uint64(izq), np.uint64(der)) for d, izq, der in DIRECCIONES]
+CERO = np.uint64(0)
+UNO = np.uint64(1)
+
+
+def movimientos_np(propias, rivales):
+    '''
+    Esta función hace lo mismo que movimientos_bb (ver utiles/bitboard), pero para un array de posiciones a la vez.
+
+    PARÁMETROS
+    - propias: Array uint64 con las fichas del jugador en su turno de cada partida.
+    - rivales: Array uint64 con las fichas del otro jugador de cada partida.
+    '''
+
+    vacias = ~(propias | rivales)
+    res = np.zeros_like(propias)
+    for d, mascara_izq, mascara_der in DIRECCIONES_NP:
+        rivales_izq = rivales & mascara_izq
+        x = (propias << d) & rivales_izq
+        for _ in range(5):
+            x |= (x << d) & rivales_izq
+        res |= (x << d) & mascara_izq & vacias
+
+        rivales_der = rivales & mascara_der
+        x = (propias >> d) & rivales_der
+        for _ in range(5):
+            x |= (x >> d) & rivales_der
+        res |= (x >> d) & mascara_der & vacias
+    return res
+
+def volteos_np(propias, rivales, colocadas):
+    '''
+    Esta función hace lo mismo que volteos_bb (ver utiles/bitboard), pero para un array de posiciones a la vez. En lugar de
+    avanzar casilla a casilla, en cada dirección se propaga la cadena de fichas rivales desde la ficha colocada y sólo se
+    voltea si justo detrás de la cadena hay una ficha propia.
+
+    PARÁMETROS
+    - propias: Array uint64 con las fichas del jugador que coloca la ficha en cada partida.
+    - rivales: Array uint64 con las fichas del otro jugador de cada partida.
+    - colocadas: Array uint64 con el bit de la casilla en la que se coloca la ficha en cada partida (0 si no se coloca ninguna).
+    '''
+
+    res = np.zeros_like(propias)
+    for d, mascara_izq, mascara_der in DIRECCIONES_NP:
+        rivales_izq = rivales & mascara_izq
+        x = (colocadas << d) & rivales_izq
+        for _ in range(5):
+            x |= (x << d) & rivales_izq
+        res |= np.where((x << d) & mascara_izq & propias, x, CERO)
+
+        rivales_der = rivales & mascara_der
+        x = (colocadas >> d) & rivales_der
+        for _ in range(5):
+            x |= (x >> d) & rivales_der
+        res |= np.where((x >> d) & mascara_der & propias, x, CERO)
+    return res
+
+def elegir_casillas(movimientos, azar):
+    '''
+    Esta función elige al azar, en cada partida, una de las casillas del bitboard de movimientos, y devuelve un array uint64 con
+    el bit de la casilla elegida (0 en las partidas sin movimientos).
+
+    PARÁMETROS
+    - movimientos: Array uint64 con los movimientos legales de cada partida.
+    - azar: Generador de números aleatorios de NumPy (np.random.Generator).
+    '''
+
+    bits = np.unpackbits(movimientos.view(np.uint8).reshape(-1, 8), axis=1, bitorder='little')
+    acumulados = np.cumsum(bits, axis=1)
+    elegido = (azar.random(len(movimientos)) * acumulados[:, -1]).astype(np.int64) # De 0 a número de movimientos - 1
+    casilla = np.argmax(acumulados > elegido[:, None], axis=1).astype(np.uint64)
+    return np.where(acumulados[:, -1] > 0, UNO << casilla, CERO)
+
+def simular_lote(propias, rivales, simulaciones, azar=None):
+    '''
+    Esta función juega "simulaciones" partidas aleatorias a la vez desde la misma posición hasta el final, y devuelve un array con
+    el resultado de cada una desde el punto de vista del jugador en su turno en la posición inicial (+1 victoria, 0 empate y
+    -1 derrota), la misma recompensa que default_policy.
+
+    PARÁMETROS
+    - propias: Bitboard (entero) con las fichas del jugador en su turno.
+    - rivales: Bitboard (entero) con las fichas del otro jugador.
+    - simulaciones: Número de partidas a simular.
+    - azar: Generador de números aleatorios de NumPy. Si no se indica, se usa uno nuevo.
+    '''
+
+    azar = azar if azar is not None else np.random.default_rng()
+    propias = np.full(simulaciones, propias, dtype=np.uint64)
+    rivales = np.full(simulaciones, rivales, dtype=np.uint64)
+    cambiado = np.zeros(simulaciones, dtype=bool) # True si "propias" son ahora las fichas del rival del jugador inicial
+    paso_anterior = np.zeros(simulaciones, dtype=bool) # True si en la jugada anterior se pasó turno
+    activas = np.ones(simulaciones, dtype=bool)
+
+    while activas.any():
+        movimientos = np.where(activas, movimientos_np(propias, rivales), CERO)
+        sin_movimientos = movimientos == 0
+        # Si el jugador no puede mover y en la jugada anterior tampoco pudo el otro, la partida ha terminado.
+        activas &= ~(sin_movimientos & paso_anterior)
+        paso_anterior = sin_movimientos
+
+        colocadas = elegir_casillas(movimientos, azar)
+        volteadas = volteos_np(propias, rivales, colocadas)
+        # Se coloca la ficha, se voltean las fichas y se cambia de turno (en las partidas sin movimientos sólo se cambia de turno).
+        propias, rivales = (np.where(activas, rivales ^ volteadas, propias),
+                            np.where(activas, propias | colocadas | volteadas, rivales))
+        cambiado ^= activas
+
+    # Al terminar, "propias" son las fichas del jugador inicial donde cambiado es False y las del rival donde es True.
+    fichas_propias = np.bitwise_count(np.where(cambiado, rivales, propias)).astype(np.int64)
+    fichas_rivales = np.bitwise_count(np.where(cambiado, propias, rivales)).astype(np.int64)
+    return np.sign(fichas_propias - fichas_rivales)
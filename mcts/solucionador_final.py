@@ -0,0 +1,135 @@
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+# Imports
+from utiles.bitboard import *
+
+# Número de casillas vacías a partir del cual (por debajo o igual) la búsqueda resuelve la posición de forma exacta en lugar
+# de simular partidas o preguntar a la red.
+UMBRAL_FINAL = 8
+
+# Por encima de este número de casillas vacías los movimientos se ordenan por movilidad del rival, que cuesta generar los
+# movimientos de cada hijo pero poda mucho más. Con menos vacías basta con la paridad, que es casi gratis.
+VACIAS_ORDEN_MOVILIDAD = 6
+
+# Los cuatro cuadrantes del tablero (filas 0-3 / 4-7 y columnas 0-3 / 4-7).
+CUADRANTES = [0x000000000F0F0F0F, 0x00000000F0F0F0F0, 0x0F0F0F0F00000000, 0xF0F0F0F000000000]
+
+
+def casillas_vacias(propias, rivales):
+    '''
+    Esta función devuelve el número de casillas vacías del tablero.
+
+    PARÁMETROS
+    - propias: Bitboard con las fichas del jugador que está en su turno.
+    - rivales: Bitboard con las fichas del otro jugador.
+    '''
+
+    return 64 - contar(propias | rivales)
+
+def ordenar_movimientos(propias, rivales, movimientos):
+    '''
+    Esta función devuelve la lista de casillas de los movimientos en el orden en que conviene probarlos, para que la poda
+    alfa-beta corte antes:
+    - Paridad: primero las casillas de los cuadrantes con un número impar de casillas vacías. Jugar en ellos deja al jugador
+      la última jugada de la región, que al final de la partida suele ser una ventaja.
+    - Movilidad: con bastantes casillas vacías, primero los movimientos que dejan al rival con menos movimientos posibles.
+
+    PARÁMETROS
+    - propias: Bitboard con las fichas del jugador que está en su turno.
+    - rivales: Bitboard con las fichas del otro jugador.
+    - movimientos: Bitboard con los movimientos legales.
+    '''
+
+    vacias = ~(propias | rivales) & LLENO
+    impares = 0
+    for cuadrante in CUADRANTES:
+        if contar(vacias & cuadrante) & 1:
+            impares |= cuadrante
+
+    if contar(vacias) <= VACIAS_ORDEN_MOVILIDAD:
+        return casillas(movimientos & impares) + casillas(movimientos & ~impares)
+
+    claves = []
+    for casilla in casillas(movimientos):
+        volteadas = volteos_bb(propias, rivales, casilla)
+        movilidad = contar(movimientos_bb(rivales ^ volteadas, propias | (1 << casilla) | volteadas))
+        claves.append((movilidad, not (impares >> casilla) & 1, casilla))
+    claves.sort()
+    return [casilla for _, _, casilla in claves]
+
+def negamax(propias, rivales, alfa, beta, estadisticas=None):
+    '''
+    Esta función devuelve el resultado exacto de la partida con juego perfecto de ambos jugadores, como diferencia de fichas
+    (propias - rivales al final) desde el punto de vista del jugador en su turno. Usa búsqueda negamax con poda alfa-beta:
+    si el resultado queda fuera de la ventana (alfa, beta) sólo se garantiza que está por debajo de alfa o por encima de beta.
+
+    PARÁMETROS
+    - propias: Bitboard con las fichas del jugador que está en su turno.
+    - rivales: Bitboard con las fichas del otro jugador.
+    - alfa: Resultado que el jugador en su turno ya tiene asegurado por otro camino.
+    - beta: Resultado a partir del cual el rival no dejará llegar a esta posición.
+    - estadisticas: Diccionario (o None) en el que se cuentan los nodos visitados, en la clave 'nodos'.
+    '''
+
+    if estadisticas is not None:
+        estadisticas['nodos'] += 1
+
+    movimientos = movimientos_bb(propias, rivales)
+    if not movimientos:
+        # Si el jugador no puede mover y el rival tampoco, la partida ha terminado. Si el rival sí puede, se pasa el turno.
+        if not movimientos_bb(rivales, propias):
+            return contar(propias) - contar(rivales)
+        return -negamax(rivales, propias, -beta, -alfa, estadisticas)
+
+    mejor = -65
+    for casilla in ordenar_movimientos(propias, rivales, movimientos):
+        volteadas = volteos_bb(propias, rivales, casilla)
+        valor = -negamax(rivales ^ volteadas, propias | (1 << casilla) | volteadas, -beta, -alfa, estadisticas)
+        if valor > mejor:
+            mejor = valor
+            if valor > alfa:
+                alfa = valor
+                if alfa >= beta:
+                    break # Poda: el rival nunca dejará llegar a esta posición
+    return mejor
+
+def resultado_exacto(propias, rivales, estadisticas=None):
+    '''
+    Esta función devuelve el resultado de la partida con juego perfecto desde el punto de vista del jugador en su turno: +1 si
+    gana, 0 si empata y -1 si pierde. Como sólo interesa el signo, se busca con la ventana mínima (-1, 1), mucho más rápida que
+    calcular la diferencia de fichas exacta.
+
+    PARÁMETROS
+    - propias: Bitboard con las fichas del jugador que está en su turno.
+    - rivales: Bitboard con las fichas del otro jugador.
+    - estadisticas: Diccionario (o None) en el que se cuentan los nodos visitados.
+    '''
+
+    valor = negamax(propias, rivales, -1, 1, estadisticas)
+    return (valor > 0) - (valor < 0)
+
+def mejor_jugada_final(propias, rivales, estadisticas=None):
+    '''
+    Esta función devuelve la tupla (casilla, diferencia) con la mejor jugada del jugador en su turno y la diferencia de fichas
+    final con juego perfecto. La casilla es None si el jugador no puede mover.
+
+    PARÁMETROS
+    - propias: Bitboard con las fichas del jugador que está en su turno.
+    - rivales: Bitboard con las fichas del otro jugador.
+    - estadisticas: Diccionario (o None) en el que se cuentan los nodos visitados.
+    '''
+
+    movimientos = movimientos_bb(propias, rivales)
+    if not movimientos:
+        return None, negamax(propias, rivales, -65, 65, estadisticas)
+
+    mejor_casilla, alfa = None, -65
+    for casilla in ordenar_movimientos(propias, rivales, movimientos):
+        volteadas = volteos_bb(propias, rivales, casilla)
+        valor = -negamax(rivales ^ volteadas, propias | (1 << casilla) | volteadas, -65, -alfa, estadisticas)
+        if mejor_casilla is None or valor > alfa:
+            mejor_casilla, alfa = casilla, valor
+    return mejor_casilla, alfa
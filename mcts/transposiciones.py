@@ -0,0 +1,101 @@
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+
+class TablaTransposiciones:
+    def __init__(self, capacidad=2**16):
+        '''
+        Esta clase sirve para que el algoritmo MCTS reconozca las posiciones a las que ya ha llegado por otro orden de movimientos
+        (transposiciones) y reutilice su nodo, con sus estadísticas, en lugar de crear uno nuevo. Así el árbol pasa a ser un grafo
+        dirigido acíclico (en Otelo no puede repetirse una posición dentro de una partida, porque cada movimiento añade una ficha).
+
+        La tabla tiene un tamaño fijo. Cada clave de Zobrist cae en una entrada (clave % capacidad) con dos huecos:
+        - siempre: Guarda el último nodo insertado en esa entrada.
+        - preferente: Guarda, de los nodos que han ido saliendo del hueco "siempre", el que tenía más visitas.
+        De esta forma los nodos nuevos siempre entran en la tabla, pero los nodos con muchas visitas (los más valiosos) no se
+        pierden por una colisión. Un nodo que sale de la tabla sigue en el árbol; sólo deja de poder compartirse.
+
+        ATRIBUTOS
+        - capacidad: Número de entradas de la tabla (cada una con dos huecos).
+        - preferente: Lista con el nodo del hueco preferente de cada entrada (o None).
+        - siempre: Lista con el nodo del hueco "siempre" de cada entrada (o None).
+        - consultas: Número de búsquedas hechas en la tabla.
+        - aciertos: Número de búsquedas que han encontrado la posición (transposiciones aprovechadas).
+        - inserciones: Número de nodos guardados.
+        - reemplazos: Número de inserciones que han desplazado a otro nodo.
+        '''
+        self.capacidad = capacidad
+        self.preferente = [None] * capacidad
+        self.siempre = [None] * capacidad
+        self.consultas = 0
+        self.aciertos = 0
+        self.inserciones = 0
+        self.reemplazos = 0
+
+    def buscar(self, clave):
+        '''
+        Esta función devuelve el nodo guardado para la posición con la clave dada, o None si no está en la tabla.
+
+        PARÁMETROS
+        - clave: Clave de Zobrist de la posición (tablero y turno).
+        '''
+
+        self.consultas += 1
+        i = clave % self.capacidad
+        nodo = self.preferente[i]
+        if nodo is not None and nodo.clave == clave:
+            self.aciertos += 1
+            return nodo
+        nodo = self.siempre[i]
+        if nodo is not None and nodo.clave == clave:
+            self.aciertos += 1
+            return nodo
+        return None
+
+    def guardar(self, nodo):
+        '''
+        Esta función guarda un nodo en la tabla, usando como clave su atributo "clave".
+
+        PARÁMETROS
+        - nodo: Nodo a guardar.
+        '''
+
+        i = nodo.clave % self.capacidad
+        anterior = self.siempre[i]
+        if anterior is not None:
+            self.reemplazos += 1
+            # El nodo desplazado pasa al hueco preferente si tiene al menos tantas visitas como el que había.
+            preferente = self.preferente[i]
+            if preferente is None or anterior.n >= preferente.n:
+                self.preferente[i] = anterior
+        self.siempre[i] = nodo
+        self.inserciones += 1
+
+    def tasa_aciertos(self):
+        '''
+        Esta función devuelve la proporción de búsquedas que han encontrado la posición en la tabla.
+        '''
+
+        return self.aciertos / self.consultas if self.consultas else 0.0
+
+    def estadisticas(self):
+        '''
+        Esta función devuelve un diccionario con los contadores de la tabla y su tasa de aciertos.
+        '''
+
+        return {'consultas': self.consultas, 'aciertos': self.aciertos, 'inserciones': self.inserciones,
+                'reemplazos': self.reemplazos, 'tasa_aciertos': self.tasa_aciertos()}
+
+    def limpiar(self):
+        '''
+        Esta función vacía la tabla y pone sus contadores a cero.
+        '''
+
+        self.preferente = [None] * self.capacidad
+        self.siempre = [None] * self.capacidad
+        self.consultas = 0
+        self.aciertos = 0
+        self.inserciones = 0
+        self.reemplazos = 0
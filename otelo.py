@@ -8,11 +8,13 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '.')))
 
 import pygame as pg
 import copy
-from utiles.tablero import dibujar_tablero
+from utiles.tablero import dibujar_tablero, dibujar_pensando
 from utiles.fichas import movimientos_disponibles, obtener_fichas_a_voltear, obtener_ganador
 
-# Importamos la función mcts de nuestro motor neuronal
-from mcts.motor_mcts_neuronal import mcts
+# Importamos la sesión de búsqueda de nuestro motor neuronal
+from mcts.motor_mcts_neuronal import SesionMCTS
+from mcts.libro_aperturas import cargar_libro
+from mcts.busqueda_asincrona import BusquedaAsincrona
 
 #Configuramos pygame y el tablero
 pg.init()
@@ -43,14 +45,40 @@ turno = 2
  a más iteraciones, más preciso pero más lento."""
 ITER_MCTS = 80
 
-#Tenemos que saber si la persona ha movido para dejar un pequeño tiempo entre jugadas y que se vea la jugada
-humano_movio = False
+"""Tiempo máximo de búsqueda por jugada en segundos. Si se indica (por ejemplo 1.0), la IA busca durante ese tiempo
+sea cual sea la fase de la partida, en lugar de hacer un número fijo de iteraciones. Con None se usa ITER_MCTS."""
+TIEMPO_MCTS = None
+
+"""La sesión conserva el árbol de búsqueda entre jugadas: tras el movimiento de la IA y la respuesta de la persona,
+la siguiente búsqueda continúa desde el nodo de la posición resultante en lugar de empezar de cero."""
+sesion_ia = SesionMCTS(libro=cargar_libro()) #Si se ha construido el libro de aperturas, las primeras jugadas salen de él
+
+"""La IA busca en un hilo aparte para que la ventana no se congele mientras piensa: el bucle principal sigue dibujando a
+30 fps, muestra que la IA está pensando y recoge el movimiento cuando la búsqueda termina."""
+busqueda_ia = BusquedaAsincrona(sesion_ia)
+
+"""Mientras la persona piensa, la IA sigue buscando en la posición actual (ponderación) en lugar de esperar sin hacer nada.
+Cuando llega el movimiento de la persona se cancela esa búsqueda, y la de la IA continúa desde el subárbol de la jugada
+elegida, que ya tiene las visitas acumuladas mientras tanto: con las mismas ITER_MCTS, la respuesta es más fuerte.
+MAX_ITER_PONDERACION limita lo que crece el árbol si la persona tarda mucho en mover."""
+PONDERAR = True
+MAX_ITER_PONDERACION = 50000
+ponderacion = BusquedaAsincrona(sesion_ia)
+
+#Pequeña espera (en ms) entre jugadas para que se vea cada movimiento antes del siguiente
+PAUSA = 300
+espera_hasta = 0
+
+def aplicar_movimiento(tablero, fila, col, turno):
+    #Coloca la ficha y voltea las fichas que correspondan
+    fichas_a_voltear = obtener_fichas_a_voltear(tablero, fila, col, turno)
+    tablero[fila][col] = turno
+    for (f, c) in fichas_a_voltear:
+        tablero[f][c] = turno
 
 #Bucle principal del juego, se repetirá hasta que se cierre la ventana
 run = True
 while run:
-    humano_movio = False  #Cada vez que el bucle comienza, tienes que mover porque el turno inicial es el tuyo, o te toca mover
-
   #Eventos de pygame
     for evento in pg.event.get():
         if evento.type == pg.QUIT:
@@ -64,90 +92,56 @@ while run:
                 col = x // LONG_CASILLA
                 fila = y // LONG_CASILLA
 
-                # Verificamos que la casilla esté vacía
-                if tablero[fila][col] == 0:
-                    fichas_a_voltear = obtener_fichas_a_voltear(tablero, fila, col, turno)
-                    if fichas_a_voltear:
-                        #Se voltean las fichas, si procede
-                        tablero[fila][col] = turno
-                        for (f, c) in fichas_a_voltear:
-                            tablero[f][c] = turno
-
-                        #Le damos a la IA el movimiento
-                        turno = 1
-                        humano_movio = True
-
-    #Si la persona acaba de hacer un movimiento, dibujamos el tablero y esperamos un poco para que la IA empiece a pensar
-    if humano_movio:
-        #Dibujamos tablero
-        dibujar_tablero(pantalla, tablero, LONG_CASILLA, COLOR_FONDO, COLOR_LINEAS)
-        pg.display.flip()
-
-        #Pequeña espera
-        pg.time.delay(300)
-
-        #Turno de la IA
-        if movimientos_disponibles(tablero, turno):
-            #Realiza las iteraciones de MCTS y la IA piensa su movimiento
-            movimiento_ia = mcts(tablero, turno, ITER_MCTS)
-
-            #Si la IA tiene un movimiento valido, lo realiza
-            if movimiento_ia is not None:
-                fila_ia, col_ia = movimiento_ia
-                fichas_ia = obtener_fichas_a_voltear(tablero, fila_ia, col_ia, turno)
-                tablero[fila_ia][col_ia] = turno
-                for (f, c) in fichas_ia:
-                    tablero[f][c] = turno
+                # Verificamos que la casilla esté vacía y que el movimiento voltea alguna ficha
+                if tablero[fila][col] == 0 and obtener_fichas_a_voltear(tablero, fila, col, turno):
+                    #Se detiene la ponderación antes de tocar el tablero; su árbol se queda en la sesión
+                    ponderacion.cancelar()
+                    aplicar_movimiento(tablero, fila, col, turno)
 
-                #Se dibuja el tablero para reflejar el movimiento de la IA
-                dibujar_tablero(pantalla, tablero, LONG_CASILLA, COLOR_FONDO, COLOR_LINEAS)
-                pg.display.flip()
+                    #Le damos a la IA el movimiento, que empezará a pensar tras una pequeña espera
+                    turno = 1
+                    espera_hasta = pg.time.get_ticks() + PAUSA
 
-                #Pequeña espera para que se vea el movimiento de la IA
-                pg.time.delay(300)
-
-        #Se vuelve al turno de la persona
-        turno = 2
-        if not movimientos_disponibles(tablero, turno):
-            turno = 1
+    if not run:
+        break
 
-    else:
-        #Si no hay movimiento disponible para la persona, se pasa el turno a la IA
-        if turno == 2 and not movimientos_disponibles(tablero, turno):
-            turno = 1
-
-    #Si es turno de IA y la persona no ha movido, la IA piensa y hace su movimiento
-    if turno == 1 and not humano_movio:
+    #Si es turno de la IA y no está pensando ya, empieza a buscar su movimiento (o pasa si no tiene ninguno)
+    if turno == 1 and not busqueda_ia.activa() and not busqueda_ia.terminada() and pg.time.get_ticks() >= espera_hasta:
         if movimientos_disponibles(tablero, turno):
-            #Dibujamos el tablero antes del movimiento de la IA, con una espera para que se vea el movimiento
-            dibujar_tablero(pantalla, tablero, LONG_CASILLA, COLOR_FONDO, COLOR_LINEAS)
-            pg.display.flip()
-            pg.time.delay(300)
-
-            movimiento_ia = mcts(tablero, turno, ITER_MCTS)
-            if movimiento_ia is not None:
-                fila_ia, col_ia = movimiento_ia
-                fichas_ia = obtener_fichas_a_voltear(tablero, fila_ia, col_ia, turno)
-                tablero[fila_ia][col_ia] = turno
-                for (f, c) in fichas_ia:
-                    tablero[f][c] = turno
-
-            # Dibujamos tras la IA mover
-            dibujar_tablero(pantalla, tablero, LONG_CASILLA, COLOR_FONDO, COLOR_LINEAS)
-            pg.display.flip()
-            pg.time.delay(300)
+            busqueda_ia.iniciar(tablero, turno, ITER_MCTS if TIEMPO_MCTS is None else None, TIEMPO_MCTS)
+        elif movimientos_disponibles(tablero, 2):
+            turno = 2
+
+    #Si la IA ha terminado de pensar, realiza su movimiento
+    if busqueda_ia.terminada():
+        movimiento_ia = busqueda_ia.resultado()
+        if movimiento_ia is not None:
+            fila_ia, col_ia = movimiento_ia
+            aplicar_movimiento(tablero, fila_ia, col_ia, 1)
+        espera_hasta = pg.time.get_ticks() + PAUSA
 
         # Devolvemos turno al humano a menos que éste no pueda mover
         turno = 2
-        if not movimientos_disponibles(tablero, turno):
-            turno = 1
 
-    """Dibujamos el tablero en cada iteración del bucle, no hace falta que se dibuje puesto que en el resto del bucle se dibuja, 
-    pero por si acaso para que se vea el tablero actualizado"""
+    #Si no hay movimiento disponible para la persona, se pasa el turno a la IA
+    if turno == 2 and not movimientos_disponibles(tablero, turno) and movimientos_disponibles(tablero, 1):
+        turno = 1
+
+    #Si es turno de la persona y la IA no está haciendo nada, empieza a ponderar la posición actual
+    if PONDERAR and turno == 2 and ponderacion.hilo is None and not busqueda_ia.activa() and movimientos_disponibles(tablero, turno):
+        ponderacion.iniciar(tablero, turno, MAX_ITER_PONDERACION)
+
+    #Dibujamos el tablero en cada iteración del bucle y, mientras la IA busca, el indicador de que está pensando
     dibujar_tablero(pantalla, tablero, LONG_CASILLA, COLOR_FONDO, COLOR_LINEAS)
+    if busqueda_ia.activa():
+        dibujar_pensando(pantalla, LONG_TABLERO, busqueda_ia.transcurrido())
     pg.display.flip()
     clock.tick(30)
 
+#Si la ventana se cierra mientras la IA piensa, se cancela la búsqueda en lugar de esperar a que termine
+busqueda_ia.cancelar()
+ponderacion.cancelar()
+
 #Cerramos pygame y mostramos el resultado final
 pg.quit()
 
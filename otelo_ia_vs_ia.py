@@ -7,12 +7,15 @@ import os
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '.')))
 
 import pygame as pg
-from utiles.tablero import dibujar_tablero
+from utiles.tablero import dibujar_tablero, dibujar_pensando
 from utiles.fichas import movimientos_disponibles, obtener_fichas_a_voltear, obtener_ganador
 
-# Importamos ambos motores MCTS
-from mcts.motor_mcts_neuronal import mcts as mcts_neuronal
-from mcts.motor_mcts           import mcts as mcts_classic
+# Importamos las sesiones de búsqueda de ambos motores MCTS
+from mcts.motor_mcts_neuronal import SesionMCTS as SesionNeuronal
+from mcts.motor_mcts           import SesionMCTS as SesionClasica
+from mcts.arbol_compacto       import SesionMCTS as SesionCompacta
+from mcts.libro_aperturas      import cargar_libro
+from mcts.busqueda_asincrona   import BusquedaAsincrona
 
 # ---------------------------------------------------
 # 1) Configuración de Pygame y constantes
@@ -51,6 +54,28 @@ ITER_NEURONAL =  80  # iteraciones para MCTS+red
 
 #Mismma cantidad de iteraciones para ambas IAs, para que la partida sea justa
 
+# Si se indica, tiempo por jugada en segundos para ambas IAs, en lugar de iteraciones fijas
+TIEMPO_POR_JUGADA = None
+
+# Cada IA conserva su árbol de búsqueda entre jugadas y lo reutiliza tras la respuesta de la otra
+# Si se ha construido el libro de aperturas, ambas IAs juegan las primeras jugadas desde él
+# Con ARBOL_COMPACTO, la IA clásica guarda su árbol en arrays de NumPy (ver mcts/arbol_compacto), con unas 10 veces menos
+# memoria por nodo, a cambio de no conservarlo entre jugadas
+ARBOL_COMPACTO = False
+
+libro = cargar_libro()
+sesion_classic  = (SesionCompacta if ARBOL_COMPACTO else SesionClasica)(libro=libro)
+sesion_neuronal = SesionNeuronal(libro=libro)
+
+# Cada IA busca en un hilo aparte, para que la ventana siga respondiendo (y se pueda cerrar) mientras piensa
+busquedas = {1: BusquedaAsincrona(sesion_classic), 2: BusquedaAsincrona(sesion_neuronal)}
+iteraciones = {1: ITER_CLASSIC, 2: ITER_NEURONAL}
+nombres = {1: "MCTS clásico", 2: "MCTS+neuronal"}
+
+# Pequeña espera (en ms) entre jugadas para que se vea cada movimiento
+PAUSA = 300
+espera_hasta = 0
+
 # ---------------------------------------------------
 # 4) Bucle principal
 # ---------------------------------------------------
@@ -70,42 +95,46 @@ while run:
     for event in events:
         if event.type == pg.QUIT:
             run = False
-
-    # Si ambas IAs no tienen movimientos posibles, terminamos
-    if not movimientos_disponibles(tablero, 1) and not movimientos_disponibles(tablero, 2):
+    if not run:
         break
 
-    # Dibujamos el tablero actual
+    busqueda = busquedas[turno]
+
+    # Si la IA de turno ha terminado de pensar, aplicamos su movimiento y cambiamos de turno
+    if busqueda.terminada():
+        mov = busqueda.resultado()
+        if mov is not None:
+            f, c = mov
+            fichas = obtener_fichas_a_voltear(tablero, f, c, turno)
+            tablero[f][c] = turno
+            for (fr, cc) in fichas:
+                tablero[fr][cc] = turno
+        turno = 3 - turno
+        espera_hasta = pg.time.get_ticks() + PAUSA
+
+    # Si ninguna IA está pensando, la de turno empieza a buscar (o pasa si no puede mover)
+    elif not busqueda.activa() and pg.time.get_ticks() >= espera_hasta:
+        # Si ambas IAs no tienen movimientos posibles, terminamos
+        if not movimientos_disponibles(tablero, 1) and not movimientos_disponibles(tablero, 2):
+            break
+        if movimientos_disponibles(tablero, turno):
+            busqueda.iniciar(tablero, turno, iteraciones[turno] if TIEMPO_POR_JUGADA is None else None, TIEMPO_POR_JUGADA)
+        else:
+            # Si el jugador de turno no puede mover, cambiamos turno y seguimos
+            turno = 3 - turno
+
+    # Dibujamos el tablero actual y, si una IA está pensando, el indicador
     dibujar_tablero(pantalla, tablero, LONG_CASILLA, COLOR_FONDO, COLOR_LINEAS)
+    if busquedas[turno].activa():
+        dibujar_pensando(pantalla, LONG_TABLERO, busquedas[turno].transcurrido(), f"{nombres[turno]} pensando")
     pg.display.flip()
-    pg.time.delay(300)
-
-    # Turno de MCTS clásico (blancas)
-    if turno == 1 and movimientos_disponibles(tablero, 1):
-        mov = mcts_classic(tablero, 1, ITER_CLASSIC)
-
-    # Turno de MCTS+neuronal (negras)
-    elif turno == 2 and movimientos_disponibles(tablero, 2):
-        mov = mcts_neuronal(tablero, 2, ITER_NEURONAL)
-
-    else:
-        # Si el jugador de turno no puede mover, cambiamos turno y seguimos
-        turno = 3 - turno
-        continue
-
-    # Aplicamos el movimiento si existe
-    if mov is not None:
-        f, c = mov
-        fichas = obtener_fichas_a_voltear(tablero, f, c, turno)
-        tablero[f][c] = turno
-        for (fr, cc) in fichas:
-            tablero[fr][cc] = turno
-
-    # Cambiamos de turno
-    turno = 3 - turno
 
     # Controlamos FPS para visualización adecuada
-    clock.tick(0)
+    clock.tick(30)
+
+# Si se cierra la ventana con una IA pensando, cancelamos su búsqueda
+for busqueda in busquedas.values():
+    busqueda.cancelar()
 
 # Quit Pygame al salir del bucle
 pg.quit()
@@ -0,0 +1,140 @@
+import os
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import numpy as np
+from utiles.datos_binarios import bitboards_a_bits, etiquetas
+from utiles.simetrias import simetrias_aleatorias, aplicar_simetria_casillas, NUM_SIMETRIAS
+
+
+"""Preparacion de los datos de entrenamiento de Othello_Net por lotes.
+
+En lugar de convertir todo el conjunto de datos a float32 antes de model.fit (N x 8 x 8 x 2 x 4 bytes, 512 bytes por tablero),
+leemos del archivo binario proyectado en memoria solo los registros de cada lote y los convertimos a canales en ese momento.
+Asi la memoria usada depende del tamaño del lote y no del numero de tableros, y se puede entrenar con mas datos de los que
+caben en memoria."""
+
+
+def convertir_a_canales(x_tablero): #Como entrada tiene un array (N, 8, 8) con valores 0, 1 o 2.
+    """
+    Convierte los tableros a canales: canal 0 con las fichas negras (valor 2) y canal 1 con las blancas (valor 1).
+    Las dos comparaciones se hacen sobre todo el array a la vez, sin recorrer las casillas una a una.
+    """
+
+    x_tablero = np.asarray(x_tablero)
+    return np.stack([x_tablero == 2, x_tablero == 1], axis=-1).astype(np.float32) #Como salida tiene un array (N, 8, 8, 2)
+
+
+def bitboards_a_canales(blancas, negras): #Como entrada tiene dos arrays con los bitboards de las fichas blancas y negras.
+    """
+    Hace lo mismo que convertir_a_canales, pero directamente desde los bitboards, sin pasar por el tablero 8x8.
+    """
+
+    return np.stack([bitboards_a_bits(negras), bitboards_a_bits(blancas)], axis=-1).astype(np.float32)
+
+
+def registros_a_canales(registros, azar=None, simetrias=None): #Como entrada tiene un array de registros del formato binario.
+    """
+    Convierte los registros a canales. Si se pasa un generador de numeros aleatorios (azar), a cada tablero se le aplica
+    una de sus 8 simetrias elegida al azar (aumento de datos): el resultado de la partida no cambia al girar o reflejar
+    el tablero, asi que cada tablero de entrenamiento vale por 8 sin tener que generar mas partidas.
+    Tambien se puede pasar directamente la simetria de cada tablero (simetrias), para transformar igual otros datos.
+    """
+
+    blancas = np.ascontiguousarray(registros['blancas'])
+    negras = np.ascontiguousarray(registros['negras'])
+    if simetrias is None and azar is not None:
+        simetrias = azar.integers(0, NUM_SIMETRIAS, len(registros))
+    if simetrias is not None:
+        blancas, negras = simetrias_aleatorias(blancas, negras, simetrias)
+    return bitboards_a_canales(blancas, negras)
+
+
+def visitas_a_politica(visitas, simetrias=None): #Como entrada tiene un array (N, 64) con las visitas de cada casilla.
+    """
+    Convierte las visitas de la busqueda en el objetivo de la cabeza de politica: la proporcion de visitas de cada casilla.
+    Devuelve la tupla (politicas, pesos), con peso 0 en los estados sin visitas (en los que no se busco), para que no
+    cuenten en el error de la politica. Con simetrias, la politica de cada tablero se transforma con la misma simetria
+    que el tablero (ver registros_a_canales).
+    """
+
+    visitas = np.asarray(visitas, dtype=np.float32)
+    if simetrias is not None:
+        visitas = visitas.copy()
+        for simetria in range(1, NUM_SIMETRIAS):
+            elegidas = simetrias == simetria
+            if elegidas.any():
+                visitas[elegidas] = aplicar_simetria_casillas(visitas[elegidas], simetria)
+    total = visitas.sum(axis=1, keepdims=True)
+    return visitas / np.maximum(total, 1), (total[:, 0] > 0).astype(np.float32)
+
+
+def calcular_pesos_etiquetas(registros): #Como entrada tiene los registros del conjunto de entrenamiento.
+    """
+    Como en el conjunto de entrenamiento hay muchas mas victorias que derrotas o empates, damos a cada etiqueta un peso
+    inverso a su frecuencia para que el entrenamiento no tenga sesgo hacia las victorias. Devuelve {etiqueta: peso}.
+    """
+
+    valores, cuentas = np.unique(etiquetas(registros), return_counts=True)
+    return {int(v): float(len(registros) / c) for v, c in zip(valores, cuentas)}
+
+
+def dividir_indices(n, fraccion_validacion=0.1): #Como entrada tiene el numero de registros y la fraccion para validacion.
+    """
+    Separa los indices de entrenamiento y de validacion. Igual que validation_split de Keras, la validacion son los
+    ultimos registros del archivo, sin barajar.
+    """
+
+    corte = n - int(n * fraccion_validacion)
+    return np.arange(corte), np.arange(corte, n)
+
+
+def generar_lotes(registros, indices, tam_lote=128, pesos_etiquetas=None, barajar=True, semilla=None, aumentar=False, visitas=None):
+    """
+    Generador que recorre los registros indicados por lotes y devuelve, para cada lote, la tupla (X, (Y, P), (W, WP)) con los
+    tableros por canales (tam_lote, 8, 8, 2), los objetivos de las dos cabezas de la red y sus pesos: las etiquetas con el peso
+    de cada muestra segun su etiqueta (todos 1 si no hay pesos), y las politicas con sus pesos (ver visitas_a_politica).
+    Las visitas son el array (N, 64) que acompaña a los registros (ver leer_visitas en utiles/datos_binarios); sin ellas,
+    todas las politicas tienen peso 0 y la red solo aprende el valor.
+
+    Si se baraja, el orden cambia cada vez que se recorre el generador (cada epoca). Dentro de cada lote los indices se
+    ordenan para leer el archivo proyectado en memoria de forma lo mas secuencial posible.
+
+    Con aumentar=True, cada tablero se gira o refleja al azar cada vez que se usa (ver registros_a_canales).
+    """
+
+    azar = np.random.default_rng(semilla)
+    orden = azar.permutation(indices) if barajar else np.asarray(indices)
+    tabla_pesos = np.ones(3, dtype=np.float32)
+    if pesos_etiquetas is not None:
+        for etiqueta, peso in pesos_etiquetas.items():
+            tabla_pesos[etiqueta + 1] = peso
+
+    for inicio in range(0, len(orden), tam_lote):
+        indices_lote = np.sort(orden[inicio:inicio + tam_lote])
+        lote = registros[indices_lote]
+        y = etiquetas(lote)
+        simetrias = azar.integers(0, NUM_SIMETRIAS, len(lote)) if aumentar else None
+        if visitas is not None:
+            politicas, pesos_politicas = visitas_a_politica(visitas[indices_lote], simetrias)
+        else:
+            politicas, pesos_politicas = np.zeros((len(lote), 64), dtype=np.float32), np.zeros(len(lote), dtype=np.float32)
+        yield (registros_a_canales(lote, simetrias=simetrias), (y.astype(np.float32), politicas),
+               (tabla_pesos[y + 1], pesos_politicas))
+
+
+def crear_dataset(registros, indices, tam_lote=128, pesos_etiquetas=None, barajar=True, aumentar=False, visitas=None):
+    """
+    Crea un tf.data.Dataset que saca los lotes de generar_lotes y prepara los siguientes en segundo plano (prefetch)
+    mientras la red entrena con el actual. Se puede pasar directamente a model.fit.
+    """
+
+    import tensorflow as tf
+
+    firma = (tf.TensorSpec(shape=(None, 8, 8, 2), dtype=tf.float32),
+             (tf.TensorSpec(shape=(None,), dtype=tf.float32), tf.TensorSpec(shape=(None, 64), dtype=tf.float32)),
+             (tf.TensorSpec(shape=(None,), dtype=tf.float32), tf.TensorSpec(shape=(None,), dtype=tf.float32)))
+    dataset = tf.data.Dataset.from_generator(
+        lambda: generar_lotes(registros, indices, tam_lote, pesos_etiquetas, barajar, aumentar=aumentar, visitas=visitas),
+        output_signature=firma
+    )
+    return dataset.prefetch(tf.data.AUTOTUNE)
@@ -0,0 +1,153 @@
+import os
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import random
+import numpy as np
+import h5py
+from utiles.bitboard import casillas
+from utiles.posicion import posicion_inicial
+
+
+"""Motor de inferencia de Othello_Net escrito solo con NumPy.
+
+La red de othello_net es pequeña (tres convoluciones 3x3 sobre un tablero 8x8, una capa densa y las salidas), asi que
+para evaluar posiciones no hace falta importar TensorFlow: basta con leer los pesos del .h5 y repetir la pasada hacia delante
+con productos de matrices. Asi nos ahorramos el tiempo de importar TF y el coste fijo de cada llamada a predict."""
+
+
+CAPAS = ('conv1', 'conv2', 'conv3', 'fc1', 'prob_victoria')
+
+"""Capa de la cabeza de politica (64 probabilidades, una por casilla). Los modelos entrenados antes de añadirla no la tienen,
+y entonces la red solo devuelve el valor."""
+CAPA_POLITICA = 'politica'
+
+
+def leer_pesos_h5(ruta): #Como entrada tiene la ruta del .h5 guardado por othello_net.
+    """
+    Devuelve un diccionario {capa: (kernel, bias)} con los pesos de cada capa de Othello_Net, incluida la de politica si el
+    modelo la tiene.
+
+    Keras guarda los pesos del modelo completo dentro del grupo "model_weights" y, dentro del grupo de cada capa, el nombre
+    exacto de los datasets cambia entre versiones (kernel, kernel:0, capa/kernel...). Por eso recorremos el grupo de la capa
+    y nos quedamos con el dataset cuyo nombre contiene "kernel" y con el que contiene "bias".
+    """
+
+    pesos = {}
+    with h5py.File(ruta, 'r') as archivo:
+        grupo = archivo['model_weights'] if 'model_weights' in archivo else archivo
+        for capa in CAPAS + ((CAPA_POLITICA,) if CAPA_POLITICA in grupo else ()):
+            datasets = {}
+            grupo[capa].visititems(lambda nombre, obj: datasets.__setitem__(nombre, obj[()]) if isinstance(obj, h5py.Dataset) else None)
+            kernel = next(valor for nombre, valor in datasets.items() if 'kernel' in nombre)
+            bias = next(valor for nombre, valor in datasets.items() if 'bias' in nombre)
+            pesos[capa] = (kernel.astype(np.float32), bias.astype(np.float32))
+    return pesos
+
+
+def pesos_desde_keras(modelo): #Como entrada tiene un modelo de Keras ya cargado.
+    """
+    Devuelve el mismo diccionario que leer_pesos_h5, pero tomando los pesos de un modelo de Keras en memoria.
+    """
+
+    capas = CAPAS + ((CAPA_POLITICA,) if CAPA_POLITICA in [capa.name for capa in modelo.layers] else ())
+    return {capa: tuple(p.astype(np.float32) for p in modelo.get_layer(capa).get_weights()) for capa in capas}
+
+
+def conv3x3_relu(x, kernel, bias): #Como entrada tiene un lote (N, 8, 8, C) y los pesos de una capa Conv2D 3x3 con padding 'same'.
+    """
+    Convolucion 3x3 con padding 'same' seguida de ReLU.
+
+    Rellenamos el tablero con un borde de ceros y juntamos, para cada casilla, los 9 vecinos de todos los canales en un
+    vector de 9*C valores (im2col). El kernel de Keras tiene forma (3, 3, C, F), y al aplanarlo a (9*C, F) sus filas quedan en el
+    mismo orden (fila del filtro, columna del filtro, canal), asi que toda la capa es un unico producto de matrices.
+    """
+
+    n, alto, ancho, canales = x.shape
+    relleno = np.pad(x, ((0, 0), (1, 1), (1, 1), (0, 0)))
+    columnas = np.concatenate([relleno[:, df:df + alto, dc:dc + ancho, :] for df in range(3) for dc in range(3)], axis=-1)
+    y = columnas.reshape(n * alto * ancho, 9 * canales) @ kernel.reshape(9 * canales, -1) + bias
+    return np.maximum(y, 0.0).reshape(n, alto, ancho, -1)
+
+
+class OthelloNetNumpy:
+    def __init__(self, pesos):
+        """
+        Version NumPy de Othello_Net. Ofrece predict y predict_on_batch igual que el modelo de Keras, para poder usarla
+        en su lugar en el motor MCTS sin cambiar nada mas. El Dropout solo actua al entrenar, asi que aqui no aparece.
+
+        Igual que Keras con un modelo de dos salidas, si los pesos incluyen la cabeza de politica se devuelve la lista
+        [valor, politica]; si no, solo el valor.
+        """
+        self.pesos = pesos
+        self.tiene_politica = CAPA_POLITICA in pesos
+
+    def predict_on_batch(self, x): #Como entrada tiene un lote de tableros por canales de forma (N, 8, 8, 2).
+        x = np.asarray(x, dtype=np.float32)
+        for capa in ('conv1', 'conv2', 'conv3'):
+            x = conv3x3_relu(x, *self.pesos[capa])
+
+        x = x.reshape(x.shape[0], -1) #Flatten de Keras con channels_last: orden (fila, columna, canal)
+        kernel, bias = self.pesos['fc1']
+        x = np.maximum(x @ kernel + bias, 0.0)
+        kernel, bias = self.pesos['prob_victoria']
+        valor = np.tanh(x @ kernel + bias) #Como salida tiene un array (N, 1) con valores en [-1, +1], igual que Keras
+        if not self.tiene_politica:
+            return valor
+
+        kernel, bias = self.pesos[CAPA_POLITICA]
+        logits = x @ kernel + bias
+        politica = np.exp(logits - logits.max(axis=1, keepdims=True)) #Softmax, restando el maximo para no desbordar exp
+        return [valor, politica / politica.sum(axis=1, keepdims=True)] #Y la politica, un array (N, 64) que suma 1 por fila
+
+    def predict(self, x, verbose=0):
+        return self.predict_on_batch(x)
+
+
+def cargar_othello_net(ruta): #Como entrada tiene la ruta del .h5 guardado por othello_net.
+    return OthelloNetNumpy(leer_pesos_h5(ruta))
+
+
+def posiciones_aleatorias(n, semilla=0): #Como entrada tiene el numero de posiciones a generar y la semilla.
+    """
+    Genera n tableros por canales (n, 8, 8, 2) jugando partidas aleatorias desde la posicion inicial, para que las posiciones
+    sean parecidas a las que la red ve durante la busqueda.
+    """
+
+    azar = random.Random(semilla)
+    tableros = []
+    while len(tableros) < n:
+        pos = posicion_inicial()
+        while pos.no_terminal() and len(tableros) < n:
+            movimientos = casillas(pos.movimientos())
+            if movimientos:
+                pos.hacer(azar.choice(movimientos))
+            else:
+                pos.pasar()
+            tableros.append(pos.a_tablero())
+
+    tableros = np.array(tableros, dtype=np.int32)
+    return np.stack([tableros == 2, tableros == 1], axis=-1).astype(np.float32) #Canal 0: negras, canal 1: blancas
+
+
+def comprobar_paridad(ruta, n=512, tolerancia=1e-4): #Como entrada tiene la ruta del .h5, el numero de posiciones y la tolerancia.
+    """
+    Compara las salidas de la version NumPy con las del modelo de Keras sobre n posiciones y devuelve la maxima diferencia
+    absoluta. Lanza AssertionError si supera la tolerancia.
+    """
+
+    from keras._tf_keras.keras.models import load_model
+
+    x = posiciones_aleatorias(n)
+    esperado = load_model(ruta, compile=False).predict(x, verbose=0)
+    obtenido = cargar_othello_net(ruta).predict_on_batch(x)
+    if not isinstance(esperado, (list, tuple)): #Modelo sin cabeza de politica
+        esperado, obtenido = [esperado], [obtenido]
+    diferencia = max(float(np.max(np.abs(np.asarray(e) - o))) for e, o in zip(esperado, obtenido))
+    assert diferencia <= tolerancia, f"La version NumPy difiere de Keras en {diferencia} (tolerancia {tolerancia})"
+    return diferencia
+
+
+#Comprobacion de paridad con Keras
+if __name__ == "__main__":
+    ruta_modelo = sys.argv[1] if len(sys.argv) > 1 else "red_neuronal/othello_neuronal_entrenada.h5"
+    print("Maxima diferencia con Keras:", comprobar_paridad(ruta_modelo))
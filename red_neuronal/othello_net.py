@@ -1,8 +1,11 @@
 import os
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 os.environ['TF_CPP_MIN_LOG_LEVEL'] = '3'
 from keras._tf_keras.keras.utils import set_random_seed
-import pandas as pd
 import numpy as np
+from utiles.datos_binarios import leer_binario, leer_visitas, ruta_visitas, convertir_csv_a_binario
+from red_neuronal.datos_entrenamiento import dividir_indices, calcular_pesos_etiquetas, crear_dataset
 from keras import Input, Model
 from keras._tf_keras.keras.layers import Dense
 from keras._tf_keras.keras.layers import Conv2D
@@ -73,16 +76,24 @@ x = Dense(256, activation='relu', name='fc1')(x)
 
 prob_victoria = Dense(1, activation='tanh', name='prob_victoria')(x)
 
-model_othello = Model(inputs=capa_entrada, outputs=prob_victoria, name='Othello_Net')
+"""Ademas del valor, la red tiene una segunda cabeza (politica) que, a partir de los mismos 256 valores, da una probabilidad a
+cada una de las 64 casillas mediante activacion softmax: la probabilidad de que la busqueda MCTS elija jugar en ella.
+El motor MCTS con seleccion PUCT usa estas probabilidades para explorar primero los movimientos prometedores, y asi
+necesita muchas menos iteraciones por jugada para jugar igual de bien."""
 
-"""Compilamos con optimizador Adam, ampliamente usado en redes neuronales, y como error la media cuadrática (MSE) ya que queremos
-minimizar la diferencia entre el valor predicho y el valor real de la etiqueta, que es tambien un valor entre -1 y 1."""
+politica = Dense(64, activation='softmax', name='politica')(x)
+
+model_othello = Model(inputs=capa_entrada, outputs=[prob_victoria, politica], name='Othello_Net')
+
+"""Compilamos con optimizador Adam, ampliamente usado en redes neuronales, y como error del valor la media cuadrática (MSE) ya que queremos
+minimizar la diferencia entre el valor predicho y el valor real de la etiqueta, que es tambien un valor entre -1 y 1.
+Para la politica usamos la entropia cruzada entre la probabilidad predicha y la proporcion de visitas de la busqueda."""
 
 opt = Adam(learning_rate=1e-4)
 model_othello.compile(
     optimizer=opt,
-    loss='mse',
-    metrics=['mse']
+    loss={'prob_victoria': 'mse', 'politica': 'categorical_crossentropy'},
+    metrics={'prob_victoria': ['mse']}
 )
 
 """Con summary mostramos la red neuronal"""
@@ -90,61 +101,41 @@ model_othello.summary()
 
 
 
-"""Leemos el csv con los datos de entrenamiento generados por el agente MCTS"""
-df = pd.read_csv("datos/datos_otelo_red_neuronal.csv", header=None)
-
-"""Establecemos que los primeros 64 valores de cada fila son casillas y lo pasamos a numpy para que sea más rápido de procesar."""
-X_plano = df.iloc[:, 0:64].values.astype(np.int32)
-
-"""Lo mismo para las etiquetas, excepto que estas son el ultimo valor de cada fila"""
-Y = df.iloc[:, 64].values.astype(np.float32)
-
-"""Es necesario establecer N porque asi numpy puede convertir los vectores planos de 64 valores en matrices de 8x8,
-si no se define N, numpy no sabe cuando parar de leer los valores"""
-N = X_plano.shape[0]
-x_tablero = X_plano.reshape((N, 8, 8))
+"""Leemos los datos de entrenamiento generados por el agente MCTS en formato binario (17 bytes por tablero, ver utiles/datos_binarios).
+Con leer_binario el archivo se proyecta en memoria (memmap) en lugar de leerse y convertirse entero como hacia pandas con el csv.
+Si solo tenemos el csv de una generacion anterior, lo convertimos una vez al formato binario."""
+RUTA_DATOS = "datos/datos_otelo_red_neuronal.bin"
+if not os.path.exists(RUTA_DATOS):
+    convertir_csv_a_binario("datos/datos_otelo_red_neuronal.csv", RUTA_DATOS)
+registros = leer_binario(RUTA_DATOS)
 
+"""Las visitas de la busqueda en cada tablero (objetivo de la politica) van en un archivo aparte. Los datos convertidos desde
+el csv no las tienen, y entonces la red solo aprende el valor (ver generar_lotes)."""
+visitas = leer_visitas(ruta_visitas(RUTA_DATOS)) if os.path.exists(ruta_visitas(RUTA_DATOS)) else None
 
 """Tenemos que convertir los valores de las casillas del tablero 0,1,2 a canales de tipo [0/1, 0/1] para poder entrenar la red neuronal.
 
 Esto se hace asi pues al tener las casillas por canales en lugar de valores de 0,1 o 2, hace que la red neuronal no se confunda,
 si tuvieramos valores de 0,1 o 2, la red neuronal tendria que "adivinar" que los valores 0,1,2 son fichas negras, blancas o vacias, 
-y que, por ejemplo, 2 no vale mas que 1, sino que es una ficha negra."""
-
-"""Para ello tomamos el numero de filas N del tablero cocnreto y creamos una matriz de ceros de tamaño (N, 8, 8, 2).
-    Luego recorremos cada casiila de cada fila en el tablero 8x8, lo transofrmamos al canal y sustituimos el 0 que haya en esa posicion
-    por el valor transformado a canal.
+y que, por ejemplo, 2 no vale mas que 1, sino que es una ficha negra.
 
-    Con el valor N de x_can, establecemos el numero de tableros 8x8 que tenemos en total."""
+En lugar de convertir todos los tableros antes de entrenar, la conversion se hace lote a lote mientras la red entrena
+(ver convertir_a_canales y crear_dataset en red_neuronal/datos_entrenamiento), asi no hace falta tener todo el conjunto
+de datos en memoria como float32."""
 
-def convertir_a_canales(x_tablero): 
-    N = x_tablero.shape[0]
-    X_can = np.zeros((N, 8, 8, 2), dtype=np.float32)
-    for i in range(N):
-        for r in range(8):
-            for c in range(8):
-                if x_tablero[i, r, c] == 2:
-                    X_can[i, r, c, 0] = 1.0
-                elif x_tablero[i, r, c] == 1:
-                    X_can[i, r, c, 1] = 1.0
-    
-    return X_can
-
-    
-    
-  
-X = convertir_a_canales(x_tablero)
+"""Separamos el 10% final de los registros para validacion, igual que hacia validation_split."""
+indices_entrenamiento, indices_validacion = dividir_indices(len(registros), 0.1)
 
 
 """Como en el conjunto de entrenammiento hay muchas mas victorias que derrotas o empates, establecemos un
-peso a cada etiqueta para que se balancee el entrenamiento y no tenga un sesgo hacia las victorias."""
+peso a cada etiqueta para que se balancee el entrenamiento y no tenga un sesgo hacia las victorias.
+Con los datos por lotes, el peso se pasa con cada muestra en lugar de con class_weight."""
+
+pesos_etiquetas = calcular_pesos_etiquetas(registros)
 
-frecuencia_pesos = df[64].value_counts(normalize=True).to_dict() 
-pesos_etiquetas = {
-    -1: 1.0 / frecuencia_pesos[-1],
-     0: 1.0 / frecuencia_pesos[0],
-     1: 1.0 / frecuencia_pesos[1],
-}
+"""En el entrenamiento, cada tablero se gira o refleja al azar cada vez que se usa (aumento de datos con las 8 simetrias del tablero)."""
+datos_entrenamiento = crear_dataset(registros, indices_entrenamiento, 128, pesos_etiquetas, barajar=True, aumentar=True, visitas=visitas)
+datos_validacion = crear_dataset(registros, indices_validacion, 128, barajar=False, visitas=visitas)
 
 
 """Con el objetivo de ahorrar tiempo, colocamos una parada temprana, que para el entrenamiento si no mejora durante 10 epochs"""
@@ -165,17 +156,13 @@ reducir_ap = ReduceLROnPlateau(
     verbose=1
 )
 
-"""Con los datos ya preparados, en canales y con las etiquetas, entrenamos la red, usando un batch de 128 y hasta 30 epochs,
-con un 10% para validación, shuffle, balanceo de clases y callbacks."""
+"""Con los datos ya preparados por lotes, en canales y con las etiquetas, entrenamos la red, usando un batch de 128 y hasta 30 epochs,
+con un 10% para validación, shuffle en cada epoca, balanceo de clases y callbacks."""
 entrenado = model_othello.fit(
-    x=X,
-    y=Y,
-    batch_size=128,
+    datos_entrenamiento,
     epochs=30,
-    validation_split=0.1,
-    shuffle=True,
-    callbacks=[parada, reducir_ap],
-    class_weight=pesos_etiquetas
+    validation_data=datos_validacion,
+    callbacks=[parada, reducir_ap]
 )
 
 """Por último, guardamos la red entrenada en .h5 para cargarla en el motor MCTS que integra la red."""
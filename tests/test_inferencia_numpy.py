@@ -0,0 +1,104 @@
+import os
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import h5py
+import numpy as np
+import pytest
+from red_neuronal.inferencia_numpy import CAPAS, CAPA_POLITICA, cargar_othello_net, comprobar_paridad, posiciones_aleatorias
+
+
+"""Paridad del motor de inferencia NumPy (red_neuronal/inferencia_numpy) con Keras, sobre redes pequeñas con la misma
+estructura que Othello_Net (mismos nombres de capa) pero con pocos filtros, para que se construyan y evaluen enseguida."""
+
+
+FILTROS = (4, 8, 8) #Filtros de conv1, conv2 y conv3
+NEURONAS = 16 #Neuronas de fc1
+
+
+def modelo_keras(con_politica): #Como entrada tiene si el modelo lleva la cabeza de politica.
+    keras = pytest.importorskip("keras._tf_keras.keras")
+    layers = keras.layers
+
+    entrada = keras.Input(shape=(8, 8, 2), name='estado_tablero')
+    x = entrada
+    for i, filtros in enumerate(FILTROS, start=1):
+        x = layers.Conv2D(filtros, (3, 3), padding='same', activation='relu', name=f'conv{i}')(x)
+    x = layers.Flatten(name='flatten')(x)
+    x = layers.Dropout(0.5, name='dropout_fc')(x)
+    x = layers.Dense(NEURONAS, activation='relu', name='fc1')(x)
+    salidas = layers.Dense(1, activation='tanh', name='prob_victoria')(x)
+    if con_politica:
+        salidas = [salidas, layers.Dense(64, activation='softmax', name='politica')(x)]
+    return keras.Model(inputs=entrada, outputs=salidas, name='Othello_Net')
+
+
+@pytest.mark.parametrize("con_politica", [False, True], ids=["valor", "valor_y_politica"])
+def test_paridad_con_keras(tmp_path, con_politica):
+    modelo = modelo_keras(con_politica)
+    ruta = str(tmp_path / "othello_net.h5")
+    modelo.save(ruta)
+
+    assert cargar_othello_net(ruta).tiene_politica == con_politica
+    assert comprobar_paridad(ruta, n=128, tolerancia=1e-4) <= 1e-4
+
+
+def pesos_aleatorios(con_politica, semilla=0): #Como entrada tiene si se incluye la cabeza de politica y la semilla.
+    azar = np.random.default_rng(semilla)
+    formas = {'conv1': (3, 3, 2, FILTROS[0]), 'conv2': (3, 3, FILTROS[0], FILTROS[1]), 'conv3': (3, 3, FILTROS[1], FILTROS[2]),
+              'fc1': (64 * FILTROS[2], NEURONAS), 'prob_victoria': (NEURONAS, 1), CAPA_POLITICA: (NEURONAS, 64)}
+    capas = CAPAS + ((CAPA_POLITICA,) if con_politica else ())
+    return {capa: (azar.normal(0, 0.3, formas[capa]).astype(np.float32), azar.normal(0, 0.1, formas[capa][-1]).astype(np.float32))
+            for capa in capas}
+
+
+def guardar_como_keras(pesos, ruta): #Como entrada tiene los pesos {capa: (kernel, bias)} y la ruta del .h5.
+    """
+    Guarda los pesos con la misma estructura que un .h5 de Keras: model_weights/capa/capa/kernel:0 y bias:0.
+    """
+
+    with h5py.File(ruta, 'w') as archivo:
+        for capa, (kernel, bias) in pesos.items():
+            grupo = archivo.create_group(f'model_weights/{capa}/{capa}')
+            grupo['kernel:0'] = kernel
+            grupo['bias:0'] = bias
+
+
+def pasada_de_referencia(pesos, x): #Como entrada tiene los pesos y un lote (N, 8, 8, 2).
+    """
+    Pasada hacia delante escrita casilla a casilla, sin im2col, con la que comparar OthelloNetNumpy sin necesitar Keras.
+    """
+
+    for capa in ('conv1', 'conv2', 'conv3'):
+        kernel, bias = pesos[capa]
+        relleno = np.pad(x, ((0, 0), (1, 1), (1, 1), (0, 0)))
+        y = np.zeros(x.shape[:3] + (kernel.shape[-1],), dtype=np.float64)
+        for fila in range(8):
+            for columna in range(8):
+                ventana = relleno[:, fila:fila + 3, columna:columna + 3, :]
+                y[:, fila, columna, :] = np.einsum('nijc,ijcf->nf', ventana, kernel) + bias
+        x = np.maximum(y, 0.0)
+
+    x = x.reshape(x.shape[0], -1)
+    x = np.maximum(x @ pesos['fc1'][0] + pesos['fc1'][1], 0.0)
+    valor = np.tanh(x @ pesos['prob_victoria'][0] + pesos['prob_victoria'][1])
+    if CAPA_POLITICA not in pesos:
+        return [valor]
+    logits = x @ pesos[CAPA_POLITICA][0] + pesos[CAPA_POLITICA][1]
+    politica = np.exp(logits - logits.max(axis=1, keepdims=True))
+    return [valor, politica / politica.sum(axis=1, keepdims=True)]
+
+
+@pytest.mark.parametrize("con_politica", [False, True], ids=["valor", "valor_y_politica"])
+def test_lectura_h5_y_pasada(tmp_path, con_politica):
+    pesos = pesos_aleatorios(con_politica)
+    ruta = str(tmp_path / "othello_net.h5")
+    guardar_como_keras(pesos, ruta)
+
+    x = posiciones_aleatorias(64)
+    obtenido = cargar_othello_net(ruta).predict_on_batch(x)
+    obtenido = obtenido if con_politica else [obtenido]
+    esperado = pasada_de_referencia(pesos, x)
+    assert len(obtenido) == len(esperado)
+    for o, e in zip(obtenido, esperado):
+        assert o.shape == e.shape
+        assert np.max(np.abs(o - e)) <= 1e-4
@@ -0,0 +1,210 @@
+'''
+Núcleo del juego basado en bitboards.
+
+Cada color se representa con un entero de 64 bits en el que el bit "fila*8 + col" vale 1 si hay una ficha de ese color en la
+casilla (fila, col). Así, los movimientos legales se obtienen con desplazamientos y máscaras sobre el tablero completo en lugar de
+recorrer las 64 casillas una a una, las fichas a voltear se calculan dirección a dirección y el recuento de fichas es un simple
+conteo de bits.
+'''
+
+LLENO = 0xFFFFFFFFFFFFFFFF # Las 64 casillas del tablero
+NO_COL_A = 0xFEFEFEFEFEFEFEFE # Todas las casillas salvo las de la columna 0
+NO_COL_H = 0x7F7F7F7F7F7F7F7F # Todas las casillas salvo las de la columna 7
+
+# Direcciones de recorrido del tablero. Cada tupla tiene el desplazamiento en bits y las máscaras que se aplican tras desplazar
+# hacia índices mayores (izquierda, <<) y hacia índices menores (derecha, >>). Las máscaras evitan que una ficha "salte" de un
+# extremo de una fila al extremo opuesto de la fila siguiente.
+DIRECCIONES = [(1, NO_COL_A, NO_COL_H), # Misma fila, columna siguiente / anterior
+               (7, NO_COL_H, NO_COL_A), # Fila siguiente y columna anterior / fila anterior y columna siguiente
+               (8, LLENO, LLENO),       # Misma columna, fila siguiente / anterior
+               (9, NO_COL_A, NO_COL_H)] # Fila siguiente y columna siguiente / fila anterior y columna anterior
+
+
+def movimientos_bb(propias, rivales):
+    '''
+    Esta función devuelve un bitboard con las casillas en las que el jugador con las fichas "propias" puede colocar una ficha.
+
+    PARÁMETROS
+    - propias: Bitboard con las fichas del jugador que está en su turno.
+    - rivales: Bitboard con las fichas del otro jugador.
+    '''
+
+    vacias = ~(propias | rivales) & LLENO
+    res = 0
+    for d, mascara_izq, mascara_der in DIRECCIONES:
+        # Hacia índices mayores: se propaga la cadena de fichas rivales adyacentes a las propias (como mucho 6 fichas seguidas)
+        # y la casilla vacía que queda justo detrás de la cadena es un movimiento legal.
+        rivales_izq = rivales & mascara_izq
+        x = (propias << d) & rivales_izq
+        x |= (x << d) & rivales_izq
+        x |= (x << d) & rivales_izq
+        x |= (x << d) & rivales_izq
+        x |= (x << d) & rivales_izq
+        x |= (x << d) & rivales_izq
+        res |= (x << d) & mascara_izq & vacias
+
+        # Lo mismo hacia índices menores
+        rivales_der = rivales & mascara_der
+        x = (propias >> d) & rivales_der
+        x |= (x >> d) & rivales_der
+        x |= (x >> d) & rivales_der
+        x |= (x >> d) & rivales_der
+        x |= (x >> d) & rivales_der
+        x |= (x >> d) & rivales_der
+        res |= (x >> d) & mascara_der & vacias
+
+    return res
+
+def analizar_bb(propias, rivales):
+    '''
+    Esta función analiza una posición en una sola pasada por las direcciones del tablero y devuelve la tupla
+    (movimientos, rival_puede_mover, terminal):
+    - movimientos: Bitboard con las casillas en las que el jugador en su turno puede colocar ficha.
+    - rival_puede_mover: True si el otro jugador tiene algún movimiento (necesario para saber si se pasa turno).
+    - terminal: True si ninguno de los dos jugadores puede colocar ficha.
+
+    PARÁMETROS
+    - propias: Bitboard con las fichas del jugador que está en su turno.
+    - rivales: Bitboard con las fichas del otro jugador.
+    '''
+
+    vacias = ~(propias | rivales) & LLENO
+    movimientos = 0
+    movimientos_rival = 0
+    for d, mascara_izq, mascara_der in DIRECCIONES:
+        # Se propagan a la vez las cadenas de ambos jugadores, igual que en movimientos_bb.
+        rivales_izq = rivales & mascara_izq
+        propias_izq = propias & mascara_izq
+        x = (propias << d) & rivales_izq
+        y = (rivales << d) & propias_izq
+        for _ in range(5):
+            x |= (x << d) & rivales_izq
+            y |= (y << d) & propias_izq
+        movimientos |= (x << d) & mascara_izq & vacias
+        movimientos_rival |= (y << d) & mascara_izq & vacias
+
+        rivales_der = rivales & mascara_der
+        propias_der = propias & mascara_der
+        x = (propias >> d) & rivales_der
+        y = (rivales >> d) & propias_der
+        for _ in range(5):
+            x |= (x >> d) & rivales_der
+            y |= (y >> d) & propias_der
+        movimientos |= (x >> d) & mascara_der & vacias
+        movimientos_rival |= (y >> d) & mascara_der & vacias
+
+    return movimientos, movimientos_rival != 0, not (movimientos or movimientos_rival)
+
+def volteos_bb(propias, rivales, casilla):
+    '''
+    Esta función devuelve un bitboard con las fichas rivales que serán volteadas tras colocar una ficha propia en la casilla dada.
+
+    PARÁMETROS
+    - propias: Bitboard con las fichas del jugador que coloca la ficha.
+    - rivales: Bitboard con las fichas del otro jugador.
+    - casilla: Índice (fila*8 + col) de la casilla en la que se coloca la ficha.
+    '''
+
+    bit = 1 << casilla
+    res = 0
+    for d, mascara_izq, mascara_der in DIRECCIONES:
+        # Se avanza mientras haya fichas rivales; sólo se voltean si la cadena termina en una ficha propia.
+        linea = 0
+        x = (bit << d) & mascara_izq
+        while x & rivales:
+            linea |= x
+            x = (x << d) & mascara_izq
+        if x & propias:
+            res |= linea
+
+        linea = 0
+        x = (bit >> d) & mascara_der
+        while x & rivales:
+            linea |= x
+            x = (x >> d) & mascara_der
+        if x & propias:
+            res |= linea
+
+    return res
+
+def contar(bb):
+    '''
+    Esta función devuelve el número de fichas (bits a 1) de un bitboard.
+
+    PARÁMETROS
+    - bb: Bitboard del que se quieren contar las fichas.
+    '''
+
+    return bb.bit_count()
+
+def casillas(bb):
+    '''
+    Esta función devuelve una lista con los índices (fila*8 + col) de las casillas marcadas en un bitboard, de menor a mayor.
+
+    PARÁMETROS
+    - bb: Bitboard del que se quieren obtener las casillas.
+    '''
+
+    res = []
+    while bb:
+        bit = bb & -bb # Bit menos significativo
+        res.append(bit.bit_length() - 1)
+        bb ^= bit
+    return res
+
+def tablero_a_bitboards(tablero):
+    '''
+    Esta función convierte un tablero 8x8 en una tupla (blancas, negras) de bitboards.
+
+    PARÁMETROS
+    - tablero: Matriz 8x8 con los valores que indican qué ficha hay en cada casilla.
+    '''
+
+    blancas = 0
+    negras = 0
+    bit = 1
+    for fila in tablero:
+        for valor in fila:
+            if valor == 1:
+                blancas |= bit
+            elif valor == 2:
+                negras |= bit
+            bit <<= 1
+    return blancas, negras
+
+def bitboards_a_tablero(blancas, negras):
+    '''
+    Esta función convierte una pareja de bitboards en un tablero 8x8 con los valores 0 (vacía), 1 (blanca) y 2 (negra).
+
+    PARÁMETROS
+    - blancas: Bitboard con las fichas blancas.
+    - negras: Bitboard con las fichas negras.
+    '''
+
+    tablero = []
+    for fila in range(8):
+        valores = []
+        for col in range(8):
+            bit = 1 << (fila * 8 + col)
+            if blancas & bit:
+                valores.append(1)
+            elif negras & bit:
+                valores.append(2)
+            else:
+                valores.append(0)
+        tablero.append(valores)
+    return tablero
+
+def propias_y_rivales(blancas, negras, turno):
+    '''
+    Esta función ordena los bitboards según el jugador en su turno y devuelve la tupla (propias, rivales).
+
+    PARÁMETROS
+    - blancas: Bitboard con las fichas blancas.
+    - negras: Bitboard con las fichas negras.
+    - turno: Número que indica qué jugador está en su turno (1: blancas, 2: negras).
+    '''
+
+    if turno == 1:
+        return blancas, negras
+    return negras, blancas
@@ -0,0 +1,209 @@
+'''
+Formato binario compacto para los datos de entrenamiento.
+
+Cada estado del tablero ocupa un registro de 17 bytes, en lugar de los ~130 caracteres de una fila del csv:
+- blancas: Bitboard (entero de 64 bits sin signo, little endian) con las fichas blancas.
+- negras: Bitboard con las fichas negras.
+- info: Un byte con el turno en los bits 0-1 (0: desconocido, 1: blancas, 2: negras) y la etiqueta + 1 en los bits 2-3
+  (0: derrota, 1: empate, 2: victoria).
+
+Los registros van uno detrás de otro sin cabecera, así que un archivo se puede leer entero con np.memmap sin cargarlo en
+memoria, y varios archivos se pueden unir simplemente concatenándolos.
+
+Junto a cada archivo de registros puede haber otro con las visitas de la búsqueda en cada estado (ver ruta_visitas), el
+objetivo de la cabeza de política de la red: un registro VISITAS de 128 bytes (64 enteros de 16 bits sin signo, little endian,
+con las visitas de cada casilla fila*8 + col) por cada registro del primero y en el mismo orden. Los estados en los que no se
+buscó (jugadas del contrincante, del libro o del solucionador final, y el estado final) tienen todas las visitas a 0.
+'''
+
+# Imports
+import csv
+import os
+import sys
+import numpy as np
+
+REGISTRO = np.dtype([('blancas', '<u8'), ('negras', '<u8'), ('info', 'u1')])
+VISITAS = np.dtype(('<u2', 64))
+MAX_VISITAS = 65535
+
+
+def empaquetar_info(turno, etiqueta):
+    '''
+    Esta función devuelve el byte "info" de un registro.
+
+    PARÁMETROS
+    - turno: Turno del estado (0: desconocido, 1: blancas, 2: negras).
+    - etiqueta: Etiqueta del resultado de la partida (-1, 0 o 1).
+    '''
+
+    return turno | ((etiqueta + 1) << 2)
+
+def crear_registros(instantaneas, etiqueta):
+    '''
+    Esta función devuelve un array de registros, uno por cada instantánea, todos con la misma etiqueta.
+
+    PARÁMETROS
+    - instantaneas: Lista de tuplas (blancas, negras, turno).
+    - etiqueta: Etiqueta del resultado de la partida a la que pertenecen los estados.
+    '''
+
+    registros = np.empty(len(instantaneas), dtype=REGISTRO)
+    for i, (blancas, negras, turno) in enumerate(instantaneas):
+        registros[i] = (blancas, negras, empaquetar_info(turno, etiqueta))
+    return registros
+
+def escribir_registros(archivo, instantaneas, etiqueta):
+    '''
+    Esta función añade al final de un archivo binario abierto los registros de las instantáneas dadas.
+
+    PARÁMETROS
+    - archivo: Archivo abierto en modo binario ('wb' o 'ab').
+    - instantaneas: Lista de tuplas (blancas, negras, turno).
+    - etiqueta: Etiqueta del resultado de la partida a la que pertenecen los estados.
+    '''
+
+    archivo.write(crear_registros(instantaneas, etiqueta).tobytes())
+
+def leer_binario(ruta):
+    '''
+    Esta función abre un archivo de registros como un array de NumPy proyectado en memoria (np.memmap): los datos se leen del
+    disco según se van usando, así que el archivo puede ser más grande que la memoria disponible.
+
+    PARÁMETROS
+    - ruta: Ruta del archivo binario.
+    '''
+
+    return np.memmap(ruta, dtype=REGISTRO, mode='r')
+
+def ruta_visitas(ruta):
+    '''
+    Esta función devuelve la ruta del archivo de visitas que acompaña al archivo de registros dado (por ejemplo
+    "datos/datos.visitas.bin" para "datos/datos.bin").
+
+    PARÁMETROS
+    - ruta: Ruta del archivo de registros.
+    '''
+
+    base, extension = os.path.splitext(ruta)
+    return f"{base}.visitas{extension}"
+
+def crear_visitas(visitas):
+    '''
+    Esta función devuelve un array (N, 64) de uint16 con las visitas de cada casilla en cada estado. Si algún estado tiene más
+    visitas de las que caben en 16 bits, las de ese estado se escalan para que la más alta sea MAX_VISITAS (la proporción entre
+    casillas, que es lo que aprende la red, apenas cambia).
+
+    PARÁMETROS
+    - visitas: Lista con un diccionario {casilla: visitas} por estado, o None en los estados en los que no se buscó.
+    '''
+
+    filas = np.zeros(len(visitas), dtype=VISITAS)
+    for i, visitas_estado in enumerate(visitas):
+        if visitas_estado:
+            escala = min(1.0, MAX_VISITAS / max(visitas_estado.values()))
+            for casilla, n in visitas_estado.items():
+                filas[i, casilla] = int(n * escala)
+    return filas
+
+def escribir_visitas(archivo, visitas):
+    '''
+    Esta función añade al final de un archivo binario abierto las visitas de los estados dados (ver crear_visitas).
+
+    PARÁMETROS
+    - archivo: Archivo abierto en modo binario ('wb' o 'ab').
+    - visitas: Lista con un diccionario {casilla: visitas} (o None) por estado.
+    '''
+
+    archivo.write(crear_visitas(visitas).tobytes())
+
+def leer_visitas(ruta):
+    '''
+    Esta función abre un archivo de visitas como un array (N, 64) de NumPy proyectado en memoria, igual que leer_binario.
+
+    PARÁMETROS
+    - ruta: Ruta del archivo de visitas.
+    '''
+
+    return np.memmap(ruta, dtype='<u2', mode='r').reshape(-1, 64)
+
+
+def bitboards_a_bits(bitboards):
+    '''
+    Esta función convierte un array de N bitboards en un array (N, 8, 8) de ceros y unos, con la casilla fila*8 + col en [fila, col].
+
+    PARÁMETROS
+    - bitboards: Array de N enteros de 64 bits.
+    '''
+
+    bytes_tablero = np.ascontiguousarray(bitboards, dtype='<u8').view(np.uint8).reshape(-1, 8)
+    return np.unpackbits(bytes_tablero, axis=1, bitorder='little').reshape(-1, 8, 8)
+
+def registros_a_tableros(registros):
+    '''
+    Esta función devuelve un array (N, 8, 8) de enteros con los tableros de los registros, con los mismos valores que el csv
+    (0: vacía, 1: blanca, 2: negra).
+
+    PARÁMETROS
+    - registros: Array de registros (por ejemplo, el devuelto por leer_binario).
+    '''
+
+    return (bitboards_a_bits(registros['blancas']) + 2 * bitboards_a_bits(registros['negras'])).astype(np.int32)
+
+def etiquetas(registros):
+    '''
+    Esta función devuelve un array con la etiqueta (-1, 0 o 1) de cada registro.
+
+    PARÁMETROS
+    - registros: Array de registros.
+    '''
+
+    return ((registros['info'] >> 2) & 3).astype(np.int8) - 1
+
+def turnos(registros):
+    '''
+    Esta función devuelve un array con el turno (0: desconocido, 1: blancas, 2: negras) de cada registro.
+
+    PARÁMETROS
+    - registros: Array de registros.
+    '''
+
+    return (registros['info'] & 3).astype(np.int8)
+
+
+def convertir_csv_a_binario(ruta_csv, ruta_binario, filas_por_bloque=65536):
+    '''
+    Esta función convierte un csv de datos (64 casillas y la etiqueta por fila) al formato binario, por bloques para no cargar
+    todo el csv en memoria. El csv no guarda el turno, así que los registros se escriben con turno 0 (desconocido).
+    Devuelve el número de registros escritos.
+
+    PARÁMETROS
+    - ruta_csv: Ruta del csv de entrada.
+    - ruta_binario: Ruta del archivo binario de salida.
+    - filas_por_bloque: Número de filas que se convierten de una vez.
+    '''
+
+    # Peso de cada casilla en el bitboard: la casilla i vale 2**i
+    pesos = np.left_shift(np.uint64(1), np.arange(64, dtype=np.uint64))
+    total = 0
+    with open(ruta_csv, newline='') as entrada, open(ruta_binario, 'wb') as salida:
+        lector = csv.reader(entrada)
+        while True:
+            filas = [fila for _, fila in zip(range(filas_por_bloque), lector) if fila]
+            if not filas:
+                break
+            datos = np.array(filas, dtype=np.int64)
+            casillas_tablero, etiqueta = datos[:, :64], datos[:, 64]
+            registros = np.empty(len(datos), dtype=REGISTRO)
+            registros['blancas'] = np.bitwise_or.reduce(np.where(casillas_tablero == 1, pesos, np.uint64(0)), axis=1)
+            registros['negras'] = np.bitwise_or.reduce(np.where(casillas_tablero == 2, pesos, np.uint64(0)), axis=1)
+            registros['info'] = empaquetar_info(0, etiqueta)
+            salida.write(registros.tobytes())
+            total += len(datos)
+    return total
+
+
+# Conversión de un csv existente: python utiles/datos_binarios.py datos/datos_otelo.csv datos/datos_otelo.bin
+if __name__ == '__main__':
+    ruta_csv = sys.argv[1]
+    ruta_binario = sys.argv[2] if len(sys.argv) > 2 else ruta_csv.rsplit('.', 1)[0] + '.bin'
+    print(f"{convertir_csv_a_binario(ruta_csv, ruta_binario)} registros escritos en '{ruta_binario}'")
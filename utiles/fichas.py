@@ -1,5 +1,5 @@
 # Imports
-import pygame as pg
+from utiles.bitboard import *
 
 def obtener_fichas_a_voltear(tablero, fila, col, turno):
     '''
@@ -13,35 +13,12 @@ def obtener_fichas_a_voltear(tablero, fila, col, turno):
     - turno: Número que indica qué jugador está en su turno (0: ninguno, 1: blancas, 2: negras).
     '''
 
-    # Lista con las coordenadas de las direcciones posibles. El primer número de cada tupla es la fila (1: 
-    # una fila más, -1: una fila menos, 0: la misma fila). El segundo es la columna (1: una columna más...)
-    direcciones = [(-1,-1),(-1, 0),(-1, 1),
-                   ( 0,-1),        ( 0, 1),
-                   ( 1,-1),( 1, 0),( 1, 1)]
-    res = []
-    
-    # En este bucle se añaden, para cada una de las direcciones, las coordenadas de las fichas
-    # que serán volteadas tras la colocación de una ficha en la posicion (fila, col).
-    for df, dc in direcciones:
-        nf = fila + df
-        nc = col + dc
-        fichas_por_voltear = [] # Lista de fichas que voltearán SÓLO en la dirección que vamos a recorrer.
-
-        while 0 <= nf < 8 and 0 <= nc < 8:
-            nueva_ficha = tablero[nf][nc]
-            
-            if nueva_ficha == 0:
-                break # La casilla no tiene ninguna ficha, dejamos de recorrer la dirección.
-            elif nueva_ficha == turno:
-                if fichas_por_voltear:
-                    res.extend(fichas_por_voltear) # Se añade al resultado de la función las fichas que voltearán.
-                break # Como la casilla tiene una ficha del jugador que está en su turno, dejamos de recorrer la dirección.
-            else:
-                fichas_por_voltear.append((nf, nc))
-            
-            nf += df # Siguiente fila
-            nc += dc # Siguiente columna
+    blancas, negras = tablero_a_bitboards(tablero)
+    propias, rivales = propias_y_rivales(blancas, negras, turno)
+    volteadas = volteos_bb(propias, rivales, fila * 8 + col)
 
+    # Se pasan los índices del bitboard a coordenadas (fila, col) del tablero.
+    res = [(i >> 3, i & 7) for i in casillas(volteadas)]
     return res
 
 def movimientos_disponibles(tablero, turno):
@@ -53,13 +30,11 @@ def movimientos_disponibles(tablero, turno):
     - turno: Número que indica qué jugador está en su turno (0: ninguno, 1: blancas, 2: negras).
     '''
 
-    res = []
-    for fila in range(8):
-        for col in range(8):
-            if tablero[fila][col] == 0:
-                fichas = obtener_fichas_a_voltear(tablero, fila, col, turno)
-                if fichas:
-                    res.append((fila,col))
+    blancas, negras = tablero_a_bitboards(tablero)
+    propias, rivales = propias_y_rivales(blancas, negras, turno)
+
+    # Los índices se recorren de menor a mayor, por lo que las coordenadas salen ordenadas por filas como con el tablero 8x8.
+    res = [(i >> 3, i & 7) for i in casillas(movimientos_bb(propias, rivales))]
 
     return res
 
@@ -72,8 +47,9 @@ def obtener_ganador(tablero):
     '''
 
     # Conteo de fichas de cada color.
-    blancas = sum(fila.count(1) for fila in tablero)
-    negras = sum(fila.count(2) for fila in tablero)
+    bb_blancas, bb_negras = tablero_a_bitboards(tablero)
+    blancas = contar(bb_blancas)
+    negras = contar(bb_negras)
 
     if blancas > negras:
         return 1
@@ -0,0 +1,151 @@
+'''
+Posición mutable de una partida de Otelo sobre bitboards.
+
+En lugar de copiar el tablero cada vez que se explora un movimiento, la posición se modifica en el sitio con "hacer" y se
+recupera con "deshacer". Para ello se guarda una pila con la casilla jugada y las fichas volteadas en cada movimiento, que es
+todo lo necesario para volver atrás.
+'''
+
+# Imports
+from utiles.bitboard import *
+from utiles.zobrist import *
+
+
+class Posicion:
+    def __init__(self, blancas, negras, turno):
+        '''
+        Esta clase representa el estado de una partida (fichas de cada jugador y turno) que puede avanzar y retroceder en el sitio.
+
+        ATRIBUTOS
+        - propias: Bitboard con las fichas del jugador que está en su turno.
+        - rivales: Bitboard con las fichas del otro jugador.
+        - turno: Número que indica qué jugador está en su turno (1: blancas, 2: negras).
+        - clave: Clave de Zobrist de la posición (tablero y turno), que se actualiza de forma incremental en cada movimiento.
+        - historial: Pila de movimientos hechos desde que se creó la posición. Cada elemento es una tupla (casilla, volteadas, clave),
+          con casilla igual a None si el jugador pasó turno y clave igual a la clave de la posición antes del movimiento.
+        '''
+        self.propias, self.rivales = propias_y_rivales(blancas, negras, turno)
+        self.turno = turno
+        self.clave = clave_zobrist(blancas, negras, turno)
+        self.historial = []
+
+    def blancas(self):
+        '''
+        Esta función devuelve el bitboard con las fichas blancas.
+        '''
+
+        return self.propias if self.turno == 1 else self.rivales
+
+    def negras(self):
+        '''
+        Esta función devuelve el bitboard con las fichas negras.
+        '''
+
+        return self.rivales if self.turno == 1 else self.propias
+
+    def movimientos(self):
+        '''
+        Esta función devuelve el bitboard con las casillas en las que el jugador en su turno puede colocar ficha.
+        '''
+
+        return movimientos_bb(self.propias, self.rivales)
+
+    def no_terminal(self):
+        '''
+        Esta función comprueba que alguno de los dos jugadores pueda colocar ficha, es decir, que la partida no haya terminado.
+        '''
+
+        return movimientos_bb(self.propias, self.rivales) or movimientos_bb(self.rivales, self.propias)
+
+    def analizar(self):
+        '''
+        Esta función devuelve, en una sola pasada, la tupla (movimientos, rival_puede_mover, terminal) de la posición (ver analizar_bb).
+        '''
+
+        return analizar_bb(self.propias, self.rivales)
+
+    def hacer(self, casilla):
+        '''
+        Esta función coloca una ficha del jugador en su turno, voltea las fichas correspondientes y pasa el turno.
+
+        PARÁMETROS
+        - casilla: Índice (fila*8 + col) de la casilla en la que se coloca la ficha. Debe ser un movimiento legal.
+        '''
+
+        volteadas = volteos_bb(self.propias, self.rivales, casilla)
+        self.historial.append((casilla, volteadas, self.clave))
+        self.clave = clave_tras_movimiento(self.clave, casilla, volteadas, self.turno)
+        # Tras colocar la ficha, el jugador que estaba en su turno pasa a ser el "rival" de la nueva posición.
+        self.propias, self.rivales = self.rivales ^ volteadas, self.propias | (1 << casilla) | volteadas
+        self.turno = 3 - self.turno
+
+    def pasar(self):
+        '''
+        Esta función pasa el turno sin colocar ficha.
+        '''
+
+        self.historial.append((None, 0, self.clave))
+        self.clave ^= CLAVE_TURNO
+        self.propias, self.rivales = self.rivales, self.propias
+        self.turno = 3 - self.turno
+
+    def deshacer(self):
+        '''
+        Esta función deshace el último movimiento (o paso de turno) hecho sobre la posición.
+        '''
+
+        casilla, volteadas, self.clave = self.historial.pop()
+        if casilla is None:
+            self.propias, self.rivales = self.rivales, self.propias
+        else:
+            self.propias, self.rivales = self.rivales & ~((1 << casilla) | volteadas), self.propias | volteadas
+        self.turno = 3 - self.turno
+
+    def volver(self, profundidad):
+        '''
+        Esta función deshace movimientos hasta que en el historial queden "profundidad" movimientos.
+
+        PARÁMETROS
+        - profundidad: Número de movimientos del historial que se quieren conservar.
+        '''
+
+        while len(self.historial) > profundidad:
+            self.deshacer()
+
+    def instantanea(self):
+        '''
+        Esta función devuelve una tupla compacta (blancas, negras, turno) con el estado actual de la posición.
+        '''
+
+        return self.blancas(), self.negras(), self.turno
+
+    def a_tablero(self):
+        '''
+        Esta función devuelve el tablero 8x8 correspondiente a la posición.
+        '''
+
+        return bitboards_a_tablero(self.blancas(), self.negras())
+
+
+def nueva_posicion(tablero, turno):
+    '''
+    Esta función crea una posición nueva, con el historial vacío, a partir de un tablero 8x8 o de otra posición.
+
+    PARÁMETROS
+    - tablero: Matriz 8x8 con los valores que indican qué ficha hay en cada casilla, o una Posicion ya existente.
+    - turno: Número que indica qué jugador está en su turno (1: blancas, 2: negras).
+    '''
+
+    if isinstance(tablero, Posicion):
+        return Posicion(tablero.blancas(), tablero.negras(), turno)
+    blancas, negras = tablero_a_bitboards(tablero)
+    return Posicion(blancas, negras, turno)
+
+def posicion_inicial():
+    '''
+    Esta función devuelve la posición de comienzo de la partida (cuatro fichas en el centro y empiezan las negras).
+    '''
+
+    blancas = (1 << 27) | (1 << 36) # Casillas (3,3) y (4,4)
+    negras = (1 << 28) | (1 << 35) # Casillas (3,4) y (4,3)
+    return Posicion(blancas, negras, 2)
@@ -0,0 +1,179 @@
+'''
+Simetrías del tablero de Otelo sobre bitboards.
+
+El tablero tiene 8 simetrías (las del cuadrado): la identidad, 3 giros y 4 reflexiones. Todas se obtienen combinando tres
+transformaciones básicas, cada una de ellas con unas pocas operaciones de bits sobre el bitboard completo:
+- voltear_vertical: fila -> 7 - fila (invertir el orden de los bytes).
+- voltear_horizontal: col -> 7 - col (invertir el orden de los bits de cada byte).
+- transponer: (fila, col) -> (col, fila) (reflexión sobre la diagonal de la casilla 0 a la 63).
+
+Las funciones sólo usan desplazamientos, máscaras y XOR, así que sirven tanto para enteros de Python como para arrays de
+NumPy de tipo uint64 (transformando muchos bitboards a la vez).
+'''
+
+# Imports
+from utiles.bitboard import LLENO
+
+NUM_SIMETRIAS = 8
+
+
+def voltear_vertical(bb):
+    '''
+    Esta función devuelve el bitboard reflejado verticalmente: la fila f pasa a ser la fila 7 - f.
+
+    PARÁMETROS
+    - bb: Bitboard (entero o array de NumPy uint64).
+    '''
+
+    bb = ((bb >> 8) & 0x00FF00FF00FF00FF) | ((bb & 0x00FF00FF00FF00FF) << 8)
+    bb = ((bb >> 16) & 0x0000FFFF0000FFFF) | ((bb & 0x0000FFFF0000FFFF) << 16)
+    return (bb >> 32) | ((bb << 32) & LLENO)
+
+def voltear_horizontal(bb):
+    '''
+    Esta función devuelve el bitboard reflejado horizontalmente: la columna c pasa a ser la columna 7 - c.
+
+    PARÁMETROS
+    - bb: Bitboard (entero o array de NumPy uint64).
+    '''
+
+    bb = ((bb >> 1) & 0x5555555555555555) | ((bb & 0x5555555555555555) << 1)
+    bb = ((bb >> 2) & 0x3333333333333333) | ((bb & 0x3333333333333333) << 2)
+    return ((bb >> 4) & 0x0F0F0F0F0F0F0F0F) | ((bb & 0x0F0F0F0F0F0F0F0F) << 4)
+
+def transponer(bb):
+    '''
+    Esta función devuelve el bitboard reflejado sobre la diagonal principal: la casilla (fila, col) pasa a ser (col, fila).
+
+    PARÁMETROS
+    - bb: Bitboard (entero o array de NumPy uint64).
+    '''
+
+    t = 0x0F0F0F0F00000000 & (bb ^ ((bb << 28) & LLENO))
+    bb = bb ^ t ^ (t >> 28)
+    t = 0x3333000033330000 & (bb ^ ((bb << 14) & LLENO))
+    bb = bb ^ t ^ (t >> 14)
+    t = 0x5500550055005500 & (bb ^ ((bb << 7) & LLENO))
+    return bb ^ t ^ (t >> 7)
+
+def aplicar_simetria(bb, simetria):
+    '''
+    Esta función devuelve el bitboard transformado por una de las 8 simetrías. La simetría es un número de 0 a 7 cuyos bits
+    indican qué transformaciones básicas se aplican, en este orden: bit 0 voltear_vertical, bit 1 voltear_horizontal y bit 2 transponer.
+    La simetría 0 es la identidad.
+
+    PARÁMETROS
+    - bb: Bitboard (entero o array de NumPy uint64).
+    - simetria: Número de la simetría (0 a 7).
+    '''
+
+    if simetria & 1:
+        bb = voltear_vertical(bb)
+    if simetria & 2:
+        bb = voltear_horizontal(bb)
+    if simetria & 4:
+        bb = transponer(bb)
+    return bb
+
+def simetria_inversa(simetria):
+    '''
+    Esta función devuelve la simetría que deshace la simetría dada. Los volteos y la transposición son su propia inversa, pero
+    al deshacerlos hay que aplicarlos en el orden contrario, y transponer intercambia el volteo vertical con el horizontal.
+
+    PARÁMETROS
+    - simetria: Número de la simetría (0 a 7).
+    '''
+
+    if simetria & 4:
+        return 4 | ((simetria & 1) << 1) | ((simetria & 2) >> 1)
+    return simetria
+
+def simetria_casilla(casilla, simetria):
+    '''
+    Esta función devuelve la casilla (fila*8 + col) a la que va la casilla dada al aplicar la simetría.
+
+    PARÁMETROS
+    - casilla: Índice de la casilla (0 a 63).
+    - simetria: Número de la simetría (0 a 7).
+    '''
+
+    return aplicar_simetria(1 << casilla, simetria).bit_length() - 1
+
+
+# PERMUTACIONES[s][c] es la casilla a la que va la casilla c con la simetría s (ver simetria_casilla).
+PERMUTACIONES = [[simetria_casilla(casilla, simetria) for casilla in range(64)] for simetria in range(NUM_SIMETRIAS)]
+
+def aplicar_simetria_casillas(valores, simetria):
+    '''
+    Esta función transforma por una de las 8 simetrías unos valores dados por casilla (por ejemplo, las probabilidades de cada
+    movimiento): el valor de la casilla c pasa a la casilla simetria_casilla(c, simetria), igual que la ficha de esa casilla
+    con aplicar_simetria.
+
+    PARÁMETROS
+    - valores: Array de NumPy de forma (..., 64) con un valor por casilla (fila*8 + col).
+    - simetria: Número de la simetría (0 a 7).
+    '''
+
+    return valores[..., PERMUTACIONES[simetria_inversa(simetria)]]
+
+def forma_canonica(blancas, negras):
+    '''
+    Esta función devuelve la forma canónica de una posición: de sus 8 versiones simétricas, la de menor tupla (blancas, negras).
+    Dos posiciones simétricas tienen la misma forma canónica. Devuelve la tupla (blancas, negras, simetria), donde simetria es
+    la que transforma la posición dada en la canónica.
+
+    PARÁMETROS
+    - blancas: Bitboard con las fichas blancas.
+    - negras: Bitboard con las fichas negras.
+    '''
+
+    mejor = None
+    for simetria in range(NUM_SIMETRIAS):
+        candidata = (aplicar_simetria(blancas, simetria), aplicar_simetria(negras, simetria), simetria)
+        if mejor is None or candidata < mejor:
+            mejor = candidata
+    return mejor
+
+def instantanea_canonica(instantanea):
+    '''
+    Esta función devuelve la instantánea (blancas, negras, turno) en su forma canónica. El turno no cambia con las simetrías.
+
+    PARÁMETROS
+    - instantanea: Tupla (blancas, negras, turno).
+    '''
+
+    blancas, negras, turno = instantanea
+    blancas, negras, _ = forma_canonica(blancas, negras)
+    return (blancas, negras, turno)
+
+def instantaneas_simetricas(instantanea):
+    '''
+    Esta función devuelve la lista con las 8 versiones simétricas de una instantánea (blancas, negras, turno).
+
+    PARÁMETROS
+    - instantanea: Tupla (blancas, negras, turno).
+    '''
+
+    blancas, negras, turno = instantanea
+    return [(aplicar_simetria(blancas, s), aplicar_simetria(negras, s), turno) for s in range(NUM_SIMETRIAS)]
+
+
+def simetrias_aleatorias(blancas, negras, simetrias):
+    '''
+    Esta función aplica a cada pareja de bitboards de dos arrays de NumPy uint64 su propia simetría, por ejemplo una elegida al azar
+    para cada muestra al aumentar los datos de entrenamiento. Devuelve los arrays (blancas, negras) transformados.
+
+    PARÁMETROS
+    - blancas: Array uint64 con los bitboards de las fichas blancas.
+    - negras: Array uint64 con los bitboards de las fichas negras.
+    - simetrias: Array con el número de simetría (0 a 7) de cada muestra.
+    '''
+
+    blancas = blancas.copy()
+    negras = negras.copy()
+    for simetria in range(1, NUM_SIMETRIAS):
+        elegidas = simetrias == simetria
+        if elegidas.any():
+            blancas[elegidas] = aplicar_simetria(blancas[elegidas], simetria)
+            negras[elegidas] = aplicar_simetria(negras[elegidas], simetria)
+    return blancas, negras
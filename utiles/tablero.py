@@ -2,6 +2,9 @@
 # Imports
 import pygame as pg
 
+# Fuente del rótulo de dibujar_pensando. Se crea la primera vez que se usa, cuando pygame ya está iniciado.
+fuente_rotulo = None
+
 def dibujar_tablero(pantalla, tablero, long_casilla, color_fondo, color_lineas):
     '''
     Esta función sirve para dibujar el tablero resultante de cada movimiento de los dos jugadores.
@@ -35,4 +38,31 @@ def dibujar_tablero(pantalla, tablero, long_casilla, color_fondo, color_lineas):
             centro = (x + long_casilla // 2, y + long_casilla // 2)
             radio = long_casilla // 2 - 5
             # Dibujar ficha
-            pg.draw.circle(pantalla, color, centro, radio)
\ No newline at end of file
+            pg.draw.circle(pantalla, color, centro, radio)
+
+def dibujar_pensando(pantalla, long_tablero, segundos, texto="IA pensando"):
+    '''
+    Esta función sirve para indicar que la IA está pensando su movimiento, con un rótulo en la parte inferior del tablero que
+    muestra el tiempo que lleva buscando y unos puntos que se mueven mientras tanto. Se dibuja encima del tablero en cada
+    fotograma de la búsqueda.
+
+    PARÁMETROS
+    - pantalla: Pantalla de pygame necesaria para que la función aplique los cambios.
+    - long_tablero: Longitud, en píxeles, del lado del tablero.
+    - segundos: Segundos que lleva la IA pensando.
+    - texto: Texto del rótulo.
+    '''
+
+    global fuente_rotulo
+    if fuente_rotulo is None:
+        fuente_rotulo = pg.font.Font(None, 32)
+    puntos = "." * (int(segundos * 3) % 4)
+    rotulo = fuente_rotulo.render(f"{texto}{puntos:<3}  {segundos:.1f} s", True, (255, 255, 255))
+    # Fondo semitransparente para que el rótulo se lea sobre cualquier ficha
+    ancho, alto = rotulo.get_width() + 24, rotulo.get_height() + 12
+    fondo = pg.Surface((ancho, alto), pg.SRCALPHA)
+    fondo.fill((0, 0, 0, 160))
+    x = (long_tablero - ancho) // 2
+    y = long_tablero - alto - 8
+    pantalla.blit(fondo, (x, y))
+    pantalla.blit(rotulo, (x + 12, y + 6))
@@ -0,0 +1,57 @@
+'''
+Claves de Zobrist para identificar posiciones (tablero y turno) con un único entero de 64 bits.
+
+La clave de una posición es el XOR de un número aleatorio por cada ficha (según su casilla y su color) y, si mueven las
+negras, de un número más para el turno. Como el XOR se deshace a sí mismo, al colocar una ficha o voltear otras la clave se
+actualiza con unos pocos XOR en lugar de recalcularse desde cero.
+'''
+
+# Imports
+import random
+from utiles.bitboard import casillas
+
+# Semilla fija para que la misma posición tenga siempre la misma clave, también en distintos procesos.
+_azar = random.Random(0x07E10)
+
+# CLAVES[color][casilla], con color 1 (blancas) o 2 (negras). La fila 0 no se usa.
+CLAVES = [[0] * 64] + [[_azar.getrandbits(64) for _ in range(64)] for _ in range(2)]
+# Voltear una ficha equivale a quitarla de un color y ponerla del otro, así que su clave es el XOR de las dos.
+CLAVES_VOLTEO = [CLAVES[1][c] ^ CLAVES[2][c] for c in range(64)]
+CLAVE_TURNO = _azar.getrandbits(64)
+
+
+def clave_zobrist(blancas, negras, turno):
+    '''
+    Esta función calcula desde cero la clave de Zobrist de una posición.
+
+    PARÁMETROS
+    - blancas: Bitboard con las fichas blancas.
+    - negras: Bitboard con las fichas negras.
+    - turno: Número que indica qué jugador está en su turno (1: blancas, 2: negras).
+    '''
+
+    clave = CLAVE_TURNO if turno == 2 else 0
+    for c in casillas(blancas):
+        clave ^= CLAVES[1][c]
+    for c in casillas(negras):
+        clave ^= CLAVES[2][c]
+    return clave
+
+def clave_tras_movimiento(clave, casilla, volteadas, turno):
+    '''
+    Esta función devuelve la clave de la posición resultante de que el jugador "turno" coloque una ficha en "casilla" y
+    voltee las fichas del bitboard "volteadas". Incluye el cambio de turno.
+
+    PARÁMETROS
+    - clave: Clave de la posición antes del movimiento.
+    - casilla: Índice (fila*8 + col) de la casilla en la que se coloca la ficha.
+    - volteadas: Bitboard con las fichas volteadas por el movimiento.
+    - turno: Jugador que hace el movimiento (1: blancas, 2: negras).
+    '''
+
+    clave ^= CLAVES[turno][casilla] ^ CLAVE_TURNO
+    while volteadas:
+        bit = volteadas & -volteadas
+        clave ^= CLAVES_VOLTEO[bit.bit_length() - 1]
+        volteadas ^= bit
+    return clave